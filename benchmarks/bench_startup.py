@@ -0,0 +1,123 @@
+"""
+Cold-start benchmark of the GUI's path to a usable course list.
+
+Every measurement runs in a fresh interpreter, so module imports are cold (the
+OS file cache is warm after the first round). A catalogue snapshot with
+--courses courses is written to a throwaway CMS_CACHE_DIR first. Measured:
+
+    snapshot      what the GUI runs before it shows the course list: its light
+                  imports, then reading and formatting the snapshot
+    backend       importing main (requests, BeautifulSoup, the VoD pipeline),
+                  which the GUI now does on a background task
+    eager         the old start-up: importing main, then get_courses from the snapshot
+    gui_module    importing cms-downloader-gui.py itself, window not created
+                  (skipped when customtkinter is not installed)
+
+"seconds" is the time spent inside the child; "process" also counts starting
+the interpreter. Both are medians over --rounds runs.
+
+Usage:
+    python benchmarks/bench_startup.py [--rounds 5] [--courses 40] [--json]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USERNAME = "bench.user"
+
+# Each snippet does its work between the two perf_counter calls and prints the elapsed time
+SNIPPETS = {
+    'snapshot': (
+        "import progress, scraper, timing\n"
+        "options = scraper.load_catalogue_snapshot(USERNAME).course_options()\n"
+        "assert options\n"
+    ),
+    'backend': "import main\n",
+    'eager': (
+        "import main\n"
+        "assert main.get_courses(USERNAME, 'unused')\n"
+    ),
+    'gui_module': (
+        "import importlib.util\n"
+        "spec = importlib.util.spec_from_file_location('cms_downloader_gui', 'cms-downloader-gui.py')\n"
+        "spec.loader.exec_module(importlib.util.module_from_spec(spec))\n"
+    ),
+}
+
+
+def write_snapshot(cache_dir, courses):
+    """Write a catalogue snapshot of `courses` courses over two seasons for USERNAME."""
+    os.environ["CMS_CACHE_DIR"] = cache_dir
+    sys.path.insert(0, REPO_DIR)
+    from scraper import CourseCatalogue, save_catalogue_snapshot
+    by_season = {}
+    for index in range(courses):
+        season = "Winter 2025" if index % 2 == 0 else "Spring 2025"
+        by_season.setdefault(season, []).append(
+            {'name': f"Benchmark Course {index + 1} (BENCH {101 + index})", 'id': str(1000 + index), 'sid': "65"})
+    save_catalogue_snapshot(USERNAME, CourseCatalogue(by_season))
+
+
+def measure(snippet, env):
+    """Run one snippet in a new interpreter; returns (seconds inside, seconds for the whole process)."""
+    code = ("import time\n_started = time.perf_counter()\n"
+            f"USERNAME = {USERNAME!r}\n" + snippet +
+            "print(time.perf_counter() - _started)\n")
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    process_seconds = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return float(result.stdout.strip().splitlines()[-1]), process_seconds
+
+
+def run(args):
+    cache_dir = tempfile.mkdtemp(prefix="cms-bench-startup-")
+    try:
+        write_snapshot(cache_dir, args.courses)
+        env = dict(os.environ, CMS_CACHE_DIR=cache_dir)
+        results = {}
+        for name, snippet in SNIPPETS.items():
+            if name == 'gui_module' and importlib.util.find_spec("customtkinter") is None:
+                results[name] = {'skipped': "customtkinter is not installed"}
+                continue
+            samples = [measure(snippet, env) for _ in range(args.rounds)]
+            results[name] = {'seconds': statistics.median(sample[0] for sample in samples),
+                             'process': statistics.median(sample[1] for sample in samples)}
+        return results
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def report(results):
+    for name, values in results.items():
+        if 'skipped' in values:
+            print(f"{name:<11} skipped: {values['skipped']}")
+        else:
+            print(f"{name:<11} {values['seconds'] * 1000:7.1f} ms  (process {values['process'] * 1000:.1f} ms)")
+
+
+def main_benchmark(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark how fast the GUI can show the course list.")
+    parser.add_argument("--rounds", type=int, default=5, help="Runs per measurement (default: 5)")
+    parser.add_argument("--courses", type=int, default=40, help="Courses in the snapshot (default: 40)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args(argv)
+    results = run(args)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        report(results)
+
+
+if __name__ == "__main__":
+    main_benchmark()
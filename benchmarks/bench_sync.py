@@ -0,0 +1,182 @@
+"""
+End-to-end benchmark of the sync pipeline against the fake CMS (benchmarks/fake_cms.py).
+
+The fake CMS runs in a child process so serving does not compete with the
+downloader for the GIL. The downloader is pointed at it through CMS_URL,
+CMS_LOGIN_URL and DACAST_URL, with a throwaway cache folder, and these
+phases are timed:
+
+    catalogue     ViewAllCourseStn fetched and parsed with a cold cache (pages/s)
+    course pages  CourseViewStn.aspx of every course fetched and parsed (pages/s)
+    vod resolve   Dacast content/info + content/access of every VoD (VoDs/s)
+    vod resolve (cached)  the same with the Dacast cache written by the first pass,
+                  read by a new client as a re-run would
+    vod segments  hls.fetch_segments of every VoD's stream, one VoD after the other (MB/s)
+    sync          download_courses of all files into an empty folder (files/s, MB/s)
+    resync        the same sync again with every file already on disk
+
+VoD segments are fetched but not remuxed: the fake streams are not real video.
+
+Usage:
+    python benchmarks/bench_sync.py [--rounds 3] [--json] [fake CMS options, e.g. --latency-ms 20]
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from fake_cms import FakeCMSConfig, add_config_arguments  # noqa: E402
+
+USERNAME = "bench.user"
+PASSWORD = "bench"
+
+
+def start_fake_cms(argv):
+    """Start fake_cms.py on a free port; returns (process, base URL)."""
+    process = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "fake_cms.py"), "--port", "0"] + argv,
+                               stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("Serving on "):
+        process.kill()
+        sys.exit("The fake CMS did not start.")
+    return process, line.split()[-1]
+
+
+def timed(function, *args, **kwargs):
+    """Run function with its output silenced; returns (seconds, result)."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        return time.perf_counter() - start, result
+
+
+def folder_size(folder):
+    files = size = 0
+    for root, _, names in os.walk(folder):
+        for name in names:
+            if not name.startswith(".cms-manifest"):
+                files += 1
+                size += os.path.getsize(os.path.join(root, name))
+    return files, size
+
+
+def run(args, base_url):
+    cache_dir = tempfile.mkdtemp(prefix="cms-bench-cache-")
+    os.environ.update({
+        "CMS_URL": base_url,
+        "CMS_LOGIN_URL": base_url + "/student_ext/Console.aspx",
+        "DACAST_URL": base_url,
+        "CMS_CACHE_DIR": cache_dir,
+    })
+    # Imported only now: the URLs and cache folder are read at import time
+    import dacast
+    import hls
+    import main
+    import scraper
+    import vod_downloader
+    from http_policy import build_session, run_stats
+
+    results = {}
+
+    def clear_cache():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        main.expire_course_pages()
+
+    elapsed = 0.0
+    for _ in range(args.rounds):
+        clear_cache()
+        seconds, catalogue = timed(scraper.parse_courses_html_from_url, USERNAME, PASSWORD)
+        elapsed += seconds
+    names = [course['name'] for courses in catalogue.values() for course in courses]
+    results['catalogue'] = {'seconds': elapsed / args.rounds, 'pages_per_s': args.rounds / elapsed}
+
+    _, courses = timed(lambda: [main.find_course(USERNAME, PASSWORD, name) for name in names])
+    elapsed = 0.0
+    for _ in range(args.rounds):
+        clear_cache()
+        seconds, pages = timed(lambda: [main.get_course_page(USERNAME, PASSWORD, course, refresh=True)
+                                        for course in courses])
+        elapsed += seconds
+    results['course_pages'] = {'seconds': elapsed / args.rounds, 'pages_per_s': len(courses) * args.rounds / elapsed}
+
+    vod_ids = [item.vod_id for page in pages for item in page.items if item.vod_id]
+    if vod_ids:
+        seconds, resolved = timed(lambda: [vod_downloader.resolve_hls_url(vod_id) for vod_id in vod_ids])
+        results['vod_resolve'] = {'seconds': seconds, 'vods_per_s': len(vod_ids) / seconds,
+                                  'resolved': sum(1 for url in resolved if url)}
+        client = dacast.DacastClient()
+        run_stats.reset()
+        seconds, cached = timed(lambda: [client.hls_url(vod_id) for vod_id in vod_ids])
+        results['vod_resolve_cached'] = {'seconds': seconds, 'vods_per_s': len(vod_ids) / seconds,
+                                         'resolved': sum(1 for url in cached if url),
+                                         'requests': run_stats.snapshot()['requests']}
+        segments_dir = tempfile.mkdtemp(prefix="cms-bench-hls-")
+        session = build_session(pool_size=hls.SEGMENT_WORKERS)
+
+        def fetch_streams():
+            for number, url in enumerate(url for url in resolved if url):
+                playlist = hls.load_media_playlist(session, url)
+                hls.fetch_segments(session, playlist, os.path.join(segments_dir, str(number)))
+
+        seconds, _ = timed(fetch_streams)
+        _, size = folder_size(segments_dir)
+        results['vod_segments'] = {'seconds': seconds, 'bytes': size, 'mb_per_s': size / 1024 / 1024 / seconds}
+        session.close()
+        shutil.rmtree(segments_dir, ignore_errors=True)
+
+    file_types = sorted({item.type for page in pages for item in page.items if not item.vod_id})
+    jobs = [main.CourseJob(course, file_types) for course in courses]
+    output = tempfile.mkdtemp(prefix="cms-bench-out-")
+    for phase in ("sync", "resync"):
+        run_stats.reset()
+        seconds, _ = timed(main.download_courses, USERNAME, PASSWORD, jobs, output_folder=output,
+                           max_parallel_courses=args.parallel_courses)
+        files, size = folder_size(output)
+        stats = run_stats.snapshot()
+        results[phase] = {'seconds': seconds, 'files': files, 'bytes': size, 'files_per_s': files / seconds,
+                          'requests': stats['requests'], 'retries': stats['retries'],
+                          'failed_downloads': stats['failed_downloads']}
+        if phase == "sync":
+            results[phase]['mb_per_s'] = size / 1024 / 1024 / seconds
+    shutil.rmtree(output, ignore_errors=True)
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+
+def report(results):
+    for phase, values in results.items():
+        details = ", ".join(f"{key} {value:.2f}" if isinstance(value, float) else f"{key} {value}"
+                            for key, value in values.items())
+        print(f"{phase:<18} {details}")
+
+
+def main_benchmark(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the sync pipeline against the fake CMS.")
+    parser.add_argument("--rounds", type=int, default=3, help="Repetitions of the page phases (default: 3)")
+    parser.add_argument("--parallel-courses", type=int, default=3, help="Courses synced at once (default: 3)")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    process, base_url = start_fake_cms(FakeCMSConfig.from_args(args).as_argv())
+    try:
+        results = run(args, base_url)
+    finally:
+        process.terminate()
+        process.wait()
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        report(results)
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,115 @@
+"""
+Measures file transfer throughput against a local HTTP server.
+
+Compares the previous transfer loop (iter_content with 8 KB chunks and a
+progress string formatted for every chunk) with main.fetch_to_file.
+
+Usage:
+    python benchmarks/bench_transfer.py [--size-mb 256] [--rounds 3]
+"""
+import argparse
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: E402
+
+
+def start_server(size):
+    block = memoryview(os.urandom(1024 * 1024))
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", str(size))
+            self.end_headers()
+            remaining = size
+            while remaining:
+                chunk = block[:min(remaining, len(block))]
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/file.bin"
+
+
+def previous_transfer(session, url, file_path):
+    """The transfer loop download_content used before fetch_to_file read into a reusable buffer."""
+    with session.get(url, stream=True) as resp, open(file_path, "wb") as file:
+        total_size = int(resp.headers.get('content-length', 0))
+        bytes_downloaded = 0
+        progress = []
+        for chunk in resp.iter_content(chunk_size=8192):
+            if chunk:
+                file.write(chunk)
+                bytes_downloaded += len(chunk)
+                percent = (bytes_downloaded / total_size) * 100
+                progress.append(f"{bytes_downloaded/1024/1024:.2f} MB / {total_size/1024/1024:.2f} MB ({percent:.1f}%)")
+    return bytes_downloaded
+
+
+def current_transfer(session, url, file_path):
+    progress = []
+    result = main.fetch_to_file(session, url, file_path, lambda done, total: progress.append(done))
+    os.remove(file_path)
+    return result['size']
+
+
+def run(name, transfer, session, url, folder, size, rounds):
+    best = 0.0
+    for round_number in range(rounds):
+        file_path = os.path.join(folder, f"{name}-{round_number}.bin")
+        started = time.perf_counter()
+        received = transfer(session, url, file_path)
+        elapsed = time.perf_counter() - started
+        if received != size:
+            sys.exit(f"{name}: received {received} of {size} bytes")
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        best = max(best, size / elapsed / 1e6)
+    return best
+
+
+def main_benchmark(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the file transfer path against a local server.")
+    parser.add_argument("--size-mb", type=int, default=256, help="Size of the served file (default: 256)")
+    parser.add_argument("--rounds", type=int, default=3, help="Transfers per variant (default: 3)")
+    args = parser.parse_args(argv)
+
+    size = args.size_mb * 1024 * 1024
+    server, url = start_server(size)
+    folder = tempfile.mkdtemp(prefix="cms-bench-")
+    # main prints the status of every download; keep the report readable
+    stdout = sys.stdout
+    try:
+        with requests.Session() as session:
+            sys.stdout = open(os.devnull, "w")
+            try:
+                before = run("previous", previous_transfer, session, url, folder, size, args.rounds)
+                after = run("current", current_transfer, session, url, folder, size, args.rounds)
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+        print(f"previous   {before:8.1f} MB/s (best of {args.rounds})")
+        print(f"current    {after:8.1f} MB/s (best of {args.rounds})")
+        print(f"speedup    {after / before:8.2f}x")
+    finally:
+        server.shutdown()
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,95 @@
+"""
+Checks that courses synced in parallel into one output folder all get recorded in its manifest.
+
+Every course of download_courses opens its own connection to the folder's
+.cms-manifest.sqlite3, so this syncs several courses at once against the fake
+CMS (benchmarks/fake_cms.py) and fails if a file is missing, a download
+failed or the manifest lacks an entry for a file on disk.
+
+Usage:
+    python benchmarks/check_parallel_courses.py [--courses 2] [--rounds 3]
+"""
+import argparse
+import contextlib
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+from bench_sync import USERNAME, PASSWORD, folder_size, start_fake_cms  # noqa: E402
+
+
+def sync_once(main, courses, output):
+    """Syncs every file of courses into output at once; returns a list of problems."""
+    from http_policy import run_stats
+    from manifest import MANIFEST_FILENAME
+
+    run_stats.reset()
+    jobs = [main.CourseJob(course) for course in courses]
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = main.download_courses(USERNAME, PASSWORD, jobs, output_folder=output,
+                                        max_parallel_courses=len(jobs))
+    problems = [f"{name}: {result}" for name, result in results.items() if result['status'] != 'done']
+    failed = run_stats.snapshot()['failed_downloads']
+    if failed:
+        problems.append(f"{failed} downloads failed")
+    files, _ = folder_size(output)
+    conn = sqlite3.connect(os.path.join(output, MANIFEST_FILENAME))
+    try:
+        recorded = conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+    finally:
+        conn.close()
+    if recorded != files:
+        problems.append(f"{files} files on disk, {recorded} in the manifest")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=2, help="Courses synced at once (default: 2)")
+    parser.add_argument("--rounds", type=int, default=3, help="Syncs into a fresh folder (default: 3)")
+    args = parser.parse_args(argv)
+
+    # Many small files, so the courses write to the manifest at the same time
+    process, base_url = start_fake_cms(["--courses", str(args.courses), "--files", "40", "--file-kb", "4",
+                                        "--vods", "0"])
+    cache_dir = tempfile.mkdtemp(prefix="cms-check-cache-")
+    os.environ.update({
+        "CMS_URL": base_url,
+        "CMS_LOGIN_URL": base_url + "/student_ext/Console.aspx",
+        "DACAST_URL": base_url,
+        "CMS_CACHE_DIR": cache_dir,
+    })
+    failures = 0
+    try:
+        # Imported only now: the URLs and cache folder are read at import time
+        import main as downloader
+        import scraper
+
+        catalogue = scraper.parse_courses_html_from_url(USERNAME, PASSWORD)
+        courses = [downloader.find_course(USERNAME, PASSWORD, course['name'])
+                   for season in catalogue.values() for course in season]
+        for number in range(args.rounds):
+            output = tempfile.mkdtemp(prefix="cms-check-out-")
+            try:
+                problems = sync_once(downloader, courses, output)
+            finally:
+                shutil.rmtree(output, ignore_errors=True)
+            print(f"{'ok' if not problems else 'FAIL'} round {number + 1}: {len(courses)} courses into one folder")
+            for problem in problems:
+                print(f"     {problem}")
+            failures += bool(problems)
+    finally:
+        process.kill()
+        process.wait()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
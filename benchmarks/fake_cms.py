@@ -0,0 +1,433 @@
+"""
+A local stand-in for the GUC CMS and the Dacast playback API.
+
+Serves generated pages in the markup of the anonymized pages in samples/
+(ViewAllCourseStn and CourseViewStn.aspx), course files with ETag and Range
+support, the Console.aspx login check, and the Dacast content/info and
+content/access endpoints with small HLS streams (a master playlist over
+RENDITIONS, one media playlist per rendition). Latency, per-connection
+bandwidth, error responses and dropped connections can be injected to
+reproduce a slow or flaky CMS. NTLM is not emulated: every request is
+served without authentication. HLS segments are filler bytes, not video.
+
+Point the downloader at it through the environment:
+    CMS_URL=http://127.0.0.1:PORT
+    CMS_LOGIN_URL=http://127.0.0.1:PORT/student_ext/Console.aspx
+    DACAST_URL=http://127.0.0.1:PORT
+
+Usage:
+    python benchmarks/fake_cms.py [--port 8080] [--courses 4] [--files 20] [--file-kb 512]
+                                  [--vods 2] [--latency-ms 0] [--bandwidth-mbs 0]
+                                  [--error-rate 0] [--drop-rate 0]
+"""
+import argparse
+import hashlib
+import html
+import http.server
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+SEASON_ID = 65
+SEASON_TITLE = "Winter 2025"
+FIRST_COURSE_ID = 1000
+FILES_PER_WEEK = 4
+CONTENT_TYPES = ["Lecture slides", "Assignment", "Tutorial (Sheet)"]
+BLOCK_SIZE = 64 * 1024  # File bodies repeat one random block of this size
+# (height, bandwidth) of the HLS renditions; segments of the last one are --segment-kb,
+# the others are scaled down by bandwidth
+RENDITIONS = [(360, 800000), (720, 2500000), (1080, 5000000)]
+
+
+class FakeCMSConfig:
+    """What the fake CMS serves and how badly it behaves."""
+
+    def __init__(self, courses=4, files=20, file_kb=512, vods=2, segments=10, segment_kb=256,
+                 latency_ms=0, bandwidth_mbs=0, error_rate=0.0, drop_rate=0.0, seed=1):
+        self.courses = courses
+        self.files = files                  # Files per course
+        self.file_kb = file_kb              # Size of every file
+        self.vods = vods                    # VoDs per course
+        self.segments = segments            # HLS segments per VoD
+        self.segment_kb = segment_kb
+        self.latency_ms = latency_ms        # Added before every response
+        self.bandwidth_mbs = bandwidth_mbs  # MB/s per connection, 0 for unlimited
+        self.error_rate = error_rate        # Share of requests answered with 503
+        self.drop_rate = drop_rate          # Share of file bodies cut off halfway
+        self.seed = seed
+
+    @classmethod
+    def from_args(cls, args):
+        return cls(args.courses, args.files, args.file_kb, args.vods, args.segments, args.segment_kb,
+                   args.latency_ms, args.bandwidth_mbs, args.error_rate, args.drop_rate, args.seed)
+
+    def as_argv(self):
+        """Command line options that recreate this configuration (see add_config_arguments)."""
+        argv = []
+        for name, value in vars(self).items():
+            argv += ["--" + name.replace("_", "-"), str(value)]
+        return argv
+
+
+def add_config_arguments(parser):
+    """Add the FakeCMSConfig options to an argparse parser."""
+    parser.add_argument("--courses", type=int, default=4, help="Courses in the catalogue (default: 4)")
+    parser.add_argument("--files", type=int, default=20, help="Files per course (default: 20)")
+    parser.add_argument("--file-kb", type=int, default=512, help="Size of each file in KB (default: 512)")
+    parser.add_argument("--vods", type=int, default=2, help="VoDs per course (default: 2)")
+    parser.add_argument("--segments", type=int, default=10, help="HLS segments per VoD (default: 10)")
+    parser.add_argument("--segment-kb", type=int, default=256, help="Size of each HLS segment in KB (default: 256)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Delay before every response (default: 0)")
+    parser.add_argument("--bandwidth-mbs", type=float, default=0, help="MB/s per connection, 0 = unlimited (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of requests answered with 503 (default: 0)")
+    parser.add_argument("--drop-rate", type=float, default=0, help="Share of file bodies cut off halfway (default: 0)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the injected faults (default: 1)")
+
+
+def course_label(index):
+    return f"(|BENCH {101 + index}|) Benchmark Course {index + 1} ({4000 + index})"
+
+
+def catalogue_html(config):
+    rows = "".join(f"""
+            <tr>
+              <td><input type="submit" value="View Course" class="btn btn-primary"></td>
+              <td>{html.escape(course_label(i))}</td>
+              <td>Active</td>
+              <td>{FIRST_COURSE_ID + i}</td>
+              <td>{SEASON_ID}</td>
+            </tr>""" for i in range(config.courses))
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>View All Courses</title></head>
+<body>
+<div class="app-main__outer">
+  <div class="app-main__inner">
+    <div class="card-hover-shadow profile-responsive card-border mb-3 card">
+      <div class="dropdown-menu-header">
+        <div class="dropdown-menu-header-inner bg-primary">
+          <div class="menu-header-content">
+            <div class="menu-header-title">Season : {SEASON_ID} , Title: {SEASON_TITLE}</div>
+          </div>
+        </div>
+      </div>
+      <div class="p-3">
+        <table class="table table-striped table-bordered">
+          <thead>
+            <tr><th scope="col">Course</th><th scope="col">Name</th><th scope="col">Status</th><th scope="col">ID</th><th scope="col">SeasonId</th></tr>
+          </thead>
+          <tbody>{rows}
+          </tbody>
+        </table>
+      </div>
+    </div>
+  </div>
+</div>
+</body>
+</html>
+"""
+
+
+def file_card(course_id, number):
+    content_type = CONTENT_TYPES[(number - 1) % len(CONTENT_TYPES)]
+    return f"""
+        <div class="card mb-4">
+          <div class="card-body">
+            <div id="content{course_id}{number:04d}"><strong>{number} - Lecture {number}</strong> ({html.escape(content_type)})
+            </div>
+            <div><a class="btn btn-primary contentbtn" id="download" download="Lecture {number}.pdf" href="/Uploads/c{course_id}/file{number}.pdf" target="_blank">download</a></div>
+          </div>
+        </div>"""
+
+
+def vod_card(course_id, number):
+    return f"""
+        <div class="card mb-4">
+          <div class="card-body">
+            <div id="content{course_id}9{number:03d}"><strong>{number} - Recording {number}</strong> (VoD)
+            </div>
+            <div><input type="button" class="btn btn-primary vodbutton contentbtn" id="{course_id}_f_{number}" value="Watch Video" data-toggle="modal" data-target="#VoDModal"></div>
+          </div>
+        </div>"""
+
+
+def rendition_size(config, name):
+    """Segment size in bytes of a rendition folder such as "720p"; None for an unknown rendition."""
+    for height, bandwidth in RENDITIONS:
+        if name == f"{height}p":
+            return max(1, config.segment_kb * 1024 * bandwidth // RENDITIONS[-1][1])
+    return None
+
+
+def week_html(week, cards):
+    return f"""
+  <div class="card mb-5 weeksdata">
+    <div class="card-header"><h2 class="text-big text-dark">Week: 2025-{1 + week // 4}-{1 + week % 4 * 7}</h2></div>
+    <div class="p-3">
+      <div style="display:none;"><p class="m-2 p2">Hidden announcement</p></div>
+      <div><strong>Description</strong><p class="m-2 p2">Topic {week}</p></div>
+      <div><strong>Content</strong>{cards}
+      </div>
+    </div>
+  </div>"""
+
+
+def course_html(config, course_id):
+    index = course_id - FIRST_COURSE_ID
+    weeks = {}  # week number (1 = oldest) -> cards
+    for number in range(1, config.files + 1):
+        weeks.setdefault((number - 1) // FILES_PER_WEEK + 1, []).append(file_card(course_id, number))
+    for number in range(1, config.vods + 1):
+        weeks.setdefault((number - 1) % max(1, len(weeks)) + 1, []).append(vod_card(course_id, number))
+    # Newest week first, like the CMS
+    week_divs = "".join(week_html(week, "".join(cards)) for week, cards in sorted(weeks.items(), reverse=True))
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>Course View</title></head>
+<body>
+<div class="app-main__inner">
+  <div class="app-page-title">
+    <h3><span id="ContentPlaceHolderright_ContentPlaceHoldercontent_LabelCourseName">{html.escape(course_label(index))}</span></h3>
+  </div>
+{week_divs}
+</div>
+</body>
+</html>
+"""
+
+
+class FakeCMS:
+    """
+    The fake CMS server, running on a background thread.
+
+    Attributes:
+        url (str): Base URL, e.g. "http://127.0.0.1:8080" (set by start()).
+        hits (dict): Requests served per kind: 'page', 'file', 'dacast', 'hls', 'error', 'drop'.
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FakeCMSConfig()
+        self.host = host
+        self.port = port
+        self.url = None
+        self.hits = {}
+        self._hits_lock = threading.Lock()
+        self._random = random.Random(self.config.seed)
+        self.block = memoryview(os.urandom(BLOCK_SIZE))
+        self._server = None
+
+    def count(self, kind):
+        with self._hits_lock:
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+
+    def chance(self, rate):
+        with self._hits_lock:
+            return rate > 0 and self._random.random() < rate
+
+    def file_chunks(self, start, end):
+        """Yields bytes start to end of a file body made of the repeated random block."""
+        while start < end:
+            offset = start % BLOCK_SIZE
+            chunk = self.block[offset:min(BLOCK_SIZE, offset + end - start)]
+            yield chunk
+            start += len(chunk)
+
+    def start(self):
+        fake = self
+
+        class Handler(FakeCMSHandler):
+            cms = fake
+
+        self._server = http.server.ThreadingHTTPServer((self.host, self.port), Handler)
+        self._server.daemon_threads = True
+        self.url = f"http://{self.host}:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def environment(self):
+        """Environment variables that point the downloader at this server."""
+        return {
+            "CMS_URL": self.url,
+            "CMS_LOGIN_URL": self.url + "/student_ext/Console.aspx",
+            "DACAST_URL": self.url,
+        }
+
+
+class FakeCMSHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, delayed ACKs add ~40 ms per response
+    disable_nagle_algorithm = True
+    cms = None  # Set on the subclass made by FakeCMS.start
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        config = self.cms.config
+        if config.latency_ms:
+            time.sleep(config.latency_ms / 1000)
+        if self.cms.chance(config.error_rate):
+            self.cms.count('error')
+            self.send_response(503)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        path = url.path
+        if path == "/apps/student/ViewAllCourseStn":
+            self.send_page(catalogue_html(config))
+        elif path == "/apps/student/CourseViewStn.aspx":
+            course_id = int(query.get("id", ["0"])[0])
+            if not FIRST_COURSE_ID <= course_id < FIRST_COURSE_ID + config.courses:
+                self.send_error(404)
+                return
+            self.send_page(course_html(config, course_id))
+        elif path == "/student_ext/Console.aspx":
+            self.send_page("<html><body>Console</body></html>")
+        elif path.startswith("/Uploads/"):
+            self.cms.count('file')
+            self.send_file(path, config.file_kb * 1024, config.drop_rate)
+        elif path == "/content/info":
+            self.cms.count('dacast')
+            content_id = query.get("contentId", [""])[0]
+            self.send_json({"contentInfo": {"contentId": "vod-" + content_id.replace("_", "-")}})
+        elif path == "/content/access":
+            self.cms.count('dacast')
+            content_id = query.get("contentId", [""])[0]
+            self.send_json({"hls": f"{self.cms.url}/hls/{content_id}/index.m3u8"})
+        elif path.startswith("/hls/") and path.endswith(".m3u8"):
+            self.cms.count('hls')
+            parts = path.split("/")  # "", "hls", id, ["720p",] "index.m3u8"
+            if len(parts) == 4:
+                self.send_master_playlist()
+            elif len(parts) == 5 and rendition_size(config, parts[3]):
+                self.send_playlist(config)
+            else:
+                self.send_error(404)
+        elif path.startswith("/hls/") and path.endswith(".ts"):
+            size = rendition_size(config, path.split("/")[-2])
+            if not size:
+                self.send_error(404)
+                return
+            self.cms.count('hls')
+            self.send_file(path, size, 0)
+        else:
+            self.send_error(404)
+
+    def send_body(self, status, body, content_type, etag=None, extra_headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        for name, value in extra_headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.write_paced([body])
+
+    def send_page(self, text):
+        self.cms.count('page')
+        body = text.encode("utf-8")
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_body(304, b"", "text/html; charset=utf-8", etag)
+            return
+        self.send_body(200, body, "text/html; charset=utf-8", etag)
+
+    def send_json(self, value):
+        self.send_body(200, json.dumps(value).encode("utf-8"), "application/json")
+
+    def send_master_playlist(self):
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+        for height, bandwidth in RENDITIONS:
+            lines += [f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={height * 16 // 9}x{height},'
+                      f'CODECS="avc1.64001f,mp4a.40.2"', f"{height}p/index.m3u8"]
+        self.send_body(200, ("\n".join(lines) + "\n").encode("ascii"), "application/vnd.apple.mpegurl")
+
+    def send_playlist(self, config):
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:6", "#EXT-X-MEDIA-SEQUENCE:0"]
+        for number in range(config.segments):
+            lines += ["#EXTINF:6.000,", f"{number}.ts"]
+        lines.append("#EXT-X-ENDLIST")
+        self.send_body(200, ("\n".join(lines) + "\n").encode("ascii"), "application/vnd.apple.mpegurl")
+
+    def send_file(self, path, size, drop_rate):
+        etag = f'"{hashlib.md5(path.encode()).hexdigest()[:16]}-{size}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_body(304, b"", "application/octet-stream", etag)
+            return
+        start, status = 0, 200
+        range_header = self.headers.get("Range", "")
+        if range_header.startswith("bytes="):
+            start = int(range_header[6:].split("-")[0] or 0)
+            if start >= size:
+                self.send_body(416, b"", "application/octet-stream", etag, [("Content-Range", f"bytes */{size}")])
+                return
+            status = 206
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(size - start))
+        self.send_header("ETag", etag)
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        end = size
+        if self.cms.chance(drop_rate):
+            # Promise the whole body, send half of it and hang up
+            self.cms.count('drop')
+            end = start + (size - start) // 2
+            self.close_connection = True
+        self.write_paced(self.cms.file_chunks(start, end))
+
+    def write_paced(self, chunks):
+        bandwidth = self.cms.config.bandwidth_mbs * 1024 * 1024
+        started = time.monotonic()
+        sent = 0
+        for chunk in chunks:
+            self.wfile.write(chunk)
+            sent += len(chunk)
+            if bandwidth:
+                ahead = sent / bandwidth - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a fake GUC CMS and Dacast API for offline testing.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on, 0 for any (default: 8080)")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    cms = FakeCMS(FakeCMSConfig.from_args(args), args.host, args.port).start()
+    print(f"Serving on {cms.url}", flush=True)
+    for name, value in cms.environment().items():
+        print(f"  {name}={value}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        cms.stop()
+
+
+if __name__ == "__main__":
+    main()
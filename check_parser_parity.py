@@ -0,0 +1,76 @@
+"""
+Checks that every HTML parser backend extracts the same data from the sample pages.
+
+Pages in samples/ whose names start with "catalogue" are parsed as
+ViewAllCourseStn, the ones starting with "course" as CourseViewStn.aspx.
+Add a page to the corpus whenever the CMS markup changes.
+
+Usage:
+    python check_parser_parity.py [--repeat N] [files ...]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+import cms_parser
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "samples")
+
+
+def parse_sample(path, backend):
+    with open(path, "r", encoding="utf-8") as f:
+        html = f.read()
+    if os.path.basename(path).startswith("catalogue"):
+        return cms_parser.parse_catalogue(html, backend)
+    return cms_parser.parse_course_html(html, backend)
+
+
+def as_json(value):
+    if isinstance(value, cms_parser.ContentItem):
+        return value.as_dict()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def time_sample(path, backend, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse_sample(path, backend)
+    return (time.perf_counter() - start) / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the HTML parser backends on the sample corpus.")
+    parser.add_argument("files", nargs="*", help="Pages to check (default: samples/*.html)")
+    parser.add_argument("--repeat", type=int, default=20, help="Parses per page when timing (default: 20)")
+    args = parser.parse_args(argv)
+
+    if cms_parser.LexborHTMLParser is None:
+        sys.exit("selectolax is not installed; there is only one backend to check.")
+
+    files = args.files or sorted(glob.glob(os.path.join(SAMPLES_DIR, "*.html")))
+    if not files:
+        sys.exit("No sample pages found.")
+
+    mismatches = 0
+    for path in files:
+        results = {name: parse_sample(path, name) for name in cms_parser.BACKENDS}
+        expected = results["bs4"]
+        timings = ", ".join(f"{name} {time_sample(path, name, args.repeat) * 1000:.2f} ms"
+                            for name in cms_parser.BACKENDS)
+        for name, result in results.items():
+            if result != expected:
+                mismatches += 1
+                print(f"MISMATCH {os.path.basename(path)}: {name} differs from bs4")
+                print("  bs4:  " + json.dumps(expected, ensure_ascii=False, default=as_json))
+                print(f"  {name}: " + json.dumps(result, ensure_ascii=False, default=as_json))
+        print(f"{'ok  ' if all(r == expected for r in results.values()) else 'FAIL'} {os.path.basename(path)} ({timings})")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,318 @@
+import argparse
+import contextlib
+import getpass
+import json
+import os
+import sys
+import threading
+import time
+
+import main
+import timing
+from hls import check_quality
+from http_policy import run_stats
+from progress import ProgressTracker, format_duration
+from scraper import get_course_catalogue
+
+ORG_MODES = {"type": "type", "week": "week", "flat": "none"}
+
+
+class ProgressPrinter:
+    """
+    Turns download_content progress callbacks into output lines.
+
+    Status changes (a file finished, was skipped, a VoD completed) are always
+    written; byte-level progress of a file is written at most once per
+    `interval` seconds so fast transfers do not flood the output. Printers of
+    courses synced in parallel share one lock so lines never interleave.
+
+    With a ProgressTracker fed by the same download, progress lines also carry
+    the byte-weighted percentage of the course, the throughput and the ETA.
+    """
+    _write_lock = threading.Lock()
+
+    def __init__(self, out, as_json, course, interval=1.0, tracker=None):
+        self.out = out
+        self.as_json = as_json
+        self.course = course
+        self.interval = interval
+        self.tracker = tracker
+        self._last_progress = {}
+
+    def __call__(self, downloaded, total, current_file, file_progress_str=None):
+        status = file_progress_str or ""
+        is_final = status in ("Downloaded", "Already Exists", "VoD")
+        now = time.monotonic()
+        if not is_final:
+            if now - self._last_progress.get(current_file, 0) < self.interval:
+                return
+            self._last_progress[current_file] = now
+        else:
+            self._last_progress.pop(current_file, None)
+        fields = {}
+        snapshot = self.tracker.snapshot() if self.tracker is not None else None
+        if snapshot and snapshot['fraction'] is not None:
+            fields = {'percent': round(snapshot['fraction'] * 100, 1), 'rate': int(snapshot['rate']),
+                      'eta': round(snapshot['eta']) if snapshot['eta'] is not None else None}
+            if not self.as_json:
+                fields = {'percent': f"{fields['percent']}%", 'rate': f"{snapshot['rate']/1024/1024:.1f}MB/s",
+                          'eta': format_duration(snapshot['eta']) if snapshot['eta'] is not None else "?"}
+        self.emit("file_done" if is_final else "progress", downloaded=downloaded, total=total,
+                  file=current_file, status=status, **fields)
+
+    def emit(self, event, **fields):
+        if self.as_json:
+            record = {"event": event, "course": self.course, "time": round(time.time(), 3)}
+            record.update(fields)
+            line = json.dumps(record) + "\n"
+        else:
+            details = " ".join(f"{key}={value}" for key, value in fields.items())
+            line = f"[{event}] {self.course}: {details}\n"
+        with self._write_lock:
+            self.out.write(line)
+            self.out.flush()
+
+
+def load_credentials(args):
+    """Resolve credentials from flags, the environment or .env, prompting for the password if needed."""
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+    username = args.username or os.getenv("CMS_USERNAME") or os.getenv("USERNAME", "")
+    password = os.getenv("CMS_PASSWORD") or os.getenv("PASSWORD", "")
+    if not username:
+        sys.exit("No username given. Use --username or set CMS_USERNAME.")
+    if not password:
+        password = getpass.getpass(f"Password for {username}: ")
+    return username, password
+
+
+def download_options(args):
+    """download_content arguments shared by sync and sync-all."""
+    return {
+        'output_folder': args.output,
+        'org_mode': ORG_MODES[args.org_mode],
+        'include_week': args.include_week,
+        'include_type': args.include_type,
+        'include_week_description': args.include_week_description,
+        'max_workers': args.workers,
+        'revalidate': args.revalidate,
+        'max_vod_workers': args.vod_workers,
+        'vod_quality': args.vod_quality,
+    }
+
+
+def vod_quality(value):
+    """argparse type of --vod-quality."""
+    try:
+        return check_quality(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def sync_courses(username, password, courses, args, out, max_parallel_courses=1):
+    """
+    Download the selected (or all) types of each course, several courses at a time.
+
+    Returns:
+        int: Exit status: 1 if a course was not found or failed, or a download failed; else 0.
+    """
+    jobs = []
+    missing = 0
+    for name in courses:
+        course = main.find_course(username, password, name)
+        if course is None:
+            ProgressPrinter(out, args.json, name).emit("course_skipped", reason="course not found")
+            missing += 1
+            continue
+        jobs.append(main.CourseJob(course, args.types, args.vods_only))
+
+    printers = {}
+
+    def progress_for(job, plan):
+        tracker = ProgressTracker()
+        printer = printers[job.course.name] = ProgressPrinter(out, args.json, job.course.name, tracker=tracker)
+        printer.emit("course_start", types=plan.types, total=len(plan.items),
+                     bytes=plan.bytes_to_download, unknown_sizes=plan.unknown_sizes)
+        return {'progress_callback': printer, 'progress_tracker': tracker}
+
+    def on_course_done(job, result):
+        if result['status'] == 'done':
+            printers[job.course.name].emit("course_done")
+        elif result['status'] == 'planned':
+            print_plan(out, args.json, result['plan'])
+        elif result['status'] == 'skipped':
+            ProgressPrinter(out, args.json, job.course.name).emit("course_skipped", reason=result['reason'])
+        else:
+            ProgressPrinter(out, args.json, job.course.name).emit("course_failed", error=result['error'])
+
+    run_stats.reset()
+    results = main.download_courses(username, password, jobs, progress_for, on_course_done,
+                                    max_parallel_courses=max_parallel_courses,
+                                    max_transfers=getattr(args, 'max_transfers', main.DEFAULT_MAX_TRANSFERS),
+                                    dry_run=args.dry_run, **download_options(args))
+    report_run_stats(out, args)
+    failed_courses = sum(1 for result in results.values() if result['status'] == 'failed')
+    return 1 if missing or failed_courses or run_stats.snapshot()['failed_downloads'] else 0
+
+
+def print_plan(out, as_json, plan):
+    """Write what a dry run would do for a course: a "plan" event, or one line per file."""
+    if as_json:
+        items = [{'title': item.title, 'type': item.content_type, 'action': item.action,
+                  'revalidate': item.revalidate, 'path': item.path, 'size': item.size,
+                  'resume_from': item.resume_from} for item in plan.items]
+        ProgressPrinter(out, True, plan.course.name).emit(
+            "plan", bytes=plan.bytes_to_download, unknown_sizes=plan.unknown_sizes, items=items)
+        return
+    lines = [f"--- {plan.course.name}: {len(plan.downloads)} of {len(plan.items)} files to download, "
+             f"{plan.bytes_to_download/1024/1024:.2f} MB"
+             + (f" + {plan.unknown_sizes} of unknown size" if plan.unknown_sizes else "") + " ---\n"]
+    for item in plan.items:
+        action = item.action + (" + revalidate" if item.revalidate else "")
+        if item.size is None:
+            size = "?" if item.action == 'download' else ""
+        elif item.resume_from:
+            size = f"{(item.size - item.resume_from)/1024/1024:.2f} MB left"
+        else:
+            size = f"{item.size/1024/1024:.2f} MB"
+        lines.append(f"  {action:<20} {size:>14}  {item.path}\n")
+    with ProgressPrinter._write_lock:
+        out.write("".join(lines))
+        out.flush()
+
+
+def report_run_stats(out, args):
+    """Write the retry and failure counts of the run, as a "run_stats" event or a summary line."""
+    if args.json:
+        record = {"event": "run_stats", "time": round(time.time(), 3)}
+        record.update(run_stats.snapshot())
+        out.write(json.dumps(record) + "\n")
+    else:
+        out.write(f"Run finished: {run_stats.describe()}\n")
+    out.flush()
+
+
+def list_course_names(username, password):
+    catalogue = get_course_catalogue(username, password, snapshot=True)
+    return catalogue, [name for courses in catalogue.by_season.values() for name in (c['name'] for c in courses)]
+
+
+def command_courses(username, password, args, out):
+    catalogue, _ = list_course_names(username, password)
+    if args.json:
+        out.write(json.dumps(catalogue.by_season, indent=2) + "\n")
+        return
+    for season_title, courses in catalogue.by_season.items():
+        out.write(f"--- {season_title} ---\n")
+        for course in courses:
+            out.write(f"  {course['name']}  (id={course['id']}, sid={course['sid']})\n")
+
+
+def command_types(username, password, args, out):
+    course = main.find_course(username, password, args.course)
+    if course is None:
+        sys.exit(f"Course not found: {args.course}")
+    result = main.get_types(username, password, course)
+    if args.json:
+        out.write(json.dumps(result) + "\n")
+        return
+    out.write(f"{result.get('course_name', args.course)}\n")
+    for content_type in result.get('types', []):
+        out.write(f"  {content_type}\n")
+
+
+def command_sync(username, password, args, out):
+    return sync_courses(username, password, [args.course], args, out)
+
+
+def command_sync_all(username, password, args, out):
+    _, names = list_course_names(username, password)
+    if not names:
+        sys.exit("No courses found. Check your credentials.")
+    return sync_courses(username, password, names, args, out, args.parallel_courses)
+
+
+def add_sync_options(parser):
+    parser.add_argument("-o", "--output", default=os.getcwd(), help="Output folder (default: current directory)")
+    parser.add_argument("-t", "--types", nargs="+", help="Content types to download (default: all)")
+    parser.add_argument("--vods-only", action="store_true", help="Only download VoD-like content types")
+    parser.add_argument("--org-mode", choices=sorted(ORG_MODES), default="type", help="Folder organization (default: type)")
+    parser.add_argument("--include-week", dest="include_week", action="store_true", default=True,
+                        help="Include the week number in file names (default)")
+    parser.add_argument("--no-include-week", dest="include_week", action="store_false",
+                        help="Leave the week number out of file names")
+    parser.add_argument("--include-type", dest="include_type", action="store_true", default=False,
+                        help="Include the content type in file names")
+    parser.add_argument("--no-include-type", dest="include_type", action="store_false",
+                        help="Leave the content type out of file names (default)")
+    parser.add_argument("--include-week-description", action="store_true",
+                        help="Include week descriptions in file/folder names")
+    parser.add_argument("-w", "--workers", type=int, default=main.DEFAULT_DOWNLOAD_WORKERS,
+                        help=f"Parallel file downloads (default: {main.DEFAULT_DOWNLOAD_WORKERS})")
+    parser.add_argument("--vod-workers", type=int, default=main.DEFAULT_VOD_WORKERS,
+                        help=f"Parallel VoD downloads (default: {main.DEFAULT_VOD_WORKERS})")
+    parser.add_argument("--vod-quality", type=vod_quality, default=main.VOD_QUALITY,
+                        help="VoD rendition: best, smallest, audio, a maximum height such as 720p "
+                             f"or a maximum bandwidth such as 1500k (default: {main.VOD_QUALITY})")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="Re-check already downloaded files with conditional requests")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only show what would be downloaded, with sizes; change nothing")
+    parser.add_argument("--report", metavar="FILE", default=os.getenv("CMS_RUN_REPORT"),
+                        help="Time every phase of the run and write a JSON report to FILE "
+                             "(default: $CMS_RUN_REPORT)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Download course content from the GUC CMS without the GUI.")
+    parser.add_argument("-u", "--username", help="GUC username (default: $CMS_USERNAME or USERNAME in .env)")
+    parser.add_argument("--json", action="store_true", help="Write machine-readable JSON lines to stdout")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    courses = subparsers.add_parser("courses", help="List courses of all seasons")
+    courses.set_defaults(handler=command_courses)
+
+    types = subparsers.add_parser("types", help="List the content types of a course")
+    types.add_argument("course", help='Course name as listed by "courses", e.g. "Embedded Systems (CSEN 701)"')
+    types.set_defaults(handler=command_types)
+
+    sync = subparsers.add_parser("sync", help="Download one course")
+    sync.add_argument("course", help="Course name as listed by \"courses\"")
+    add_sync_options(sync)
+    sync.set_defaults(handler=command_sync)
+
+    sync_all = subparsers.add_parser("sync-all", help="Download every course")
+    add_sync_options(sync_all)
+    sync_all.add_argument("--parallel-courses", type=int, default=main.DEFAULT_PARALLEL_COURSES,
+                          help=f"Courses synced at once (default: {main.DEFAULT_PARALLEL_COURSES})")
+    sync_all.add_argument("--max-transfers", type=int, default=main.DEFAULT_MAX_TRANSFERS,
+                          help=f"Transfers running at once across all courses (default: {main.DEFAULT_MAX_TRANSFERS})")
+    sync_all.set_defaults(handler=command_sync_all)
+    return parser
+
+
+def run(argv=None):
+    """Runs a command; returns the exit status (non-zero if a sync left courses or files behind)."""
+    args = build_parser().parse_args(argv)
+    username, password = load_credentials(args)
+    out = sys.stdout
+    # Library diagnostics go to stderr so stdout only carries results and progress
+    report_path = getattr(args, 'report', None)
+    with contextlib.redirect_stdout(sys.stderr):
+        if report_path:
+            timing.start_run()
+        try:
+            status = args.handler(username, password, args, out)
+        finally:
+            report = timing.finish_run()
+            if report is not None:
+                error = timing.write_report(report, report_path)
+                print(error or f"Run report written to {report_path}")
+    return status or 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
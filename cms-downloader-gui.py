@@ -1,17 +1,40 @@
 import customtkinter as ctk
-import requests
-from requests_ntlm import HttpNtlmAuth
-from bs4 import BeautifulSoup
-from main import download_content, get_types, login, get_courses, update_course_url, get_course_info_from_formatted_name
-from main import get_total_files
+from progress import ProgressTracker, format_duration
+from scraper import load_catalogue_snapshot
+import timing
 import threading
 import time
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 import math
 import os
-from tkinter import filedialog
+from tkinter import filedialog, TclError
 from dotenv import load_dotenv, set_key
 
+# How often the loading page redraws download progress
+PROGRESS_POLL_MS = 100
+# Worker threads for GUI actions (login, course lists, course pages, downloads)
+TASK_WORKERS = 4
+# When set, every download run is timed and its JSON report written to this file (see timing)
+RUN_REPORT_PATH = os.environ.get("CMS_RUN_REPORT")
+# Placeholder of the course dropdown while the course list loads
+COURSES_LOADING = "Loading courses..."
+# VoD quality choices -> rendition policy passed to download_content (see hls.check_quality)
+VOD_QUALITIES = {"Best available": "best", "1080p": "1080p", "720p": "720p", "480p": "480p",
+                 "Smallest": "smallest", "Audio only": "audio"}
+
+
+def backend():
+    """
+    Returns the download backend (main), importing it on first use.
+
+    main pulls in requests, requests_ntlm, BeautifulSoup and the VoD pipeline,
+    so it is imported on a background task after the window is up instead of
+    delaying start-up. Only call this from background tasks, or once it is
+    known to be loaded (e.g. when a download starts).
+    """
+    import main
+    return main
+
 # Configure appearance
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
@@ -94,6 +117,66 @@ class LoadingSpinner(ctk.CTkFrame):
             self.draw_spinner()
             self.after(50, self.animate)  # Update every 50ms for smooth animation
 
+class BackgroundTasks:
+    """
+    Runs the blocking work of GUI actions (HTTP requests, HTML parsing, downloads) off the Tk thread.
+
+    Every task has a key such as "login" or "course". Its on_done/on_error
+    callback runs on the Tk thread once the work is over, unless the task was
+    cancelled or replaced by a newer task with the same key in the meantime:
+    the late answer of an abandoned action is dropped. Work that has already
+    started is not interrupted; long tasks poll their own cancellation check.
+    submit and cancel must be called from the Tk thread.
+    """
+
+    def __init__(self, root, max_workers=TASK_WORKERS):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gui-task")
+        self._pending = {}  # key -> Future of the task whose callbacks are still wanted
+
+    def submit(self, key, function, *args, on_done=None, on_error=None):
+        """Run function(*args) on a worker; returns its Future."""
+        self.cancel(key)
+        future = self.executor.submit(function, *args)
+        self._pending[key] = future
+
+        def deliver():
+            if self._pending.get(key) is not future:
+                return  # Cancelled or superseded
+            del self._pending[key]
+            error = future.exception()
+            if error is None:
+                if on_done:
+                    on_done(future.result())
+            elif on_error:
+                on_error(error)
+            else:
+                print(f"Background task {key} failed: {error}")
+
+        def schedule(_):
+            try:
+                self.root.after(0, deliver)
+            except (RuntimeError, TclError):
+                pass  # The window was closed
+
+        future.add_done_callback(schedule)
+        return future
+
+    def cancel(self, key):
+        """Drop the callbacks of a task, and the task itself if it has not started yet."""
+        future = self._pending.pop(key, None)
+        if future is not None:
+            future.cancel()
+
+    def is_running(self, key):
+        return key in self._pending
+
+    def shutdown(self):
+        for key in list(self._pending):
+            self.cancel(key)
+        self.executor.shutdown(wait=False)
+
+
 class ModernCMSDownloader:
     def __init__(self):
         self.root = ctk.CTk()
@@ -117,9 +200,17 @@ class ModernCMSDownloader:
         self.all_checkboxes = []
         self.checkboxes = {}
         self.pages = []
-        self.current_download_thread = None
+        self.tasks = BackgroundTasks(self.root)
         self.is_downloading = False
+        self.selected_course = None  # CourseRef chosen on the courses page
+        self.progress_tracker = None  # ProgressTracker of the running download
+        self.course_trackers = None  # Course name -> ProgressTracker of the courses in progress (all courses)
+        self.courses_done = 0
+        self.courses_total = 0
+        self.progress_poll_job = None  # Pending root.after id of poll_progress
         self.output_folder = None
+        self.vod_quality = "Best available"  # Key of VOD_QUALITIES, shared by single and all-course downloads
+        self.course_options = []  # Current entries of the course dropdown
         self.load_last_output_folder()
         
         # Create pages
@@ -134,9 +225,20 @@ class ModernCMSDownloader:
         # Check for saved credentials
         self.check_saved_credentials()
         
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        # Load the backend while the user looks at the window
+        self.tasks.submit("warm_up", backend)
+        
         # Start the app
         self.root.mainloop()
     
+    def on_close(self):
+        """Stop running downloads and pending actions, then close the window"""
+        self.is_downloading = False
+        self.stop_progress_polling()
+        self.tasks.shutdown()
+        self.root.destroy()
+    
     def center_window(self):
         """Center the window on screen"""
         self.root.update_idletasks()
@@ -447,6 +549,21 @@ class ModernCMSDownloader:
         self.week_toggle.pack(pady=(10, 0), anchor="w")
         self.type_toggle.pack(pady=(8, 0), anchor="w")
         self.week_description_toggle.pack(pady=(8, 0), anchor="w")
+        # VoD rendition: lower qualities make lecture recordings much smaller
+        vod_quality_label = ctk.CTkLabel(
+            master=header_frame,
+            text="VoD Quality:",
+            font=ctk.CTkFont(size=14, weight="bold"),
+            anchor="w"
+        )
+        vod_quality_label.pack(pady=(14, 2), anchor="w")
+        self.vod_quality_dropdown = ctk.CTkOptionMenu(
+            master=header_frame,
+            values=list(VOD_QUALITIES),
+            command=self.set_vod_quality
+        )
+        self.vod_quality_dropdown.set(self.vod_quality)
+        self.vod_quality_dropdown.pack(pady=(0, 10), anchor="w")
         
         # Scrollable content container
         types_label = ctk.CTkLabel(
@@ -656,9 +773,8 @@ class ModernCMSDownloader:
         username = os.getenv("USERNAME", "")
         password = os.getenv("PASSWORD", "")
         if username and password:
-            self.update_courses(username, password)
-            self.page_index = 1
             self.show_page(1)
+            self.update_courses(username, password)
         else:
             self.show_page(0)
     
@@ -687,7 +803,8 @@ class ModernCMSDownloader:
             if hasattr(self, 'current_file_label'):
                 self.current_file_label.configure(text="Preparing download...")
             if hasattr(self, 'download_button'):
-                self.download_button.configure(text="Download Selected", state="normal")
+                can_download = self.selected_course is not None and bool(self.checkboxes)
+                self.download_button.configure(text="Download Selected", state="normal" if can_download else "disabled")
     
     def next_page(self, selected_course):
         """Navigate to next page"""
@@ -708,13 +825,19 @@ class ModernCMSDownloader:
                 username, password = self.get_credentials()
                 # Extract actual course name from formatted selection
                 actual_course_name = selected_course.strip()
-                update_course_url(username, password, actual_course_name)
-                self.render_checkboxes()
+                self.show_page(2)
+                self.show_course_loading(actual_course_name)
+                self.tasks.submit("course", self.load_course, username, password, actual_course_name,
+                                  on_done=self.render_checkboxes,
+                                  on_error=lambda e: self.render_checkboxes((None, {'course_name': f"Could not load the course: {e}"})))
+                return
             self.show_page(self.page_index + 1)
     
     def prev_page(self):
         """Navigate to previous page"""
         if self.page_index > 0:
+            # Whatever the page was loading is no longer wanted
+            self.tasks.cancel("courses" if self.page_index == 1 else "course")
             if self.page_index == 0:  # Clear credentials when going back to login
                 set_key(".env", "USERNAME", "")
                 set_key(".env", "PASSWORD", "")
@@ -728,8 +851,13 @@ class ModernCMSDownloader:
             return
         
         username, password = self.get_credentials()
-        all_courses = get_courses(username, password)
-        
+        self.download_all_button.configure(text="Loading Courses...", state="disabled")
+        self.tasks.submit("all_courses", lambda: backend().get_courses(username, password),
+                          on_done=self.confirm_download_all, on_error=lambda e: self.confirm_download_all([]))
+    
+    def confirm_download_all(self, all_courses):
+        """Ask which content to download from the listed courses, then start downloading them"""
+        self.download_all_button.configure(text="Download All", state="normal")
         # Filter out session headers and get only actual courses
         actual_courses = []
         for course in all_courses:
@@ -749,111 +877,89 @@ class ModernCMSDownloader:
         self.show_page(3)  # Loading page
         self.loading_spinner.start_animation()
         
-        # Start download in separate thread
+        # Update loading title based on content type choice
+        if content_type_choice == "vods":
+            self.loading_title.configure(text="Downloading VODs from All Courses")
+            self.loading_subtitle.configure(text=f"Processing VODs from {len(actual_courses)} courses...")
+        else:
+            self.loading_title.configure(text="Downloading All Content from All Courses")
+            self.loading_subtitle.configure(text=f"Processing all content from {len(actual_courses)} courses...")
+        
+        # Start the download in the background
+        from http_policy import run_stats
         self.is_downloading = True
-        self.current_download_thread = threading.Thread(
-            target=self.download_all_thread,
-            args=(actual_courses, content_type_choice)
-        )
-        self.current_download_thread.start()
+        run_stats.reset()
+        if RUN_REPORT_PATH:
+            timing.start_run()
+        self.progress_tracker = None
+        self.course_trackers = {}
+        self.courses_done = 0
+        self.courses_total = len(actual_courses)
+        self.tasks.submit("download", self.download_all_thread, actual_courses, content_type_choice,
+                          on_done=lambda _: self.download_all_completed() if self.is_downloading else None,
+                          on_error=self.download_failed)
+        self.start_progress_polling()
     
     def download_all_thread(self, courses, content_type_choice):
-        """Download thread for all courses"""
+        """Downloads all courses on a background task; several courses are synced at once"""
         username, password = self.get_credentials()
-        total_courses = len(courses)
-        completed_courses = 0
+        main = backend()
+        done_lock = threading.Lock()
         
-        # Update loading title based on content type choice
-        if content_type_choice == "vods":
-            title_text = "Downloading VODs from All Courses"
-            subtitle_text = f"Processing VODs from {total_courses} courses..."
-        else:
-            title_text = "Downloading All Content from All Courses"
-            subtitle_text = f"Processing all content from {total_courses} courses..."
+        def course_finished():
+            with done_lock:
+                self.courses_done += 1
         
-        self.root.after(0, lambda: self.loading_title.configure(text=title_text))
-        self.root.after(0, lambda: self.loading_subtitle.configure(text=subtitle_text))
+        def progress_for(job, plan):
+            # Each course reports into its own tracker; poll_progress shows them side by side
+            tracker = ProgressTracker()
+            tracker.total_files = len(plan.items)
+            self.course_trackers[job.course.name] = tracker
+            return {'progress_tracker': tracker}
         
-        try:
-            for course in courses:
-                if not self.is_downloading:
-                    break
-                
-                # Update current course
-                self.root.after(0, lambda c=course: self.current_file_label.configure(text=f"Processing course: {c}"))
-                
-                # Update course URL for this course
-                update_course_url(username, password, course)
-                
-                # Get available types for this course
-                get_types_output = get_types(username, password)
-                all_types = get_types_output.get('types', [])
-                
-                if all_types:
-                    # Filter types based on user choice
-                    if content_type_choice == "vods":
-                        # Filter to only include VOD-related types
-                        vod_keywords = ["VOD", "Video", "Lecture", "Recording", "Stream"]
-                        selected_types = []
-                        for content_type in all_types:
-                            if any(keyword.lower() in content_type.lower() for keyword in vod_keywords):
-                                selected_types.append(content_type)
-                        # If no VOD types found, skip this course
-                        if not selected_types:
-                            completed_courses += 1
-                            continue
-                    else:
-                        # Use all available types
-                        selected_types = all_types
-                    
-                    # Download selected content types for this course
-                    def progress_callback(downloaded, total, current_file, file_progress_str=None):
-                        if not self.is_downloading:
-                            return
-                        # Update progress with course context
-                        course_progress = f"Course {completed_courses + 1}/{total_courses}: {course}"
-                        self.root.after(0, lambda: self.file_counter.configure(text=f"{course_progress} - {downloaded} of {total} files"))
-                        if file_progress_str == "VoD":
-                            self.root.after(0, lambda cf=current_file: self.current_file_label.configure(text=f"Downloading (VoD): {cf}"))
-                        elif file_progress_str:
-                            self.root.after(0, lambda cf=current_file, fps=file_progress_str: self.current_file_label.configure(text=f"Downloading: {cf} ({fps})"))
-                        else:
-                            self.root.after(0, lambda cf=current_file: self.current_file_label.configure(text=f"Downloading: {cf}"))
-                    
-                    def cancellation_check():
-                        return not self.is_downloading
-                    
-                    download_content(
-                        username, password, selected_types, progress_callback, cancellation_check,
-                        self.output_folder, "type", True, False, False  # Default organization settings
-                    )
-                
-                completed_courses += 1
-                
-                # Update overall progress
-                overall_progress = completed_courses / total_courses
-                self.root.after(0, lambda p=overall_progress: self.progress_bar.set(p))
-                self.root.after(0, lambda p=overall_progress: self.progress_text.configure(text=f"{int(p * 100)}% of courses complete"))
-            
-            # Download completed
-            if self.is_downloading:
-                self.root.after(0, self.download_all_completed)
-        except Exception as e:
-            if self.is_downloading:
-                self.root.after(0, lambda e=e: self.download_error(str(e)))
+        def on_course_done(job, result):
+            self.course_trackers.pop(job.course.name, None)
+            course_finished()
+        
+        def cancellation_check():
+            return not self.is_downloading
+        
+        jobs = []
+        for course in courses:
+            course_ref = main.find_course(username, password, course)
+            if course_ref is None:
+                course_finished()
+                continue
+            # With "vods" only VOD-related types are downloaded; courses without any are skipped
+            jobs.append(main.CourseJob(course_ref, vods_only=(content_type_choice == "vods")))
+        
+        main.download_courses(
+            username, password, jobs, progress_for, on_course_done, cancellation_check,
+            output_folder=self.output_folder, org_mode="type", include_week=True,
+            include_type=False, include_week_description=False,  # Default organization settings
+            vod_quality=VOD_QUALITIES[self.vod_quality]
+        )
     
     def download_all_completed(self):
         """Handle completion of downloading all courses"""
+        self.stop_progress_polling()
+        self.write_run_report()
         # Stop the spinner animation
         self.loading_spinner.stop_animation()
         
         self.progress_bar.set(1.0)
         self.progress_text.configure(text="100% Complete")
-        self.current_file_label.configure(text="All courses downloaded successfully!")
+        self.current_file_label.configure(text="All courses downloaded successfully!" + self.describe_run_problems())
         
         # Show completion message and return to courses page
         self.root.after(3000, lambda: self.show_page(1))
     
+    def set_vod_quality(self, choice):
+        """Remember the VoD quality picked in either dropdown and show it in the other"""
+        self.vod_quality = choice
+        if hasattr(self, 'vod_quality_dropdown'):
+            self.vod_quality_dropdown.set(choice)
+    
     def show_download_all_confirmation(self, courses):
         """Show confirmation dialog for downloading all courses"""
         # Create popup window
@@ -931,6 +1037,21 @@ class ModernCMSDownloader:
         )
         vods_only_radio.pack(pady=(0, 15), anchor="w")
         
+        vod_quality_label = ctk.CTkLabel(
+            master=main_container,
+            text="VoD quality:",
+            font=ctk.CTkFont(size=12, weight="bold"),
+            anchor="w"
+        )
+        vod_quality_label.pack(pady=(0, 5), anchor="w")
+        vod_quality_dropdown = ctk.CTkOptionMenu(
+            master=main_container,
+            values=list(VOD_QUALITIES),
+            command=self.set_vod_quality
+        )
+        vod_quality_dropdown.set(self.vod_quality)
+        vod_quality_dropdown.pack(pady=(0, 15), anchor="w")
+        
         # Scrollable list of courses
         courses_label = ctk.CTkLabel(
             master=main_container,
@@ -1064,11 +1185,44 @@ class ModernCMSDownloader:
         return [os.getenv("USERNAME", ""), os.getenv("PASSWORD", "")]
     
     def update_courses(self, username, password):
-        """Update course list"""
-        all_courses = get_courses(username, password)
-        
+        """
+        Fill the course dropdown without waiting for the CMS.
+
+        The last known catalogue (the on-disk snapshot) is shown right away and
+        revalidated in the background; without a snapshot the dropdown shows a
+        loading state until the course list arrives.
+        """
+        snapshot = load_catalogue_snapshot(username)
+        if snapshot is not None and snapshot.by_season:
+            self.show_courses(snapshot.course_options())
+            self.tasks.submit("courses", lambda: backend().get_courses(username, password, refresh=True),
+                              on_done=self.merge_courses)
+            return
+        self.course_select.configure(values=[COURSES_LOADING])
+        self.course_select.set(COURSES_LOADING)
+        self.next_button.configure(state="disabled")
+        self.download_all_button.configure(state="disabled")
+        self.tasks.submit("courses", lambda: backend().get_courses(username, password),
+                          on_done=self.show_courses, on_error=lambda e: self.show_courses([]))
+    
+    def merge_courses(self, all_courses):
+        """Apply a refreshed course list, keeping the current selection if it is still listed"""
+        if not all_courses:
+            return  # The refresh failed; keep showing the last known list
+        if ["All Courses"] + all_courses == self.course_options:
+            return  # Unchanged, nothing to redraw
+        selection = self.course_select.get()
+        self.show_courses(all_courses)
+        if selection in self.course_options:
+            self.course_select.set(selection)
+            self.on_course_selection(selection)
+    
+    def show_courses(self, all_courses):
+        """Fill the course dropdown"""
+        self.download_all_button.configure(state="normal")
         # Add "All Courses" option at the beginning
         course_options = ["All Courses"] + all_courses
+        self.course_options = course_options
         self.course_select.configure(values=course_options)
         
         # Set initial selection to first actual course (not session header)
@@ -1089,11 +1243,30 @@ class ModernCMSDownloader:
         # Use after() to schedule focus change after the current event is processed
         self.root.after(10, self._clear_focus)
     
-    def render_checkboxes(self):
-        """Render checkboxes for content types"""
-        username, password = self.get_credentials()
-        get_types_output = get_types(username, password)
+    def load_course(self, username, password, course_name):
+        """Look a course up and fetch its content types (runs on a background task)"""
+        main = backend()
+        course = main.find_course(username, password, course_name)
+        if course is None:
+            return None, {'types': [], 'course_name': 'Course not found'}
+        return course, main.get_types(username, password, course)
+    
+    def show_course_loading(self, course_name):
+        """Show the download page in its loading state while load_course runs"""
+        self.selected_course = None
+        self.course_title_label.configure(text=f"Loading {course_name}...")
+        for widget in self.checkboxes_container.winfo_children():
+            widget.destroy()
+        self.checkboxes = {}
+        self.download_button.configure(state="disabled")
+    
+    def render_checkboxes(self, loaded):
+        """Render checkboxes for the content types of a course, given load_course's (course, types)"""
+        self.selected_course, get_types_output = loaded
         all_types = get_types_output.get('types', [])
+        # Nothing to download if the course could not be loaded
+        can_download = self.selected_course is not None and bool(all_types)
+        self.download_button.configure(state="normal" if can_download else "disabled")
         course_name = get_types_output.get('course_name', 'Unknown Course')
         
         # Update course title
@@ -1118,12 +1291,9 @@ class ModernCMSDownloader:
     
     def get_selected_types(self):
         """Get selected content types"""
-        username, password = self.get_credentials()
         selected = []
-        get_types_output = get_types(username, password)
-        all_types = get_types_output.get('types', [])
-        
-        for content_type in all_types:
+        # The checkboxes were rendered from the parsed course page, so no refetch is needed
+        for content_type in self.checkboxes:
             if self.checkboxes.get(content_type) and self.checkboxes[content_type].get() == 1:
                 selected.append(content_type)
         return selected
@@ -1137,25 +1307,24 @@ class ModernCMSDownloader:
             self.show_error("Please enter both username and password")
             return
         
-        # Show loading state
+        # Show loading state while the login request runs
         self.login_button.configure(text="Signing In...", state="disabled")
-        self.root.update()
-        
-        # Try login
-        login_state = login(username=username, password=password)
-        
+        self.tasks.submit("login", lambda: backend().login(username, password),
+                          on_done=lambda login_state: self.login_finished(username, password, login_state),
+                          on_error=lambda e: self.login_finished(username, password, False))
+    
+    def login_finished(self, username, password, login_state):
+        """Continue to the courses page after a successful login"""
+        self.login_button.configure(text="Sign In", state="normal")
         if login_state:
             # Save credentials to .env
             set_key(".env", "USERNAME", username)
             set_key(".env", "PASSWORD", password)
             load_dotenv(override=True)
+            self.show_page(1)
             self.update_courses(username, password)
-            self.next_page(self.course_select.get())
         else:
             self.show_error("Invalid credentials. Please try again.")
-        
-        # Reset button
-        self.login_button.configure(text="Sign In", state="normal")
     
     def show_error(self, message):
         """Show error message"""
@@ -1165,6 +1334,8 @@ class ModernCMSDownloader:
     
     def start_download(self):
         """Start the download process"""
+        if self.selected_course is None:
+            return
         selected_types = self.get_selected_types()
         
         if not selected_types:
@@ -1187,19 +1358,25 @@ class ModernCMSDownloader:
         # Start the loading spinner animation
         self.loading_spinner.start_animation()
         
-        # Start download in separate thread
+        # Start the download in the background
+        from http_policy import run_stats
         self.is_downloading = True
-        self.current_download_thread = threading.Thread(
-            target=self.download_thread,
-            args=(
-                selected_types,
-                self.org_mode,
-                self.week_toggle_var.get(),
-                self.type_toggle_var.get(),
-                self.week_description_toggle_var.get()  # Pass new toggle value
-            )
-        )
-        self.current_download_thread.start()
+        run_stats.reset()
+        if RUN_REPORT_PATH:
+            timing.start_run()
+        self.progress_tracker = ProgressTracker()
+        self.course_trackers = None
+        self.tasks.submit(
+            "download", self.download_thread,
+            selected_types,
+            self.org_mode,
+            self.week_toggle_var.get(),
+            self.type_toggle_var.get(),
+            self.week_description_toggle_var.get(),
+            on_done=self.download_finished,
+            on_error=self.download_failed
+        )
+        self.start_progress_polling()
     
     def show_no_filters_popup(self):
         """Show popup dialog when no filters are selected"""
@@ -1263,63 +1440,136 @@ class ModernCMSDownloader:
         popup.wait_window()
     
     def download_thread(self, selected_types, org_mode, include_week, include_type, include_week_description=False):
-        """Download thread to prevent GUI freezing"""
+        """Downloads the selected course on a background task, so the GUI does not freeze"""
         username, password = self.get_credentials()
         
-        # Get total files before starting download
-        total_files = get_total_files(username, password, selected_types)
-        self.root.after(0, lambda: self.file_counter.configure(text=f"0 of {total_files} files downloaded"))
-        
-        def progress_callback(downloaded, total, current_file, file_progress_str=None):
-            if not self.is_downloading:
-                return
-            # Update progress on main thread
-            self.root.after(0, lambda: self.update_progress(downloaded, total, current_file, file_progress_str))
-        
         def cancellation_check():
             return not self.is_downloading
         
-        try:
-            download_content(
-                username, password, selected_types, progress_callback, cancellation_check,
-                self.output_folder, org_mode, include_week, include_type, include_week_description
-            )
-            
-            # Download completed
-            if self.is_downloading:
-                self.root.after(0, self.download_completed)
-        except Exception as e:
-            if self.is_downloading:
-                self.root.after(0, lambda e=e: self.download_error(str(e)))
+        return backend().download_content(
+            username, password, self.selected_course, selected_types, None, cancellation_check,
+            self.output_folder, org_mode, include_week, include_type, include_week_description,
+            progress_tracker=self.progress_tracker, vod_quality=VOD_QUALITIES[self.vod_quality]
+        )
+    
+    def download_finished(self, result):
+        """Handle the result of download_thread"""
+        # Download refused (e.g. not enough disk space) or completed
+        if isinstance(result, dict) and not result.get('success', True):
+            self.download_error(result.get('error', "Could not load the course page"))
+        elif self.is_downloading:
+            self.download_completed()
+    
+    def download_failed(self, error):
+        """Handle an exception raised by a download task"""
+        if self.is_downloading:
+            self.download_error(str(error))
     
-    def update_progress(self, downloaded, total, current_file, file_progress_str=None):
+    def start_progress_polling(self):
+        """Redraw download progress at a fixed rate until stop_progress_polling"""
+        self.stop_progress_polling()
+        self.progress_poll_job = self.root.after(PROGRESS_POLL_MS, self.poll_progress)
+    
+    def stop_progress_polling(self):
+        if self.progress_poll_job is not None:
+            self.root.after_cancel(self.progress_poll_job)
+            self.progress_poll_job = None
+    
+    def poll_progress(self):
+        """Redraw download progress from the tracker, then reschedule while downloading"""
+        self.progress_poll_job = None
+        if not self.is_downloading:
+            return
+        if self.course_trackers is not None:
+            self.update_all_courses_progress()
+        elif self.progress_tracker is not None:
+            self.update_progress(self.progress_tracker.snapshot())
+        self.progress_poll_job = self.root.after(PROGRESS_POLL_MS, self.poll_progress)
+    
+    def update_progress(self, snapshot):
         """Update progress bar and labels, including per-file progress if available"""
+        downloaded, total = snapshot['files_done'], snapshot['total_files']
+        rate_text = self.format_rate(snapshot['rate']) + self.format_eta(snapshot['eta'])
         if total > 0:
-            progress = downloaded / total
+            # Weighted by planned bytes once the course is planned, by file count before
+            progress = snapshot['fraction'] if snapshot['fraction'] is not None else downloaded / total
             self.progress_bar.set(progress)
-            self.progress_text.configure(text=f"{int(progress * 100)}% Complete")
-            self.file_counter.configure(text=f"{downloaded} of {total} files downloaded")
-            if file_progress_str == "VoD":
-                self.current_file_label.configure(text=f"Downloading (VoD): {current_file}")
-            elif file_progress_str:
-                self.current_file_label.configure(text=f"Downloading: {current_file} ({file_progress_str})")
-            else:
-                self.current_file_label.configure(text=f"Downloading: {current_file}")
+            self.set_label_text(self.progress_text, f"{int(progress * 100)}% Complete")
+            self.set_label_text(self.file_counter, f"{downloaded} of {total} files downloaded{rate_text}")
+        if snapshot['current_file'] is not None:
+            self.set_label_text(self.current_file_label, self.describe_current_file(snapshot))
+    
+    def update_all_courses_progress(self):
+        """Show course progress on the bar and one line per course that is downloading"""
+        total_courses = max(self.courses_total, 1)
+        progress = self.courses_done / total_courses
+        self.progress_bar.set(progress)
+        self.set_label_text(self.progress_text, f"{int(progress * 100)}% of courses complete")
+        
+        snapshots = [(course, tracker.snapshot()) for course, tracker in list(self.course_trackers.items())]
+        files_done = sum(snapshot['files_done'] for _, snapshot in snapshots)
+        total_files = sum(snapshot['total_files'] for _, snapshot in snapshots)
+        rate_text = self.format_rate(sum(snapshot['rate'] for _, snapshot in snapshots))
+        self.set_label_text(
+            self.file_counter,
+            f"{self.courses_done} of {self.courses_total} courses done - "
+            f"{len(snapshots)} in progress ({files_done} of {total_files} files){rate_text}"
+        )
+        lines = [f"{course}: {self.describe_current_file(snapshot)}" for course, snapshot in snapshots if snapshot['current_file']]
+        if lines:
+            self.set_label_text(self.current_file_label, "\n".join(lines))
+    
+    def describe_current_file(self, snapshot):
+        current_file, file_progress_str = snapshot['current_file'], snapshot['status']
+        if file_progress_str == "VoD":
+            return f"Downloading (VoD): {current_file}"
+        if file_progress_str:
+            return f"Downloading: {current_file} ({file_progress_str})"
+        return f"Downloading: {current_file}"
+    
+    def format_rate(self, rate):
+        return f" - {rate/1024/1024:.1f} MB/s" if rate >= 1024 else ""
+    
+    def format_eta(self, eta):
+        return f" - {format_duration(eta)} left" if eta is not None else ""
+    
+    def set_label_text(self, label, text):
+        """Configure a label only when its text changes, to avoid needless redraws"""
+        if label.cget("text") != text:
+            label.configure(text=text)
     
     def download_completed(self):
         """Handle download completion"""
+        self.stop_progress_polling()
+        self.write_run_report()
         # Stop the spinner animation
         self.loading_spinner.stop_animation()
         
         self.progress_bar.set(1.0)
         self.progress_text.configure(text="100% Complete")
-        self.current_file_label.configure(text="Download completed successfully!")
+        self.current_file_label.configure(text="Download completed successfully!" + self.describe_run_problems())
         
         # Show completion message and return to download page
         self.root.after(2000, lambda: self.show_page(2))
     
+    def write_run_report(self):
+        """Write the timing report of the finished run to RUN_REPORT_PATH, if it was timed"""
+        report = timing.finish_run()
+        if report is not None:
+            print(timing.write_report(report, RUN_REPORT_PATH) or f"Run report written to {RUN_REPORT_PATH}")
+    
+    def describe_run_problems(self):
+        """Retry/failure counts of the finished run for the completion message, or "" if all went smoothly"""
+        from http_policy import run_stats
+        counts = run_stats.snapshot()
+        if not (counts['retries'] or counts['failed_downloads'] or counts['breaker_trips']):
+            return ""
+        return f"\n{counts['failed_downloads']} files failed, {counts['retries']} retries"
+    
     def download_error(self, error_message):
         """Handle download error"""
+        self.stop_progress_polling()
+        self.write_run_report()
         # Stop the spinner animation
         self.loading_spinner.stop_animation()
         
@@ -1328,10 +1578,14 @@ class ModernCMSDownloader:
     
     def cancel_download(self):
         """Cancel the current download"""
+        self.stop_progress_polling()
         # Stop the spinner animation
         self.loading_spinner.stop_animation()
         
         self.is_downloading = False
+        self.tasks.cancel("download")
+        # Discard the timing of the cancelled run so it does not leak into the next report
+        timing.finish_run()
         self.current_file_label.configure(text="Download cancelled")
         # Immediately return to download page since cancellation is now properly handled
         self.show_page(2)
@@ -1351,6 +1605,8 @@ class ModernCMSDownloader:
 
     def on_course_selection(self, selection):
         """Handle course selection from dropdown"""
+        if selection == COURSES_LOADING:
+            return
         # Check if the selection is a session header
         if selection.startswith("---") and selection.endswith("---"):
             # Disable the continue button for session headers
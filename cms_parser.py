@@ -0,0 +1,311 @@
+import os
+import re
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser, LexborNode
+except ImportError:  # selectolax is optional; BeautifulSoup is always available
+    LexborHTMLParser = LexborNode = None
+
+# "auto" (selectolax if installed), "selectolax" or "bs4"
+PARSER_BACKEND = os.environ.get("CMS_HTML_PARSER", "auto")
+
+COURSE_NAME_LABEL = "#ContentPlaceHolderright_ContentPlaceHoldercontent_LabelCourseName"
+SEASON_CARD = "div.card-hover-shadow.profile-responsive.card-border.mb-3.card"
+
+# "(|CSEN 701|) Embedded Systems (1234)": code and name, ignoring all bracketed content at the end
+COURSE_NAME_RE = re.compile(r"\(\|([A-Za-z0-9 ]+)\|\)\s*([^(]+?)(?:\s*\([^)]*\))*$")
+TRAILING_BRACKETS_RE = re.compile(r"\s*\([^)]*\)\s*$")
+WHITESPACE_RE = re.compile(r"\s+")
+LECTURE_NUMBER_RE = re.compile(r"^\d+\s*-\s*")
+
+
+def clean_course_name(course_name):
+    """Turns a CMS course label like "(|CSEN 701|) Embedded Systems (1234)" into "Embedded Systems (CSEN 701)"."""
+    match = COURSE_NAME_RE.match(course_name)
+    if match:
+        code = match.group(1).strip()
+        name = match.group(2).strip()
+        # Format as "Course Name (CODE)" for consistency
+        clean_name = f"{name} ({code})" if code else name
+    else:
+        # fallback: remove last bracketed number if present
+        clean_name = TRAILING_BRACKETS_RE.sub("", course_name).strip()
+    # Normalize whitespace to a single space
+    return WHITESPACE_RE.sub(" ", clean_name)
+
+
+def content_type_of(title_line):
+    """Returns the content type of a card, taken from the last set of parentheses of its title line."""
+    last_open = title_line.rfind("(")
+    last_close = title_line.rfind(")")
+    if last_open != -1 and last_close != -1 and last_close > last_open:
+        return title_line[last_open + 1 : last_close]
+    return title_line
+
+
+class ContentItem:
+    """
+    One content card of a course page.
+
+    Attributes:
+        id (str): Id of the card's div[id^=content], or None.
+        type (str): Content type, e.g. "Lecture slides" or "VoD".
+        week (int): Week number (1 = oldest week), or None if the card is outside the weeks.
+        title (str): Lecture title without its "3 - " numbering, or None if the card has none.
+        href (str): Download link, or None.
+        vod_id (str): Id of the VoD button, or None.
+    """
+    __slots__ = ("id", "type", "week", "title", "href", "vod_id")
+
+    def __init__(self, id, type, week, title, href, vod_id):
+        self.id = id
+        self.type = type
+        self.week = week
+        self.title = title
+        self.href = href
+        self.vod_id = vod_id
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return isinstance(other, ContentItem) and self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        return f"ContentItem({self.as_dict()!r})"
+
+
+class Bs4Backend:
+    """Parses with BeautifulSoup's pure-Python html.parser."""
+    name = "bs4"
+
+    def parse(self, html):
+        return BeautifulSoup(html, 'html.parser')
+
+    def select(self, node, css):
+        return node.select(css)
+
+    def select_one(self, node, css):
+        return node.select_one(css)
+
+    def text(self, node, separator="", strip=False):
+        return node.get_text(separator, strip=strip)
+
+    def attr(self, node, name):
+        value = node.get(name)
+        # Multi-valued attributes (class) come back as lists
+        return " ".join(value) if isinstance(value, list) else value
+
+    def tag(self, node):
+        return node.name
+
+    def parent(self, node):
+        return node.parent
+
+
+class SelectolaxBackend:
+    """Parses with selectolax's lexbor engine (C, HTML5 tree building)."""
+    name = "selectolax"
+
+    def parse(self, html):
+        tree = LexborHTMLParser(html)
+        # BeautifulSoup leaves script and style contents out of get_text()
+        tree.strip_tags(["script", "style"])
+        return tree
+
+    def select(self, node, css):
+        found = node.css(css)
+        # Unlike soupsieve, lexbor lets a node match its own selector; it comes first.
+        # Releases without mem_id (before selectolax 0.3.17) never return the node itself
+        if (found and isinstance(node, LexborNode) and hasattr(node, "mem_id")
+                and found[0].mem_id == node.mem_id):
+            found = found[1:]
+        return found
+
+    def select_one(self, node, css):
+        found = self.select(node, css)
+        return found[0] if found else None
+
+    def text(self, node, separator="", strip=False):
+        if not strip:
+            return node.text(deep=True)
+        # Match get_text(strip=True): strip every string and drop the empty ones
+        parts = node.text(deep=True, separator="\x00").split("\x00")
+        return separator.join(part.strip() for part in parts if part.strip())
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+    def tag(self, node):
+        return node.tag
+
+    def parent(self, node):
+        return node.parent
+
+
+BACKENDS = {"bs4": Bs4Backend(), "selectolax": SelectolaxBackend()}
+
+
+def get_backend(name=None):
+    """
+    Returns a parser backend by name.
+
+    Args:
+        name (str): "bs4", "selectolax" or "auto". Defaults to PARSER_BACKEND.
+
+    Returns:
+        The backend. "auto" and "selectolax" fall back to BeautifulSoup when
+        selectolax is not installed.
+    """
+    name = name or PARSER_BACKEND
+    if name in ("auto", "selectolax"):
+        return BACKENDS["selectolax"] if LexborHTMLParser is not None else BACKENDS["bs4"]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend: {name}")
+    return BACKENDS[name]
+
+
+def _find_parent(backend, node, predicate):
+    node = backend.parent(node)
+    while node is not None:
+        if predicate(node):
+            return node
+        node = backend.parent(node)
+    return None
+
+
+def parse_catalogue(html_content, backend=None):
+    """
+    Extracts the season cards and course rows of ViewAllCourseStn.
+
+    Args:
+        html_content (str): The page HTML.
+        backend (str): Parser backend name (see get_backend).
+
+    Returns:
+        dict: Season titles mapped to lists of {'name', 'id', 'sid'} course dictionaries.
+    """
+    b = get_backend(backend)
+    tree = b.parse(html_content)
+    all_courses_by_season = {}
+
+    for card in b.select(tree, SEASON_CARD):
+        season_title_div = b.select_one(card, "div.menu-header-title")
+        if season_title_div is not None:
+            season_title = b.text(season_title_div, strip=True).replace('Season :', '').replace('Title:', '').strip()
+            # Replace comma with dash for better folder naming
+            season_title = season_title.replace(',', ' -')
+            # Normalize whitespace in season/session name
+            season_title = WHITESPACE_RE.sub(" ", season_title)
+        else:
+            # Fallback if the specific div is not found, though it should be present
+            season_title = "Unknown Season"
+
+        table = b.select_one(card, "table.table")
+        if table is None:
+            continue
+
+        rows = b.select(table, "tbody tr") or b.select(table, "tr")
+        # Headers come from <thead>, or from the first row if there is none
+        header_row = b.select_one(table, "thead tr")
+        if header_row is None:
+            if not rows:
+                continue  # No rows found, skip this season
+            header_row, rows = rows[0], rows[1:]
+        else:
+            rows = [row for row in rows if not _find_parent(b, row, lambda node: b.tag(node) == "thead")]
+        headers = [b.text(element, strip=True) for element in b.select(header_row, "th, td")]
+
+        name_index = -1
+        id_index = -1
+        season_id_index = -1
+        for i, header in enumerate(headers):
+            if 'Name' in header: # Use 'in' for more robustness
+                name_index = i
+            elif 'ID' in header and not 'SeasonId' in header: # Ensure it's the course ID
+                id_index = i
+            elif 'SeasonId' in header:
+                season_id_index = i
+
+        courses = []
+        for row in rows:
+            cols = b.select(row, "td")
+            # Ensure there are enough columns to extract data
+            if len(cols) <= max(name_index, id_index, season_id_index):
+                continue
+            course_full_name = b.text(cols[name_index], " ", strip=True) if name_index != -1 else 'N/A'
+            courses.append({
+                'name': clean_course_name(course_full_name),
+                'id': b.text(cols[id_index], strip=True) if id_index != -1 else 'N/A',
+                'sid': b.text(cols[season_id_index], strip=True) if season_id_index != -1 else 'N/A',
+            })
+        if season_title: # Only add if a valid season title was found
+            all_courses_by_season[season_title] = courses
+
+    return all_courses_by_season
+
+
+def _is_hidden(backend, node):
+    return backend.tag(node) == "div" and backend.attr(node, "style") == "display:none;"
+
+
+def parse_course_html(html, backend=None):
+    """
+    Extracts the course name and content cards of CourseViewStn.aspx in one parse.
+
+    Only the values the downloader uses are kept, so the parse tree can be
+    dropped as soon as this returns.
+
+    Args:
+        html (str): The page HTML.
+        backend (str): Parser backend name (see get_backend).
+
+    Returns:
+        dict: {'course_name': cleaned course name,
+               'week_descriptions': descriptions of the weeks, oldest first,
+               'items': ContentItem list in page order},
+              or None if the page has no course name label (not a course page).
+    """
+    b = get_backend(backend)
+    tree = b.parse(html)
+
+    label = b.select_one(tree, COURSE_NAME_LABEL)
+    if label is None:
+        return None
+
+    week_descriptions = []
+    content_to_week_map = {}
+    # Weeks in HTML are newest to oldest, reverse for chronological order
+    for week_number, week_div in enumerate(reversed(b.select(tree, ".card.mb-5.weeksdata")), 1):
+        # The description <p> tag is the one not inside a div with style="display:none;"
+        description_text = "No Description"
+        for p_tag in b.select(week_div, "p.m-2.p2"):
+            if not _find_parent(b, p_tag, lambda node: _is_hidden(b, node)):
+                description_text = b.text(p_tag).strip()
+                break
+        week_descriptions.append(description_text)
+        for item in b.select(week_div, "div[id^=content]"):
+            content_to_week_map[b.attr(item, "id")] = week_number
+
+    items = []
+    for card in b.select(tree, ".card-body"):
+        first_div = b.select_one(card, "div")
+        if first_div is None:
+            continue
+        content_div = b.select_one(card, "div[id^=content]")
+        title_tag = b.select_one(card, "div strong")
+        link_tag = b.select_one(card, "a")
+        vod_input = b.select_one(card, "input.vodbutton")
+        content_id = b.attr(content_div, "id") if content_div is not None else None
+        items.append(ContentItem(
+            content_id,
+            content_type_of(b.text(first_div).strip().split("\n")[0]),
+            content_to_week_map.get(content_id),
+            LECTURE_NUMBER_RE.sub("", b.text(title_tag)).strip() if title_tag is not None else None,
+            b.attr(link_tag, "href") if link_tag is not None else None,
+            b.attr(vod_input, "id") if vod_input is not None else None,
+        ))
+
+    return {'course_name': clean_course_name(b.text(label)), 'week_descriptions': week_descriptions, 'items': items}
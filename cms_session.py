@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+
+import timing
+
+# Size of the keep-alive connection pool kept per host. NTLM authenticates the
+# TCP connection itself, so every pooled connection only handshakes once.
+POOL_SIZE = 16
+
+# Base URLs of the CMS and of the login check. Both can be pointed at a
+# stand-in server (see benchmarks/fake_cms.py) through the environment.
+CMS_URL = os.environ.get("CMS_URL", "https://cms.guc.edu.eg").rstrip("/")
+LOGIN_URL = os.environ.get("CMS_LOGIN_URL", "https://apps.guc.edu.eg/student_ext/Console.aspx")
+
+# Where snapshots and other small state files are kept between runs
+CACHE_DIR = os.environ.get("CMS_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".guc-cms-downloader")
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def ntlm_user(username):
+    """Return the NTLM principal used by the CMS for a GUC username."""
+    return username.strip() + "@student.guc.edu.eg"
+
+
+def _build_session(username, password):
+    # requests and requests_ntlm are imported on first use, so that reading
+    # CACHE_DIR or CMS_URL (e.g. the GUI's catalogue snapshot at start-up) stays cheap
+    from requests_ntlm import HttpNtlmAuth
+    from http_policy import build_session
+
+    auth = HttpNtlmAuth(ntlm_user(username), password)
+    handshake = auth.retry_using_http_NTLM_auth
+
+    def timed_handshake(*args, **kwargs):
+        # Each new connection's NTLM negotiation is the "ntlm.handshake" phase
+        with timing.span("ntlm.handshake"):
+            return handshake(*args, **kwargs)
+
+    auth.retry_using_http_NTLM_auth = timed_handshake
+    return build_session(auth, POOL_SIZE)
+
+
+def get_session(username, password):
+    """
+    Returns the shared, authenticated keep-alive session for a user.
+
+    The session is created on first use and reused by every page and file
+    request afterwards, so connections (and their NTLM handshakes) are pooled
+    instead of being rebuilt for each call. A new session is created if the
+    password changes. Requests get the timeouts, retries and circuit breaker
+    of http_policy.
+
+    Args:
+        username (str): GUC username.
+        password (str): GUC password.
+
+    Returns:
+        requests.Session: The pooled session for this user.
+    """
+    key = username.strip()
+    with _sessions_lock:
+        entry = _sessions.get(key)
+        if entry is None or entry[0] != password:
+            if entry is not None:
+                entry[1].close()
+            entry = (password, _build_session(username, password))
+            _sessions[key] = entry
+        return entry[1]
+
+
+def close_session(username):
+    """Close and forget the pooled session of a user (e.g. on log out)."""
+    with _sessions_lock:
+        entry = _sessions.pop(username.strip(), None)
+    if entry is not None:
+        entry[1].close()
+
+
+def cache_path(filename):
+    """Return the path of a file inside CACHE_DIR, creating the folder if needed."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, filename)
+
+
+def write_json_file(path, data):
+    """
+    Writes data to path as JSON, replacing the file in one step.
+
+    The JSON goes to a temporary file with a unique name next to path first,
+    so concurrent writers of the same file never truncate each other's output.
+
+    Raises:
+        OSError: The file could not be written.
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _page_cache_file(username, url):
+    user_folder = re.sub(r"[^A-Za-z0-9._-]", "_", username.strip().lower())
+    digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    folder = os.path.join(CACHE_DIR, "pages", user_folder)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, digest + ".json")
+
+
+def fetch_page(username, password, url):
+    """
+    Fetches a CMS page with a conditional GET.
+
+    The ETag/Last-Modified validators and body of every successful response are
+    kept on disk per user and sent back as If-None-Match/If-Modified-Since on the
+    next request for the same URL. When the server answers 304 Not Modified the
+    stored body is returned instead, so callers can also skip re-parsing a page
+    they still hold in memory.
+
+    Args:
+        username (str): GUC username.
+        password (str): GUC password.
+        url (str): Absolute URL of the page.
+
+    Returns:
+        tuple: (response, text). response.status_code is 304 when the cached body
+               was reused; text is None when the request failed.
+    """
+    cache_file = _page_cache_file(username, url)
+    cached = None
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    headers = {}
+    if cached:
+        if cached.get('etag'):
+            headers['If-None-Match'] = cached['etag']
+        if cached.get('last_modified'):
+            headers['If-Modified-Since'] = cached['last_modified']
+
+    with timing.span("page.fetch", url):
+        resp = get_session(username, password).get(url, headers=headers)
+    if resp.status_code == 304 and cached:
+        return resp, cached['body']
+    if resp.status_code != 200:
+        return resp, None
+
+    etag = resp.headers.get('etag')
+    last_modified = resp.headers.get('last-modified')
+    if etag or last_modified:
+        try:
+            write_json_file(cache_file, {'url': url, 'etag': etag, 'last_modified': last_modified, 'body': resp.text})
+        except OSError as e:
+            print(f"Could not cache page {url}: {e}")
+    return resp, resp.text
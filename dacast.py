@@ -0,0 +1,195 @@
+import json
+import os
+import re
+import threading
+import time
+
+import requests
+
+from cms_session import cache_path
+from http_policy import get_plain_session
+
+# Dacast playback API; overridable like the CMS URLs in cms_session
+DACAST_URL = os.environ.get("DACAST_URL", "https://playback.dacast.com").rstrip("/")
+
+# Resolutions shared by every user, in CACHE_DIR
+CACHE_FILENAME = "dacast.json"
+# HLS URLs without a recognizable expiry are reused for this long
+HLS_URL_TTL = 6 * 3600
+# A signed HLS URL is dropped this long before it expires, so a download started
+# from it does not outlive the signature
+HLS_URL_MARGIN = 30 * 60
+# Expiry timestamps of signed URLs, e.g. "?exp=1735689600" or "hdnts=exp=1735689600~acl=..."
+EXPIRY_RE = re.compile(r"(?:^|[?&~;,/=])(?:exp|expires|Expires)=(\d{10})(?!\d)")
+
+
+def hls_url_expiry(url, now=None):
+    """
+    When a resolved HLS URL should no longer be used.
+
+    Returns:
+        float: Unix time: HLS_URL_MARGIN before the expiry signed into the URL,
+               but at most HLS_URL_TTL from now.
+    """
+    now = time.time() if now is None else now
+    expires = now + HLS_URL_TTL
+    match = EXPIRY_RE.search(url)
+    if match:
+        expires = min(expires, int(match.group(1)) - HLS_URL_MARGIN)
+    return expires
+
+
+class DacastClient:
+    """
+    Resolves GUC CMS video contentIds to Dacast HLS URLs, remembering the answers on disk.
+
+    Short "_"-style content IDs are expanded through content/info; the long ID
+    never changes, so that mapping is kept for good. HLS URLs from
+    content/access are kept until hls_url_expiry. Both requests go through the
+    pooled session shared with other third-party calls and need no GUC
+    authentication.
+
+    The cache is shared by the resolve workers, so all access goes through a
+    single lock.
+    """
+
+    def __init__(self, base_url=DACAST_URL, cache_file=None, session=None):
+        self.base_url = base_url
+        self.cache_file = cache_file
+        self.session = session
+        self._lock = threading.Lock()
+        self._cache = None  # {'content_ids': {short: long}, 'hls': {long: {'url', 'expires'}}}, loaded on first use
+
+    def _get(self, url):
+        return (self.session or get_plain_session()).get(url)
+
+    def _load(self):
+        """Reads the cache file once; must be called with the lock held."""
+        if self._cache is not None:
+            return self._cache
+        if self.cache_file is None:
+            self.cache_file = cache_path(CACHE_FILENAME)
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._cache = {'content_ids': dict(data['content_ids']), 'hls': dict(data['hls'])}
+        except (OSError, ValueError, KeyError, TypeError):
+            self._cache = {'content_ids': {}, 'hls': {}}
+        return self._cache
+
+    def _save(self):
+        """Writes the cache file without its expired HLS URLs; must be called with the lock held."""
+        now = time.time()
+        cache = self._cache
+        cache['hls'] = {key: entry for key, entry in cache['hls'].items() if entry['expires'] > now}
+        tmp_path = self.cache_file + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(cache, f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            print(f"Could not save the Dacast cache: {e}")
+
+    def content_id(self, content_id):
+        """
+        Expands a short "_"-style content ID to the ID the access API expects.
+
+        Returns:
+            str: The long content ID (content_id itself if it is not short), or None on failure.
+        """
+        if '_' not in content_id or len(content_id) >= 50:
+            return content_id
+        with self._lock:
+            cached = self._load()['content_ids'].get(content_id)
+        if cached:
+            return cached
+
+        print("Detected short content ID. Attempting to resolve to actual content ID...")
+        info_url = f"{self.base_url}/content/info?contentId={content_id}&provider=dacast"
+        try:
+            info_resp = self._get(info_url)
+            if info_resp.status_code != 200:
+                print(f"❌ Failed to resolve content ID. Info API returned status: {info_resp.status_code}")
+                return None
+            actual_content_id = info_resp.json().get('contentInfo', {}).get('contentId')
+        except requests.RequestException as e:
+            print(f"❌ An error occurred while resolving content ID: {e}")
+            return None
+        except Exception as e:
+            print(f"❌ An unexpected error occurred while resolving content ID: {e}")
+            return None
+        if not actual_content_id:
+            print("❌ Could not find actual content ID in the response")
+            return None
+        print(f"✅ Successfully resolved content ID: {content_id} -> {actual_content_id}")
+        with self._lock:
+            self._load()['content_ids'][content_id] = actual_content_id
+            self._save()
+        return actual_content_id
+
+    def hls_url(self, content_id, refresh=False):
+        """
+        Returns the HLS URL of a video, from the cache while it is still valid.
+
+        Args:
+            content_id (str): The content ID of the video (the id of its vodbutton), short or long.
+            refresh (bool): Ask Dacast again even if a cached URL is still valid.
+
+        Returns:
+            str: The HLS URL, or None if it could not be resolved.
+        """
+        actual_content_id = self.content_id(content_id)
+        if actual_content_id is None:
+            return None
+        if not refresh:
+            with self._lock:
+                entry = self._load()['hls'].get(actual_content_id)
+            if entry and entry['expires'] > time.time():
+                return entry['url']
+
+        print("Fetching HLS stream URL...")
+        access_url = f"{self.base_url}/content/access?contentId={actual_content_id}&provider=universe"
+        try:
+            hls_resp = self._get(access_url)
+            if hls_resp.status_code != 200:
+                print(f"❌ Failed to get HLS link. Dacast API returned status: {hls_resp.status_code}")
+                print(f"Response content: {hls_resp.text}")
+                return None
+            hls_data = hls_resp.json()
+        except requests.RequestException as e:
+            print(f"❌ An error occurred while fetching HLS URL: {e}")
+            return None
+        except Exception as e:
+            print(f"❌ An unexpected error occurred: {e}")
+            return None
+        hls_url = hls_data.get('hls')
+        if not hls_url:
+            print("❌ API call successful, but no HLS URL was found in the response.")
+            print(f"Response content: {hls_data}")
+            return None
+        print("✅ Successfully obtained HLS URL!")
+        with self._lock:
+            self._load()['hls'][actual_content_id] = {'url': hls_url, 'expires': hls_url_expiry(hls_url)}
+            self._save()
+        return hls_url
+
+    def forget(self, content_id):
+        """Drops the cached HLS URL of a video, e.g. after a download from it failed."""
+        with self._lock:
+            cache = self._load()
+            actual_content_id = cache['content_ids'].get(content_id, content_id)
+            if cache['hls'].pop(actual_content_id, None) is not None:
+                self._save()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the shared DacastClient."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = DacastClient()
+        return _client
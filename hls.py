@@ -0,0 +1,494 @@
+import json
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from operator import attrgetter
+from urllib.parse import urljoin, urlsplit
+
+import http_policy
+import timing
+
+# Segments fetched at once per video
+SEGMENT_WORKERS = 8
+# Fetched segments, keys and init sections are kept in "<target>.segments" until the
+# video is finished, so a failed or cancelled download resumes from them
+SEGMENTS_SUFFIX = ".segments"
+LOCAL_PLAYLIST = "local.m3u8"
+STREAM_FILE = "stream.json"  # Segment paths of the stream a folder belongs to
+SEGMENT_CHUNK_SIZE = 256 * 1024
+PROGRESS_INTERVAL = 0.25  # Minimum seconds between progress reports of a video
+
+ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+# Segments named in ffmpeg's log, by file name ('00012.ts', ".../00012.ts: ...") or media sequence number
+SEGMENT_REFERENCE_RE = re.compile(r"(?:^|[/\\'\"])(\d{5,})\.[A-Za-z0-9]{1,5}\b|segment (\d+) of playlist", re.MULTILINE)
+
+# Rendition policies understood by select_variant, besides "<height>p" and "<kbps>k" limits
+QUALITY_PRESETS = ("best", "smallest", "audio")
+QUALITY_LIMIT_RE = re.compile(r"(\d+)([pk])")
+VIDEO_CODECS = ("avc", "hvc", "hev", "vp0", "vp8", "vp9", "av01", "mp4v")
+
+
+class UnsupportedStream(Exception):
+    """The playlist uses something the segment fetcher does not handle (live streams, byte ranges, SAMPLE-AES, separate audio)."""
+
+
+@dataclass
+class Variant:
+    """One rendition listed by a master playlist."""
+    uri: str
+    bandwidth: int = 0
+    resolution: tuple = None  # (width, height)
+    codecs: str = None
+    audio_only: bool = False  # EXT-X-MEDIA audio rendition, or a stream without video codecs
+    audio_group: str = None  # AUDIO group whose separate playlist carries the sound of this stream
+
+
+@dataclass
+class Segment:
+    """A media segment, with the key and init section (EXT-X-MAP) that apply to it."""
+    index: int
+    uri: str
+    duration: float
+    key: dict = None   # EXT-X-KEY attributes, URI made absolute; None when unencrypted
+    init: str = None   # Absolute URI of the EXT-X-MAP init section
+    discontinuity: bool = False
+
+
+@dataclass
+class MediaPlaylist:
+    url: str
+    segments: list = field(default_factory=list)
+    media_sequence: int = 0
+    target_duration: float = 0.0
+
+    @property
+    def duration(self):
+        return sum(segment.duration for segment in self.segments)
+
+
+def parse_attributes(text):
+    """Parses an attribute list such as 'BANDWIDTH=1280000,RESOLUTION=1280x720,CODECS="avc1,mp4a"'."""
+    return {name: value[1:-1] if value.startswith('"') else value for name, value in ATTRIBUTE_RE.findall(text)}
+
+
+def parse_master_playlist(text, base_url):
+    """
+    Parses the variant streams of a master playlist.
+
+    Args:
+        text (str): Playlist contents.
+        base_url (str): URL the playlist was fetched from, to resolve relative URIs.
+
+    Returns:
+        list: Variant per EXT-X-STREAM-INF and per audio EXT-X-MEDIA with a URI,
+              in playlist order; empty for a media playlist.
+    """
+    variants = []
+    audio_groups = set()  # Groups with at least one rendition in a playlist of its own
+    pending = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("#EXT-X-STREAM-INF:"):
+            pending = parse_attributes(line.partition(":")[2])
+        elif line.startswith("#EXT-X-MEDIA:"):
+            attributes = parse_attributes(line.partition(":")[2])
+            if attributes.get("TYPE") == "AUDIO" and attributes.get("URI"):
+                variants.append(Variant(urljoin(base_url, attributes["URI"]), audio_only=True))
+                audio_groups.add(attributes.get("GROUP-ID"))
+        elif line and not line.startswith("#") and pending is not None:
+            resolution = None
+            width, _, height = pending.get("RESOLUTION", "").partition("x")
+            if width.isdigit() and height.isdigit():
+                resolution = (int(width), int(height))
+            bandwidth = pending.get("BANDWIDTH", "0")
+            codecs = pending.get("CODECS")
+            audio_only = resolution is None and codecs is not None and not any(
+                codec.strip().startswith(VIDEO_CODECS) for codec in codecs.split(","))
+            variants.append(Variant(urljoin(base_url, line), int(bandwidth) if bandwidth.isdigit() else 0,
+                                    resolution, codecs, audio_only, pending.get("AUDIO")))
+            pending = None
+    # EXT-X-MEDIA may follow the streams that refer to it
+    for variant in variants:
+        if variant.audio_group not in audio_groups:
+            variant.audio_group = None
+    return variants
+
+
+def parse_media_playlist(text, url):
+    """
+    Parses the segments of a media playlist.
+
+    Args:
+        text (str): Playlist contents.
+        url (str): URL the playlist was fetched from, to resolve relative URIs.
+
+    Returns:
+        MediaPlaylist: The playlist.
+
+    Raises:
+        UnsupportedStream: The playlist is live (no EXT-X-ENDLIST), uses byte
+                           ranges or is encrypted with anything but AES-128.
+    """
+    playlist = MediaPlaylist(url)
+    key = init = None
+    duration = None
+    discontinuity = False
+    ended = False
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        tag, _, value = line.partition(":")
+        if tag == "#EXTINF":
+            duration = float(value.split(",")[0] or 0)
+        elif tag == "#EXT-X-MEDIA-SEQUENCE":
+            playlist.media_sequence = int(value)
+        elif tag == "#EXT-X-TARGETDURATION":
+            playlist.target_duration = float(value)
+        elif tag == "#EXT-X-DISCONTINUITY":
+            discontinuity = True
+        elif tag == "#EXT-X-ENDLIST":
+            ended = True
+        elif tag == "#EXT-X-BYTERANGE":
+            raise UnsupportedStream("byte range segments")
+        elif tag == "#EXT-X-KEY":
+            attributes = parse_attributes(value)
+            method = attributes.get("METHOD", "NONE")
+            if method == "NONE":
+                key = None
+            elif method == "AES-128":
+                key = dict(attributes, URI=urljoin(url, attributes.get("URI", "")))
+            else:
+                raise UnsupportedStream(f"{method} encryption")
+        elif tag == "#EXT-X-MAP":
+            attributes = parse_attributes(value)
+            if "BYTERANGE" in attributes:
+                raise UnsupportedStream("byte range init section")
+            init = urljoin(url, attributes.get("URI", ""))
+        elif not line.startswith("#"):
+            playlist.segments.append(Segment(len(playlist.segments), urljoin(url, line), duration or 0.0,
+                                             key, init, discontinuity))
+            duration = None
+            discontinuity = False
+    if not ended:
+        raise UnsupportedStream("live playlist (no EXT-X-ENDLIST)")
+    if not playlist.segments:
+        raise UnsupportedStream("playlist without segments")
+    return playlist
+
+
+def check_quality(quality):
+    """
+    Validates a rendition policy.
+
+    Args:
+        quality (str): "best" (highest bandwidth), "smallest" (lowest bandwidth),
+                       "audio" (audio only), "<height>p" such as "720p" (best
+                       rendition at most that tall) or "<kbps>k" such as "1500k"
+                       (best rendition within that bandwidth).
+
+    Returns:
+        str: The policy, lower-cased.
+
+    Raises:
+        ValueError: quality is none of the above.
+    """
+    quality = str(quality).strip().lower()
+    if quality not in QUALITY_PRESETS and not QUALITY_LIMIT_RE.fullmatch(quality):
+        raise ValueError(f"Unknown VoD quality {quality!r}: use best, smallest, audio, "
+                         "a height such as 720p or a bandwidth such as 1500k")
+    return quality
+
+
+def select_variant(variants, quality="best"):
+    """
+    Picks the rendition to download according to a policy (see check_quality).
+
+    A limit that no rendition meets selects the smallest one. "audio" selects an
+    audio-only rendition when the playlist has one, else the smallest; the
+    caller is expected to drop its video.
+
+    Returns:
+        Variant: The selected rendition.
+    """
+    quality = check_quality(quality)
+    by_bandwidth = attrgetter("bandwidth")
+    audio = [variant for variant in variants if variant.audio_only]
+    video = [variant for variant in variants if not variant.audio_only] or variants
+    if quality == "audio":
+        return max(audio, key=by_bandwidth) if audio else min(video, key=by_bandwidth)
+    if quality == "smallest":
+        return min(video, key=by_bandwidth)
+    if quality == "best":
+        return max(video, key=by_bandwidth)
+    limit, unit = QUALITY_LIMIT_RE.fullmatch(quality).groups()
+    if unit == "p":
+        allowed = [variant for variant in video if variant.resolution and variant.resolution[1] <= int(limit)]
+    else:
+        allowed = [variant for variant in video if variant.bandwidth and variant.bandwidth <= int(limit) * 1000]
+    return max(allowed, key=by_bandwidth) if allowed else min(video, key=by_bandwidth)
+
+
+def load_media_playlist(session, url, quality="best"):
+    """
+    Fetches the media playlist of a stream, following a master playlist to the variant quality selects.
+
+    Returns:
+        MediaPlaylist: The playlist, or None if a playlist could not be fetched.
+
+    Raises:
+        UnsupportedStream: See parse_media_playlist; also raised when the selected
+                           variant plays its sound from a separate audio playlist,
+                           which the segment fetcher cannot mux in.
+    """
+    resp = session.get(url)
+    if resp.status_code != 200:
+        print(f"Could not fetch HLS playlist (status {resp.status_code}): {url}")
+        return None
+    variants = parse_master_playlist(resp.text, resp.url)
+    if not variants:
+        return parse_media_playlist(resp.text, resp.url)
+    variant = select_variant(variants, quality)
+    if variant.audio_group:
+        raise UnsupportedStream(f"separate audio rendition (group {variant.audio_group})")
+    if variant.resolution:
+        print(f"Selected {variant.resolution[0]}x{variant.resolution[1]} rendition "
+              f"({variant.bandwidth // 1000} kbps) of {len(variants)}")
+    resp = session.get(variant.uri)
+    if resp.status_code != 200:
+        print(f"Could not fetch HLS playlist (status {resp.status_code}): {variant.uri}")
+        return None
+    return parse_media_playlist(resp.text, resp.url)
+
+
+def _extension(uri, default):
+    extension = os.path.splitext(urlsplit(uri).path)[1]
+    return extension if re.fullmatch(r"\.[A-Za-z0-9]{1,5}", extension) else default
+
+
+def segment_names(playlist):
+    """File names of the segments of a playlist, in order: 00000.ts, 00001.ts, ..."""
+    return [f"{segment.index:05d}{_extension(segment.uri, '.ts')}" for segment in playlist.segments]
+
+
+def prepare_folder(folder, playlist):
+    """
+    Readies folder for the segments of playlist, keeping those an earlier attempt fetched.
+
+    Segments are only reused if they belong to the same stream: the folder
+    records the URL paths of its segments (without query strings, which carry
+    expiring tokens), and anything else in it is wiped.
+
+    Returns:
+        int: Number of segments already in the folder.
+    """
+    stream = [urlsplit(segment.uri).path for segment in playlist.segments]
+    stream_file = os.path.join(folder, STREAM_FILE)
+    try:
+        with open(stream_file, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = None
+    if previous != stream:
+        shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder)
+        with open(stream_file, "w", encoding="utf-8") as f:
+            json.dump(stream, f)
+        return 0
+    return sum(1 for name in segment_names(playlist) if os.path.exists(os.path.join(folder, name)))
+
+
+def drop_segments(folder, playlist, log):
+    """
+    Deletes the fetched segments that an ffmpeg log names, so that only they are fetched again.
+
+    Returns:
+        int: Number of segments deleted.
+    """
+    names = segment_names(playlist)
+    indexes = set()
+    for name, sequence in SEGMENT_REFERENCE_RE.findall(log):
+        indexes.add(int(name) if name else int(sequence) - playlist.media_sequence)
+    dropped = 0
+    for index in sorted(indexes):
+        if 0 <= index < len(names):
+            try:
+                os.remove(os.path.join(folder, names[index]))
+                dropped += 1
+            except OSError:
+                pass
+    return dropped
+
+
+def fetch_resource(session, url, path, should_stop=None):
+    """
+    Downloads url to path through "<path>.part", retrying broken transfers with backoff.
+
+    Returns:
+        int: Bytes written, or None if should_stop interrupted the transfer or the
+             server answered with an error status.
+    """
+    attempt = 0
+    while True:
+        try:
+            with session.get(url, stream=True) as resp:
+                if resp.status_code != 200:
+                    print(f"HLS request failed with status {resp.status_code}: {url}")
+                    return None
+                size = 0
+                with open(path + ".part", "wb") as f:
+                    for chunk in resp.iter_content(SEGMENT_CHUNK_SIZE):
+                        if should_stop and should_stop():
+                            return None
+                        f.write(chunk)
+                        size += len(chunk)
+            os.replace(path + ".part", path)
+            return size
+        except http_policy.TRANSFER_ERRORS as e:
+            if attempt >= http_policy.MAX_RETRIES or (should_stop and should_stop()):
+                print(f"HLS transfer failed: {url} ({e})")
+                return None
+            http_policy.run_stats.add("retries")
+            time.sleep(http_policy.backoff_delay(attempt))
+            attempt += 1
+
+
+def format_size(size):
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.2f}{unit}"
+        size /= 1024
+    return f"{size:.2f}GiB"
+
+
+def fetch_segments(session, playlist, folder, workers=SEGMENT_WORKERS, on_progress=None, should_stop=None):
+    """
+    Fetches every segment of a media playlist into folder with parallel connections.
+
+    Segments are stored as numbered files in playlist order (00000.ts, 00001.ts,
+    ...), next to the keys and init sections they need, and a local playlist
+    that references only these files is written for ffmpeg. A segment whose
+    transfer breaks off is retried on its own; once one segment fails for good
+    the remaining ones are abandoned. Files already in folder are complete
+    (they are written through .part files) and are not fetched again; see
+    prepare_folder.
+
+    Args:
+        session (requests.Session): Session used for all requests; its pool should
+                                    allow `workers` connections.
+        playlist (MediaPlaylist): The stream.
+        folder (str): Folder for the fetched files; created if needed.
+        workers (int): Segments fetched at once.
+        on_progress (callable, optional): Receives a state dict for
+                                          vod_downloader.format_progress ('percent',
+                                          'size', 'downloaded', 'speed', 'eta', 'frag').
+        should_stop (callable, optional): Returning True abandons the download.
+
+    Returns:
+        str: Path of the local playlist, or None if the download failed or was stopped.
+    """
+    os.makedirs(folder, exist_ok=True)
+    # Keys and init sections are shared by many segments: fetch each one once, up front
+    extras = {}
+    for segment in playlist.segments:
+        for uri, default in ((segment.key["URI"] if segment.key else None, ".key"), (segment.init, ".mp4")):
+            if uri and uri not in extras:
+                extras[uri] = f"extra{len(extras)}{_extension(uri, default)}"
+    for uri, name in extras.items():
+        path = os.path.join(folder, name)
+        if not os.path.exists(path) and fetch_resource(session, uri, path, should_stop) is None:
+            return None
+
+    names = segment_names(playlist)
+    total = len(playlist.segments)
+    total_duration = playlist.duration or total
+    lock = threading.Lock()
+    failed = threading.Event()
+    # 'bytes' counts what this call fetched, 'reused' what was already on disk
+    done = {'count': 0, 'duration': 0.0, 'bytes': 0, 'reused': 0, 'reported': 0.0}
+    pending = []
+    for segment in playlist.segments:
+        path = os.path.join(folder, names[segment.index])
+        if os.path.exists(path):
+            done['count'] += 1
+            done['duration'] += segment.duration
+            done['reused'] += os.path.getsize(path)
+        else:
+            pending.append(segment)
+    started = time.monotonic()
+    start_fraction = done['duration'] / total_duration if playlist.duration else done['count'] / total
+
+    def stopped():
+        return failed.is_set() or (should_stop is not None and should_stop())
+
+    def report():
+        elapsed = max(time.monotonic() - started, 1e-6)
+        fraction = done['duration'] / total_duration if playlist.duration else done['count'] / total
+        speed = done['bytes'] / elapsed
+        state = {'percent': fraction * 100, 'speed': format_size(speed) + "/s", 'frag': f"{done['count']}/{total}"}
+        if 0 < fraction < 1:
+            state['size'] = "~" + format_size((done['bytes'] + done['reused']) / fraction)
+            if fraction > start_fraction:
+                remaining = int(elapsed / (fraction - start_fraction) * (1 - fraction))
+                state['eta'] = f"{remaining // 60:02d}:{remaining % 60:02d}"
+        on_progress(state)
+
+    def fetch(segment):
+        if stopped():
+            return
+        with timing.span("hls.segment", segment.uri) as span:
+            size = fetch_resource(session, segment.uri, os.path.join(folder, names[segment.index]), stopped)
+            span.bytes = size or 0
+        if size is None:
+            failed.set()
+            return
+        with lock:
+            done['count'] += 1
+            done['duration'] += segment.duration
+            done['bytes'] += size
+            now = time.monotonic()
+            if on_progress and (now - done['reported'] >= PROGRESS_INTERVAL or done['count'] == total):
+                done['reported'] = now
+                report()
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+            list(executor.map(fetch, pending))
+    if stopped() or done['count'] != total:
+        return None
+
+    local_playlist = os.path.join(folder, LOCAL_PLAYLIST)
+    write_local_playlist(local_playlist, playlist, names, extras)
+    return local_playlist
+
+
+def write_local_playlist(path, playlist, names, extras):
+    """Writes a copy of playlist that points at the fetched files (names per segment, extras per key/init URI)."""
+    lines = ["#EXTM3U", "#EXT-X-VERSION:7", "#EXT-X-PLAYLIST-TYPE:VOD",
+             f"#EXT-X-TARGETDURATION:{math.ceil(playlist.target_duration or max(s.duration for s in playlist.segments))}",
+             f"#EXT-X-MEDIA-SEQUENCE:{playlist.media_sequence}"]
+    key = init = None
+    for segment, name in zip(playlist.segments, names):
+        if segment.discontinuity:
+            lines.append("#EXT-X-DISCONTINUITY")
+        if segment.key != key:
+            key = segment.key
+            if key is None:
+                lines.append("#EXT-X-KEY:METHOD=NONE")
+            else:
+                iv = f",IV={key['IV']}" if key.get("IV") else ""
+                lines.append(f'#EXT-X-KEY:METHOD=AES-128,URI="{extras[key["URI"]]}"{iv}')
+        if segment.init != init:
+            init = segment.init
+            lines.append(f'#EXT-X-MAP:URI="{extras[init]}"')
+        lines.append(f"#EXTINF:{segment.duration:.3f},")
+        lines.append(name)
+    lines.append("#EXT-X-ENDLIST")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
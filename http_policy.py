@@ -0,0 +1,237 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+# (connect, read) timeouts in seconds. The read timeout applies to every socket
+# read, so a stalled response fails instead of hanging its worker forever.
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# Idempotent requests are retried up to MAX_RETRIES times, waiting about
+# BACKOFF_BASE * 2**attempt seconds (with jitter, at most BACKOFF_MAX) in between
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+RETRY_AFTER_MAX = 120.0  # Longest Retry-After a server may ask us to wait
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# After BREAKER_THRESHOLD failures in a row a host is considered down: every
+# request to it waits BREAKER_COOLDOWN seconds, then a single probe request
+# decides whether traffic resumes or the pause starts over.
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+
+# Errors worth retrying: the request (or the body being read) broke in transit
+REQUEST_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+TRANSFER_ERRORS = REQUEST_ERRORS + (urllib3.exceptions.HTTPError,)
+
+POOL_SIZE = 16
+
+
+class RunStats:
+    """
+    Thread-safe counters of what the HTTP policy did during a run.
+
+    Attributes (read through snapshot()):
+        requests: Requests sent, including retries.
+        retries: Requests and transfers that were retried.
+        failed_requests: Requests that still failed after all retries.
+        breaker_trips: Times a host was paused by its circuit breaker.
+        failed_downloads: Files and VoDs that could not be downloaded.
+    """
+    FIELDS = ("requests", "retries", "failed_requests", "breaker_trips", "failed_downloads")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, name, count=1):
+        with self._lock:
+            self._counts[name] += count
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def describe(self):
+        """One line summary, e.g. "120 requests, 3 retries, 0 failed requests, ..."."""
+        counts = self.snapshot()
+        return (f"{counts['requests']} requests, {counts['retries']} retries, "
+                f"{counts['failed_requests']} failed requests, {counts['failed_downloads']} failed downloads, "
+                f"circuit breaker tripped {counts['breaker_trips']} times")
+
+
+# Statistics of the current run; reset by whoever starts a run (CLI or GUI)
+run_stats = RunStats()
+
+
+class CircuitBreaker:
+    """Pauses all requests to a host that keeps failing (see BREAKER_THRESHOLD)."""
+
+    def __init__(self, host, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.host = host
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0  # Consecutive failed requests
+        self._open_until = 0.0
+        self._probing = False
+        self._condition = threading.Condition()
+
+    def before_request(self):
+        """
+        Blocks while the host is paused.
+
+        Returns:
+            bool: True if the caller is the probe that decides whether the host is back.
+        """
+        with self._condition:
+            while self.failures >= self.threshold:
+                now = time.monotonic()
+                if now >= self._open_until and not self._probing:
+                    self._probing = True
+                    return True
+                self._condition.wait(self._open_until - now if now < self._open_until else None)
+            return False
+
+    def record(self, succeeded, probe=False):
+        """Record the outcome of a request started after before_request."""
+        with self._condition:
+            if probe:
+                self._probing = False
+            if succeeded:
+                self.failures = 0
+            else:
+                self.failures += 1
+                if probe or self.failures == self.threshold:
+                    self._open_until = time.monotonic() + self.cooldown
+                    run_stats.add("breaker_trips")
+                    print(f"{self.host} looks down, pausing its requests for {self.cooldown:.0f}s")
+            self._condition.notify_all()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(url):
+    """Returns the circuit breaker shared by every request to the host of url."""
+    host = urlsplit(url).hostname or ""
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(host)
+        return breaker
+
+
+def backoff_delay(attempt):
+    """Seconds to wait before retry number attempt + 1: exponential, with the upper half jittered."""
+    ceiling = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+def retry_after_delay(response):
+    """Seconds asked for by a Retry-After header (delta seconds or HTTP date), or None."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        delay = float(value)
+    else:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(delay, 0.0), RETRY_AFTER_MAX)
+
+
+class ResilientSession(requests.Session):
+    """
+    A requests.Session that applies the HTTP policy of this module to every request.
+
+    - TIMEOUT is used unless the caller passes its own timeout.
+    - GET/HEAD/OPTIONS requests that fail with a connection error, a timeout or
+      a RETRY_STATUSES response are retried with jittered exponential backoff;
+      a Retry-After header takes precedence over the computed delay.
+    - Requests go through the circuit breaker of their host.
+
+    Streamed requests are retried until their headers arrive. A body that
+    breaks off later raises one of TRANSFER_ERRORS to the reader (see
+    main.fetch_to_file, which resumes from its .part file).
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault("timeout", TIMEOUT)
+        retryable = method.upper() in IDEMPOTENT_METHODS
+        breaker = breaker_for(url)
+        attempt = 0
+        while True:
+            probe = breaker.before_request()
+            run_stats.add("requests")
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except REQUEST_ERRORS as e:
+                breaker.record(False, probe)
+                if not retryable or attempt >= MAX_RETRIES:
+                    run_stats.add("failed_requests")
+                    raise
+                delay = backoff_delay(attempt)
+                print(f"{method} {url} failed ({e}), retrying in {delay:.1f}s")
+            except BaseException:
+                # Not retried (too many redirects, an invalid URL, an auth hook error, ...), but the
+                # outcome must still be recorded, or a half-open breaker waits for its probe forever
+                breaker.record(False, probe)
+                run_stats.add("failed_requests")
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record(True, probe)
+                    return response
+                # A 429 means the host is up and only throttling us, so it does not trip the breaker
+                breaker.record(response.status_code == 429, probe)
+                if not retryable or attempt >= MAX_RETRIES:
+                    run_stats.add("failed_requests")
+                    return response
+                delay = retry_after_delay(response)
+                if delay is None:
+                    delay = backoff_delay(attempt)
+                print(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+                response.close()
+            run_stats.add("retries")
+            time.sleep(delay)
+            attempt += 1
+
+
+def build_session(auth=None, pool_size=POOL_SIZE):
+    """Creates a ResilientSession with a keep-alive pool of pool_size connections per host."""
+    session = ResilientSession()
+    session.auth = auth
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_plain_session = None
+_plain_session_lock = threading.Lock()
+
+
+def get_plain_session():
+    """Returns the shared unauthenticated session used for third-party APIs (Dacast)."""
+    global _plain_session
+    with _plain_session_lock:
+        if _plain_session is None:
+            _plain_session = build_session()
+        return _plain_session
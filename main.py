@@ -1,22 +1,52 @@
-import requests
-from requests.adapters import HTTPAdapter
-from requests_ntlm import HttpNtlmAuth
 from bs4 import BeautifulSoup
+import errno
 import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from dataclasses import dataclass, asdict
-from scraper import parse_courses_html_from_url
+from scraper import get_course_catalogue
 import re
-from vod_downloader import download_single_video
+from hls import check_quality
+from vod_downloader import download_videos, DEFAULT_VOD_WORKERS, VOD_QUALITY
+from cms_session import get_session, fetch_page, CMS_URL, LOGIN_URL
+from manifest import DownloadManifest, MANIFEST_FILENAME
+from cms_parser import parse_course_html, clean_course_name
+from progress import format_bytes_progress
+import http_policy
+import timing
 
-DOMAIN = "https://cms.guc.edu.eg"
-course_url = "/apps/student/CourseViewStn.aspx?id=175&sid=59"
-current_session_name = ""  # Global variable to store current session name
+DOMAIN = CMS_URL
+DEFAULT_DOWNLOAD_WORKERS = 4  # Parallel non-VoD transfers per course
+PART_SUFFIX = ".part"  # Suffix of files that are still being downloaded
+ALLOC_SUFFIX = ".alloc"  # Added to a .part file while it is preallocated and being written
+VALIDATOR_SUFFIX = ".validator"  # Added to a .part file: ETag/Last-Modified of the version it holds
+# Files are requested uncompressed: Content-Length is then the file size and Range
+# offsets match the bytes in a .part file
+NO_COMPRESSION = {'Accept-Encoding': 'identity'}
+# Transfers read into a reusable buffer; the read size adapts so one read takes about CHUNK_TARGET_SECONDS
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+CHUNK_TARGET_SECONDS = 0.1
+PROGRESS_CALLBACK_INTERVAL = 0.1  # Minimum seconds between byte progress callbacks of a file
+# Content types whose names contain one of these count as VoDs in "Download All"
+VOD_TYPE_KEYWORDS = ["VOD", "Video", "Lecture", "Recording", "Stream"]
+INVALID_PATH_CHARS_RE = re.compile(r'[\\/*?:"<>|\x00-\x1f]')  # Not allowed in file/folder names
+DEFAULT_PARALLEL_COURSES = 3  # Courses synced at once by download_courses
+DEFAULT_MAX_TRANSFERS = 8  # Transfers (files and VoDs) running at once across all courses of download_courses
+HEAD_WORKERS = 8  # Concurrent HEAD requests when plan_course looks up file sizes
+DISK_SPACE_MARGIN = 200 * 1024 * 1024  # Free space kept on top of a plan's known download size
+# download_content arguments that also shape its plan
+PLAN_OPTIONS = ('output_folder', 'org_mode', 'include_week', 'include_type', 'include_week_description', 'revalidate')
 
 def login(username, password):
-    url = "https://apps.guc.edu.eg/student_ext/Console.aspx"
+    url = LOGIN_URL
     try:
         print("MY URL: " + url)
-        resp = requests.get(url, auth=HttpNtlmAuth(username.strip()+"@student.guc.edu.eg", password))
+        with timing.span("login"):
+            resp = get_session(username, password).get(url)
         print("STATUS: " + str(resp.status_code))
         if (resp.status_code == 200):
               return True
@@ -26,27 +56,50 @@ def login(username, password):
         return False
 
 
-def update_course_url(username, password, selected_course):
-    global course_url, current_session_name
+@dataclass(frozen=True)
+class CourseRef:
+    """A course of the catalogue: everything needed to fetch its page and file its content."""
+    name: str
+    course_id: str
+    season_id: str
+    season_title: str = "Unknown Session"
 
-    # Get all courses from all sessions
-    all_courses_by_season = parse_courses_html_from_url(username, password)
-    
-    # Find the selected course across all sessions
-    for season_title, courses in all_courses_by_season.items():
-        for course in courses:
-            if course['name'] == selected_course:
-                course_url = "/apps/student/CourseViewStn.aspx?id=" + course['id'] + "&sid=" + course['sid']
-                current_session_name = season_title  # Store the session name
-                return
-    
+    @property
+    def url(self):
+        return DOMAIN + "/apps/student/CourseViewStn.aspx?id=" + self.course_id + "&sid=" + self.season_id
+
+
+def find_course(username, password, selected_course):
+    """
+    Looks a course up by name.
+
+    Selecting a course starts a new run: its page is revalidated with the
+    server the next time it is used.
+
+    Returns:
+        CourseRef: The course, or None if it was not found.
+    """
+    course = None
+    # Find the selected course across all sessions in the cached catalogue
+    found = get_course_catalogue(username, password).lookup(selected_course)
+    if found:
+        course_id, session_id, season_title = found
+        course = CourseRef(selected_course, course_id, session_id, season_title)
+    else:
+        course = _find_course_on_home_page(username, password, selected_course)
+    if course is not None:
+        expire_course_pages(course.url)
+    return course
+
+
+def _find_course_on_home_page(username, password, selected_course):
     # Fallback to old method if not found
-    url = "https://cms.guc.edu.eg/apps/student/HomePageStn.aspx"
-    resp = requests.get(url, auth=HttpNtlmAuth(username.strip()+"@student.guc.edu.eg", password))
+    url = DOMAIN + "/apps/student/HomePageStn.aspx"
+    resp = get_session(username, password).get(url)
 
     if resp.status_code != 200:
             print("An Error Occurred. Check Credentials And Try Again.")
-            return
+            return None
     
     soup = BeautifulSoup(resp.text, 'html.parser')
     all_courses = soup.select("table#ContentPlaceHolderright_ContentPlaceHoldercontent_GridViewcourses tr")[1:]
@@ -55,34 +108,20 @@ def update_course_url(username, password, selected_course):
         tds = course.find_all("td")
         course_name = tds[1].get_text()
         # Use the same parsing logic as the scraper to remove pipes and brackets
-        # Use regex to extract code and name, ignore all bracketed content at the end
-        match = re.match(r"\(\|([A-Za-z0-9 ]+)\|\)\s*([^(]+?)(?:\s*\([^)]*\))*$", course_name)
-        if match:
-            code = match.group(1).strip()
-            name = match.group(2).strip()
-            # Format as "Course Name (CODE)" for consistency
-            clean_name = f"{name} ({code})" if code else name
-        else:
-            # fallback: remove last bracketed number if present
-            clean_name = re.sub(r"\s*\([^)]*\)\s*$", "", course_name).strip()
-        # Normalize whitespace to a single space
-        clean_name = re.sub(r"\s+", " ", clean_name)
+        clean_name = clean_course_name(course_name)
         if selected_course == clean_name:
-            course_url = "/apps/student/CourseViewStn.aspx?id=" + tds[4].get_text() + "&sid=" + tds[5].get_text()
-            current_session_name = "Unknown Session"  # Fallback session name
-            break
-    
-    
-      
+            return CourseRef(selected_course, tds[4].get_text(), tds[5].get_text())  # Session name unknown
+    return None
+
 
-def get_courses(username, password):
-    """Get all courses from all sessions using the scraper"""
-    all_courses_by_season = parse_courses_html_from_url(username, password)
+def get_courses(username, password, refresh=False):
+    """Get all courses from all sessions using the scraper; refresh revalidates the cached catalogue"""
+    catalogue = get_course_catalogue(username, password, refresh=refresh, snapshot=True)
     
-    if not all_courses_by_season:
+    if not catalogue.by_season:
         # Fallback to old method if scraper fails
-        url = "https://cms.guc.edu.eg/apps/student/HomePageStn.aspx"
-        resp = requests.get(url, auth=HttpNtlmAuth(username.strip()+"@student.guc.edu.eg", password))
+        url = DOMAIN + "/apps/student/HomePageStn.aspx"
+        resp = get_session(username, password).get(url)
         if resp.status_code != 200:
                 print("An Error Occurred. Check Credentials And Try Again.")
                 return []
@@ -95,33 +134,13 @@ def get_courses(username, password):
             tds = course.find_all("td")
             course_name = tds[1].get_text()
             # Use the same parsing logic as the scraper to remove pipes and brackets
-            # Use regex to extract code and name, ignore all bracketed content at the end
-            match = re.match(r"\(\|([A-Za-z0-9 ]+)\|\)\s*([^(]+?)(?:\s*\([^)]*\))*$", course_name)
-            if match:
-                code = match.group(1).strip()
-                name = match.group(2).strip()
-                # Format as "Course Name (CODE)" for consistency
-                clean_name = f"{name} ({code})" if code else name
-            else:
-                # fallback: remove last bracketed number if present
-                clean_name = re.sub(r"\s*\([^)]*\)\s*$", "", course_name).strip()
-            # Normalize whitespace to a single space
-            clean_name = re.sub(r"\s+", " ", clean_name)
+            clean_name = clean_course_name(course_name)
             final_courses.append(clean_name)
 
         return final_courses
     
     # Format courses for dropdown with session categorization
-    formatted_courses = []
-    for season_title, courses in all_courses_by_season.items():
-        # Add session header
-        formatted_courses.append(f"--- {season_title} ---")
-        # Add courses under this session
-        for course in courses:
-            # Format as "Course Name (CODE)" for dropdown display
-            formatted_courses.append(f"  {course['name']}")
-    
-    return formatted_courses
+    return catalogue.course_options()
 
 
 def get_course_info_from_formatted_name(formatted_course_name, username, password):
@@ -132,124 +151,466 @@ def get_course_info_from_formatted_name(formatted_course_name, username, passwor
     # Remove the leading spaces and get the actual course name
     actual_course_name = formatted_course_name.strip()
     
-    # Get all courses to find the matching one
-    all_courses_by_season = parse_courses_html_from_url(username, password)
-    
-    for season_title, courses in all_courses_by_season.items():
-        for course in courses:
-            if course['name'] == actual_course_name:
-                return {
-                    'name': course['name'],
-                    'id': course['id'],
-                    'sid': course['sid']
-                }
+    # Look the course up in the cached catalogue
+    found = get_course_catalogue(username, password).lookup(actual_course_name)
+    if found:
+        course_id, session_id, _ = found
+        return {
+            'name': actual_course_name,
+            'id': course_id,
+            'sid': session_id
+        }
     
     return None
 
-def get_types(username, password):
-    global DOMAIN, course_url
-    resp = requests.get(DOMAIN + course_url, auth=HttpNtlmAuth(username+"@student.guc.edu.eg", password))
-    
-    if resp.status_code != 200:
-            print("An Error Occurred. Check Credentials And Try Again.")
-            return {'exam_sched': [], 'success' : False}
-    
-    soup = BeautifulSoup(resp.text, 'html.parser')
-    all_cards = soup.select(".card-body")
-    course_name = soup.select_one("#ContentPlaceHolderright_ContentPlaceHoldercontent_LabelCourseName").get_text()
-    # Use the same parsing logic as the scraper to remove pipes and brackets
-    # Use regex to extract code and name, ignore all bracketed content at the end
-    match = re.match(r"\(\|([A-Za-z0-9 ]+)\|\)\s*([^(]+?)(?:\s*\([^)]*\))*$", course_name)
-    if match:
-        code = match.group(1).strip()
-        name = match.group(2).strip()
-        # Format as "Course Name (CODE)" for consistency
-        course_name = f"{name} ({code})" if code else name
-    else:
-        # fallback: remove last bracketed number if present
-        course_name = re.sub(r"\s*\([^)]*\)\s*$", "", course_name).strip()
-    # Normalize whitespace to a single space
-    course_name = re.sub(r"\s+", " ", course_name)
-    all_types = []
-
-    for card in all_cards:
-            title = card.find("div").get_text().strip().split("\n")[0]
-            # Extract content type from the last set of parentheses
-            last_open = title.rfind("(")
-            last_close = title.rfind(")")
-            if last_open != -1 and last_close != -1 and last_close > last_open:
-                title = title[last_open + 1 : last_close]
-            
-            if title not in all_types:
-                all_types.append(title)
-
-    return {'types' : all_types, 'course_name' : course_name}
+_transfer_buffers = threading.local()
+
+
+def _transfer_buffer():
+    """Returns this thread's reusable transfer buffer."""
+    buffer = getattr(_transfer_buffers, 'buffer', None)
+    if buffer is None:
+        buffer = _transfer_buffers.buffer = memoryview(bytearray(MAX_CHUNK_SIZE))
+    return buffer
+
+
+def _preallocate(file, size):
+    """Reserve size bytes for a file so it is laid out in one go and a full disk is noticed early."""
+    try:
+        if hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(file.fileno(), 0, size)
+        else:
+            file.truncate(size)
+    except OSError as e:
+        if e.errno == errno.ENOSPC:
+            raise
+        # Otherwise preallocation is just not supported here; the file grows as it is written
+
+
+class _DecodedBody:
+    """
+    readinto() over a response whose Content-Encoding urllib3 decodes.
+
+    urllib3's read(amt) may return more decoded bytes than amt, or none before
+    the end of the body, so the decoded chunks of stream() are handed out
+    piece by piece instead.
+    """
+
+    def __init__(self, raw):
+        self._chunks = raw.stream(MIN_CHUNK_SIZE, decode_content=True)
+        self._pending = b""
+
+    def readinto(self, view):
+        data = self._pending or next(self._chunks, b"")
+        count = min(len(data), len(view))
+        view[:count] = data[:count]
+        self._pending = data[count:]
+        return count
+
+
+def copy_body(raw, file, on_progress=None, should_stop=None, bytes_downloaded=0, total_size=0, chunk_size=MIN_CHUNK_SIZE):
+    """
+    Copies a response body into an open file through this thread's reusable buffer.
+
+    The read size starts at chunk_size and doubles while reads fill the buffer
+    quickly, or halves when a read takes long, so fast links use few large
+    reads and slow links still report progress and notice should_stop often.
+
+    Args:
+        raw: The body stream (urllib3 response, or anything with readinto).
+        file: File opened for binary writing at the right offset.
+        on_progress (callable, optional): on_progress(bytes_downloaded, total_size) after every read.
+        should_stop (callable, optional): Polled between reads.
+        bytes_downloaded (int): Bytes already in the file (when resuming).
+        total_size (int): Expected final size, 0 if unknown.
+        chunk_size (int): Initial read size.
+
+    Returns:
+        tuple: (bytes downloaded, True if the body was read to the end).
+    """
+    buffer = _transfer_buffer()
+    size = min(max(chunk_size, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+    # Time spent writing is only measured while a run is timed (see timing)
+    timed = timing.enabled()
+    write_seconds = 0.0
+    written = 0
+    try:
+        while True:
+            if should_stop and should_stop():
+                return bytes_downloaded, False
+            started = time.monotonic()
+            count = raw.readinto(buffer[:size])
+            if not count:
+                return bytes_downloaded, True
+            if timed:
+                write_started = time.perf_counter()
+                file.write(buffer[:count])
+                write_seconds += time.perf_counter() - write_started
+                written += count
+            else:
+                file.write(buffer[:count])
+            bytes_downloaded += count
+            if on_progress:
+                on_progress(bytes_downloaded, total_size)
+            elapsed = time.monotonic() - started
+            if count == size and size < MAX_CHUNK_SIZE and elapsed < CHUNK_TARGET_SECONDS / 2:
+                size *= 2
+            elif size > MIN_CHUNK_SIZE and elapsed > CHUNK_TARGET_SECONDS * 2:
+                size //= 2
+    finally:
+        if timed:
+            timing.record("disk.write", write_seconds, getattr(file, 'name', None), written)
+
+
+def _part_validator(response):
+    """The If-Range value for resuming a response's body later: a strong ETag, else Last-Modified."""
+    etag = response.headers.get('etag')
+    if etag and not etag.startswith("W/"):
+        return etag
+    return response.headers.get('last-modified')
+
+
+def _range_start(response):
+    """First byte position of a 206 response's Content-Range ("bytes 100-199/200"), or None."""
+    match = re.match(r"bytes\s+(\d+)-", response.headers.get('content-range', ''))
+    return int(match.group(1)) if match else None
+
+
+def _discard_part(part_path):
+    for path in (part_path, part_path + VALIDATOR_SUFFIX):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def fetch_to_file(session, url, file_path, on_progress=None, should_stop=None, chunk_size=MIN_CHUNK_SIZE, validators=None):
+    """
+    Streams a URL into file_path through a resumable "<file_path>.part" file.
+
+    Data is written to the .part file and only renamed to file_path once the
+    whole body has arrived, so an existing file_path is always complete. If a
+    .part file is left over from an interrupted run, the download resumes from
+    its end with an HTTP Range request; servers that ignore Range simply send
+    the whole file again. The ETag/Last-Modified of the version in the .part
+    file is kept next to it ("<file_path>.part.validator") and sent as
+    If-Range, so a file that changed on the server is downloaded from the
+    start instead of having its new tail appended to the old data.
+
+    While data is being written the file is named "<file_path>.part.alloc" and
+    preallocated to its full size. It is trimmed to the bytes actually written
+    and renamed back to .part when the transfer stops for any reason, so the
+    size of a .part file can always be trusted for resuming. A leftover .alloc
+    file (the process was killed) cannot be trusted and is discarded.
+
+    Args:
+        session (requests.Session): Session used for the request.
+        url (str): Absolute URL to download.
+        file_path (str): Final destination of the file.
+        on_progress (callable, optional): Called as on_progress(bytes_downloaded, total_size)
+                                          after every read; total_size is 0 when unknown.
+        should_stop (callable, optional): Polled between reads; returning True stops the
+                                          transfer and keeps the .part file for later.
+        chunk_size (int): Initial read size (see copy_body).
+        validators (dict, optional): 'etag'/'last_modified' of the copy already at
+                                     file_path. They are sent as If-None-Match /
+                                     If-Modified-Since, and a 304 leaves the file as is.
+
+    Returns:
+        dict: {'size', 'etag', 'last_modified', 'not_modified'} of the complete file,
+              or None if file_path was not completed.
+    """
+    part_path = file_path + PART_SUFFIX
+    alloc_path = part_path + ALLOC_SUFFIX
+    if os.path.exists(alloc_path):
+        os.remove(alloc_path)
+        print(f"Discarded unfinished preallocated download: {alloc_path}")
+    resume_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    # Compressed bodies cannot be resumed (.part sizes count decoded bytes, Range offsets
+    # encoded ones), so the body is asked for as stored
+    headers = dict(NO_COMPRESSION)
+    if resume_from:
+        headers['Range'] = f"bytes={resume_from}-"
+        try:
+            with open(part_path + VALIDATOR_SUFFIX, "r", encoding="utf-8") as f:
+                headers['If-Range'] = f.read().strip()
+        except OSError:
+            pass  # Left by a version without validators: resume unconditionally
+    elif validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+    with session.get(url, stream=True, headers=headers) as download_resp:
+        if download_resp.status_code == 304 and validators:
+            return {'size': os.path.getsize(file_path), 'etag': validators.get('etag'),
+                    'last_modified': validators.get('last_modified'), 'not_modified': True}
+
+        if download_resp.status_code == 416:
+            # Nothing left to fetch: the .part file is complete if it matches the advertised size
+            content_range = download_resp.headers.get('content-range', '')
+            if content_range.endswith("/" + str(resume_from)):
+                os.replace(part_path, file_path)
+                _discard_part(part_path)
+                return {'size': resume_from, 'etag': None, 'last_modified': None, 'not_modified': False}
+            _discard_part(part_path)
+            print(f"Discarded stale partial download: {part_path}")
+            return None
+
+        encoded = download_resp.headers.get('content-encoding', 'identity').lower() != 'identity'
+        if download_resp.status_code == 206 and (encoded or _range_start(download_resp) != resume_from):
+            _discard_part(part_path)
+            print(f"Server did not resume at byte {resume_from}, starting over: {file_path}")
+            return fetch_to_file(session, url, file_path, on_progress, should_stop, chunk_size, validators)
+        if download_resp.status_code == 206:
+            bytes_downloaded = resume_from
+            os.replace(part_path, alloc_path)
+            file = open(alloc_path, "r+b")
+            file.seek(resume_from)
+        elif download_resp.status_code == 200:
+            # A new (or changed) version: remember which one the .part file will hold
+            bytes_downloaded = 0
+            validator = _part_validator(download_resp)
+            if validator:
+                with open(part_path + VALIDATOR_SUFFIX, "w", encoding="utf-8") as f:
+                    f.write(validator)
+            elif os.path.exists(part_path + VALIDATOR_SUFFIX):
+                os.remove(part_path + VALIDATOR_SUFFIX)
+            file = open(alloc_path, "wb")
+        else:
+            print(f"Download failed with status {download_resp.status_code}: {url}")
+            return None
+
+        etag = download_resp.headers.get('etag')
+        last_modified = download_resp.headers.get('last-modified')
+        # Compressed on the wire anyway: decode while reading, content-length is not the file size
+        body = _DecodedBody(download_resp.raw) if encoded else download_resp.raw
+        content_length = 0 if encoded else int(download_resp.headers.get('content-length', 0))
+        total_size = bytes_downloaded + content_length if content_length else 0
+
+        finished = False
+        try:
+            if total_size:
+                _preallocate(file, total_size)
+            bytes_downloaded, finished = copy_body(body, file, on_progress, should_stop,
+                                                   bytes_downloaded, total_size, chunk_size)
+        finally:
+            # Drop whatever preallocated tail was not written, keeping the .part size trustworthy
+            file.truncate(bytes_downloaded)
+            file.close()
+            if encoded and not finished:
+                os.remove(alloc_path)  # Decoded bytes: no offset to resume from
+            else:
+                os.replace(alloc_path, part_path)
+        if not finished:
+            return None
+
+    if total_size and bytes_downloaded < total_size:
+        print(f"Incomplete download ({bytes_downloaded} of {total_size} bytes), will resume next time: {file_path}")
+        return None
+
+    os.replace(part_path, file_path)
+    _discard_part(part_path)
+    return {'size': bytes_downloaded, 'etag': etag, 'last_modified': last_modified, 'not_modified': False}
+
+
+@dataclass
+class CoursePage:
+    """A course page (CourseViewStn.aspx) fetched and parsed once per run."""
+    url: str
+    course_name: str
+    types: list                    # Content types in order of first appearance
+    week_to_description_map: dict  # week number -> week description
+    items: list                    # ContentItem per content card, in page order
+
+
+_course_pages = {}        # url -> CoursePage
+_validated_pages = set()  # urls checked against the server during the current run
+_course_pages_lock = threading.Lock()
+
+
+def parse_course_page(html, url):
+    """Parse a course page's HTML into a CoursePage, or None if it is not a course page."""
+    with timing.span("page.parse", url):
+        parsed = parse_course_html(html)
+    if parsed is None:
+        return None
+    items = parsed['items']
+    all_types = list(dict.fromkeys(item.type for item in items))
+    week_to_description_map = dict(enumerate(parsed['week_descriptions'], 1))
+    return CoursePage(url, parsed['course_name'], all_types, week_to_description_map, items)
+
+
+def get_course_page(username, password, course, refresh=False):
+    """
+    Returns the parsed page of a course, fetching it only once.
+
+    get_types, get_total_files and download_content all share the cached page
+    until the course is selected again (find_course) or refresh is set.
+    The page is then revalidated with a conditional GET, and a 304 reuses the
+    already parsed page without parsing it again.
+
+    Args:
+        username (str): The username for authentication.
+        password (str): The password for authentication.
+        course (CourseRef): The course.
+        refresh (bool): Revalidate the page even if it was checked during this run.
+
+    Returns:
+        CoursePage: The parsed page, or None if the request failed.
+    """
+    url = course.url
+    with _course_pages_lock:
+        page = _course_pages.get(url)
+        validated = url in _validated_pages
+    if page is not None and validated and not refresh:
+        return page
+
+    resp, html = fetch_page(username, password, url)
+    if html is None:
+        print("An Error Occurred. Check Credentials And Try Again.")
+        return None
+
+    if resp.status_code != 304 or page is None:
+        page = parse_course_page(html, url)
+        if page is None:
+            print("Could not read the course page. Check Credentials And Try Again.")
+            return None
+    with _course_pages_lock:
+        _course_pages[url] = page
+        _validated_pages.add(url)
+    return page
+
+
+def expire_course_pages(url=None):
+    """Make the next get_course_page revalidate a course page (or all of them) with the server."""
+    with _course_pages_lock:
+        if url is None:
+            _validated_pages.clear()
+        else:
+            _validated_pages.discard(url)
+
+
+def get_types(username, password, course):
+    page = get_course_page(username, password, course)
+    if page is None:
+        return {'exam_sched': [], 'success' : False}
+
+    return {'types' : list(page.types), 'course_name' : page.course_name}
         
 
-def download_content(username, password, types, progress_callback=None, cancellation_check=None, output_folder=None, org_mode='type', include_week=True, include_type=False, include_week_description=False):
-    global DOMAIN, course_url, current_session_name
-    if not types:
-        print("No content types selected. Aborting download.")
-        return {'exam_sched': [], 'success': False, 'error': 'No content types selected.'}
-    resp = requests.get(DOMAIN + course_url, auth=HttpNtlmAuth(username+"@student.guc.edu.eg", password))
+@dataclass
+class PlannedItem:
+    """A content card of a DownloadPlan and what the run will do with it."""
+    content_id: str
+    title: str
+    content_type: str
+    is_vod: bool
+    href: str              # Download link, or the Dacast content id of a VoD
+    path: str              # Target file
+    action: str            # 'download', 'relocate', 'adopt' or 'skip' (see plan_course)
+    revalidate: bool = False  # Check the file on disk with a conditional GET (after relocating it)
+    previous: dict = None  # Manifest entry of a file that is relocated or revalidated
+    size: int = None       # Expected size of the whole file in bytes, None if unknown
+    resume_from: int = 0   # Bytes already in the file's .part file
 
-    if resp.status_code != 200:
-            print("An Error Occurred. Check Credentials And Try Again.")
-            return {'exam_sched': [], 'success' : False}
 
-    soup = BeautifulSoup(resp.text, 'html.parser')
+@dataclass
+class DownloadPlan:
+    """What download_content will do for a course, worked out before anything is written."""
+    course: CourseRef
+    course_name: str
+    all_types: list  # Content types of the course page
+    types: list      # Content types selected for download
+    items: list      # PlannedItem per content card to handle, in page order
 
-    # 1. Parse weeks, reverse them, and map content to a week number and description
-    content_to_week_map = {}
-    week_to_description_map = {} # To store week descriptions
-    all_weeks = soup.select(".card.mb-5.weeksdata")
-    all_weeks = list(reversed(all_weeks)) # Weeks in HTML are newest to oldest, reverse for chronological order
-
-    for week_number, week_div in enumerate(all_weeks, 1):
-        # Extract week description
-        description_text = "No Description"
-        # The description <p> tag is the one not inside a div with style="display:none;"
-        all_p_tags = week_div.find_all("p", class_="m-2 p2")
-        for p_tag in all_p_tags:
-            if not p_tag.find_parent("div", style="display:none;"):
-                description_text = p_tag.text.strip()
-                break
-        week_to_description_map[week_number] = description_text
+    @property
+    def downloads(self):
+        """Items that will be downloaded (revalidations usually transfer nothing and are not included)."""
+        return [item for item in self.items if item.action == 'download']
+
+    @property
+    def bytes_to_download(self):
+        """Bytes still to fetch for the downloads whose size is known."""
+        return sum(max(0, item.size - item.resume_from) for item in self.downloads if item.size is not None)
+
+    @property
+    def unknown_sizes(self):
+        """Number of downloads whose size is not known in advance (VoDs, files served without Content-Length)."""
+        return sum(1 for item in self.downloads if item.size is None)
+
+
+def _existing_action(manifest, content_id, href, file_path):
+    # Decides whether file_path is already satisfied, either by a file on disk or
+    # by the copy the manifest knows about at a previous location.
+    # Returns (action, manifest entry or None).
+    entry = manifest.get(content_id, href) if manifest is not None and content_id and href else None
+    if entry and entry['path'] != file_path and not os.path.exists(file_path) and manifest.is_intact(entry):
+        return 'relocate', entry
+    if not os.path.exists(file_path):
+        return 'download', None
+    if content_id and href and entry is None:
+        previous = manifest.get_by_path(file_path) if manifest is not None else None
+        if previous and previous['content_id'] == content_id and previous['href'] != href:
+            # Same CMS item re-uploaded under a new link: fetch the new version
+            return 'download', None
+        # Files downloaded before the manifest existed are recorded in it
+        return 'adopt', None
+    return 'skip', entry
 
-        # Map content IDs to this week number
-        content_items = week_div.select("div[id^=content]")
-        for item in content_items:
-            content_id = item.get("id")
-            content_to_week_map[content_id] = week_number
 
-    all_cards = soup.select(".card-body")
-    all_types = []
+def _size_downloads(session, items, workers):
+    """Looks up the size (HEAD Content-Length) and resume offset of planned file downloads in parallel."""
+    def size_item(item):
+        part_path = item.path + PART_SUFFIX
+        item.resume_from = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        try:
+            with timing.span("file.size", item.title), \
+                    session.head(DOMAIN + item.href, allow_redirects=True, headers=NO_COMPRESSION) as resp:
+                encoded = resp.headers.get('content-encoding', 'identity').lower() != 'identity'
+                length = resp.headers.get('content-length', '')
+                if resp.status_code == 200 and not encoded and length.isdigit():
+                    item.size = int(length)
+        except Exception as e:
+            print(f"Could not get the size of {item.title}: {e}")
+
+    if items:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(items)))) as executor:
+            list(executor.map(size_item, items))
 
-    # Count total files to download for progress tracking
-    total_files = 0
-    files_to_download = []
 
-    for card in all_cards:
-            title = card.find("div").get_text().strip().split("\n")[0]
-            last_open = title.rfind("(")
-            last_close = title.rfind(")")
-            if last_open != -1 and last_close != -1 and last_close > last_open:
-                title = title[last_open + 1 : last_close]
+def plan_course(username, password, course, types, output_folder=None, org_mode='type', include_week=True, include_type=False, include_week_description=False, revalidate=False, size_workers=HEAD_WORKERS):
+    """
+    Works out what downloading the selected content types of a course would do, without writing anything.
 
-            if title not in all_types:
-                all_types.append(title)
+    Every content card gets its target path and one of these actions:
+        'download': the file is not on disk yet (a leftover .part file is resumed).
+        'relocate': the manifest knows the file under an older path; it is moved.
+        'adopt': the file is on disk but not in the manifest yet; it is recorded.
+        'skip': the file is on disk, or another card already targets the same path.
+    With revalidate set, files on disk that were recorded with an ETag or
+    Last-Modified are also marked for a conditional GET. The sizes of the
+    downloads are looked up with up to size_workers concurrent HEAD requests.
 
-            if (title in types):
-                total_files += 1
-                files_to_download.append(card)
+    Args:
+        username (str): The username for authentication.
+        password (str): The password for authentication.
+        course (CourseRef): The course.
+        types (list): Content types to download.
+        Other arguments: as for download_content.
+
+    Returns:
+        DownloadPlan: The plan, or None if the course page could not be loaded.
+    """
+    page = get_course_page(username, password, course)
+    if page is None:
+        return None
+
+    week_to_description_map = page.week_to_description_map
+    course_name = page.course_name
+    all_types = list(page.types)
 
     content_type_mapping = {}
-    for card in all_cards:
-        file_content_type = card.find("div").get_text().strip().split("\n")[0]
-        last_open = file_content_type.rfind("(")
-        last_close = file_content_type.rfind(")")
-        if last_open != -1 and last_close != -1 and last_close > last_open:
-            file_content_type = file_content_type[last_open + 1 : last_close]
+    for file_content_type in all_types:
         for selected_type in types:
             if (file_content_type.lower() in selected_type.lower() or
                 selected_type.lower() in file_content_type.lower() or
@@ -257,200 +618,431 @@ def download_content(username, password, types, progress_callback=None, cancella
                 content_type_mapping[file_content_type] = selected_type
                 break
 
+    root_folder = output_folder if output_folder else os.getcwd()
+    # Only read an existing manifest; planning must not create one
+    manifest = DownloadManifest(root_folder) if os.path.exists(os.path.join(root_folder, MANIFEST_FILENAME)) else None
+    session_folder = os.path.join(root_folder, course.season_title.rstrip())
+    course_folder_path = os.path.join(session_folder, course_name.rstrip())
+    planned_paths = set()
+    items = []
+
+    try:
+        for item in page.items:
+            if item.type not in types:
+                continue
+            file_content_type = item.type
+            content_id = item.id
+            week_num = item.week
+
+            # Create the week prefix with description
+            week_prefix_for_filename = ""
+            week_prefix_for_foldername = ""
+            if week_num:
+                week_description = week_to_description_map.get(week_num, "").strip()
+                # Sanitize description for filesystem (removes invalid chars and control chars)
+                sanitized_description = INVALID_PATH_CHARS_RE.sub('', week_description) if week_description else ""
+
+                week_part = f"Week {str(week_num).rstrip()}"
+                week_prefix_for_filename = week_part # Filename inside week folder is simple
+
+                if include_week_description and sanitized_description:
+                    week_prefix_for_foldername = f"{week_part} [{sanitized_description}]"
+                else:
+                    week_prefix_for_foldername = week_part
+
+            lecture_title = item.title
+            if lecture_title is None:
+                print(f"Could not find a title for content: {content_id}")
+                continue
+
+            if org_mode == 'type':
+                filter_name = content_type_mapping.get(file_content_type, file_content_type).rstrip()
+                filter_folder = os.path.join(course_folder_path, filter_name)
+                name_parts = []
+                if include_week and week_prefix_for_foldername:
+                    name_parts.append(week_prefix_for_foldername)
+                if include_type:
+                    name_parts.append(f"({file_content_type.rstrip()})")
+                name_parts.append(lecture_title.rstrip())
+                file_name = " - ".join(name_parts).rstrip()
+                file_path_base = os.path.join(filter_folder, file_name)
+            elif org_mode == 'week':
+                week_folder = week_prefix_for_foldername if week_prefix_for_foldername else "No Week"
+                week_folder_path = os.path.join(course_folder_path, week_folder.rstrip())
+                name_parts = []
+                if include_week and week_prefix_for_filename:
+                    name_parts.append(week_prefix_for_filename)
+                if include_type:
+                    name_parts.append(f"({file_content_type.rstrip()})")
+                name_parts.append(lecture_title.rstrip())
+                file_name = " - ".join(name_parts).rstrip()
+                file_path_base = os.path.join(week_folder_path, file_name)
+            else: # Flat structure
+                name_parts = []
+                if include_week and week_prefix_for_foldername:
+                    name_parts.append(week_prefix_for_foldername)
+                if include_type:
+                    name_parts.append(f"({file_content_type.rstrip()})")
+                name_parts.append(lecture_title.rstrip())
+                file_name = " - ".join(name_parts).rstrip()
+                file_path_base = os.path.join(course_folder_path, file_name)
+
+            is_vod = file_content_type.lower().rstrip() == "vod"
+            if is_vod:
+                href = item.vod_id
+                if not href:
+                    print(f"Could not find contentId for VoD file: {lecture_title}")
+                    continue
+                file_path = file_path_base + ".mkv"
+            else:
+                href = item.href
+                if not href:
+                    print(f"Could not find download link for: {lecture_title}")
+                    continue
+                original_filename = href.split('/')[-1]
+                file_format = original_filename.split('.')[-1] if '.' in original_filename else 'unknown'
+                file_path = file_path_base + "." + file_format
+
+            if file_path in planned_paths:
+                action, entry = 'skip', None
+            else:
+                action, entry = _existing_action(manifest, content_id, href, file_path)
+            planned_paths.add(file_path)
+            check = (revalidate and not is_vod and action in ('skip', 'relocate')
+                     and entry is not None and bool(entry['etag'] or entry['last_modified']))
+            items.append(PlannedItem(content_id, lecture_title, file_content_type, is_vod, href, file_path,
+                                     action, check, entry))
+    finally:
+        if manifest is not None:
+            manifest.close()
+
+    _size_downloads(get_session(username, password),
+                    [item for item in items if item.action == 'download' and not item.is_vod], size_workers)
+    return DownloadPlan(course, course_name, all_types, list(types), items)
+
+
+def check_disk_space(plan, output_folder=None):
+    """
+    Checks that the output volume has room for the downloads of a plan.
+
+    Downloads of known size are counted in full and DISK_SPACE_MARGIN is kept
+    for the rest (VoDs in particular). Courses synced in parallel are checked
+    one at a time, each against the space free at that moment.
+
+    Returns:
+        str: An error message, or None if there is enough space.
+    """
+    if not plan.downloads:
+        return None
+    folder = os.path.abspath(output_folder if output_folder else os.getcwd())
+    while not os.path.exists(folder):
+        folder = os.path.dirname(folder)
+    needed = plan.bytes_to_download + DISK_SPACE_MARGIN
+    free = shutil.disk_usage(folder).free
+    if free < needed:
+        return (f"Not enough disk space for {plan.course_name} in {folder}: "
+                f"{needed/1024/1024:.0f} MB needed, {free/1024/1024:.0f} MB free")
+    return None
+
+
+def download_content(username, password, course, types, progress_callback=None, cancellation_check=None, output_folder=None, org_mode='type', include_week=True, include_type=False, include_week_description=False, max_workers=DEFAULT_DOWNLOAD_WORKERS, revalidate=False, max_vod_workers=DEFAULT_VOD_WORKERS, progress_tracker=None, transfer_slots=None, plan=None, vod_quality=None):
+    """
+    Downloads the selected content types of a course (a CourseRef).
+
+    The course is planned first with plan_course, unless a plan made with the
+    same arguments is passed in. Nothing is written if the output volume does
+    not have room for the planned downloads (see check_disk_space).
+
+    Files that already exist are skipped. With revalidate set, files recorded in
+    the download manifest with an ETag/Last-Modified are instead checked with a
+    conditional GET and only downloaded again if the server copy changed.
+
+    Progress goes to progress_callback(downloaded, total, current file, status)
+    and/or to a progress.ProgressTracker. The tracker receives raw byte counts
+    and the planned sizes, and is meant for UIs that poll it instead of
+    reacting to every chunk.
+
+    transfer_slots is an optional semaphore shared by several concurrent calls
+    (see download_courses); every file and VoD transfer holds one slot.
+
+    vod_quality picks the rendition of every VoD, e.g. "720p" or "audio" (see
+    hls.check_quality); it defaults to vod_downloader.VOD_QUALITY.
+
+    A transfer that breaks off is resumed up to http_policy.MAX_RETRIES times.
+    Files that still fail are counted in http_policy.run_stats.
+    """
+    if not types:
+        print("No content types selected. Aborting download.")
+        return {'exam_sched': [], 'success': False, 'error': 'No content types selected.'}
+    try:
+        vod_quality = check_quality(vod_quality or VOD_QUALITY)
+    except ValueError as e:
+        print(e)
+        return {'exam_sched': [], 'success': False, 'error': str(e)}
+    if plan is None:
+        plan = plan_course(username, password, course, types, output_folder, org_mode, include_week,
+                           include_type, include_week_description, revalidate)
+    if plan is None:
+            return {'exam_sched': [], 'success' : False}
+    space_error = check_disk_space(plan, output_folder)
+    if space_error:
+        print(space_error)
+        return {'exam_sched': [], 'success': False, 'error': space_error}
+
+    total_files = len(plan.items)
+    if progress_tracker is not None:
+        sized = [item.size for item in plan.downloads if item.size is not None]
+        progress_tracker.total_files = total_files
+        progress_tracker.set_plan(sum(sized), len(sized), plan.unknown_sizes)
+
     downloaded_files = 0
-    for card in files_to_download:
+    unsized_done = 0
+    progress_lock = threading.Lock()
+
+    def mark_file_done(item, status):
+        nonlocal downloaded_files, unsized_done
+        with progress_lock:
+            downloaded_files += 1
+            done = downloaded_files
+            if item.action == 'download' and item.size is None:
+                unsized_done += 1
+                if progress_tracker is not None:
+                    progress_tracker.unsized_done = unsized_done
+        if progress_tracker is not None:
+            progress_tracker.file_done(done, total_files, item.title, status, key=item.path)
+        if progress_callback:
+            progress_callback(done, total_files, item.title, status)
+
+    def download_file(item):
+        # Runs on a worker thread; a cancelled run leaves queued files untouched
+        if cancellation_check and cancellation_check():
+            return
+        link, file_path, lecture_title = item.href, item.path, item.title
+        validators = item.previous if item.revalidate else None
+        print(DOMAIN + link)
+
+        last_reported = 0.0
+
+        def on_progress(bytes_downloaded, total_size):
+            nonlocal last_reported
+            if progress_tracker is not None:
+                progress_tracker.file_bytes(lecture_title, bytes_downloaded, total_size, key=file_path)
+            if not progress_callback:
+                return
+            # Format and report at most every PROGRESS_CALLBACK_INTERVAL; the tracker formats lazily itself
+            now = time.monotonic()
+            if now - last_reported >= PROGRESS_CALLBACK_INTERVAL or bytes_downloaded == total_size:
+                last_reported = now
+                progress_callback(downloaded_files, total_files, lecture_title, format_bytes_progress(bytes_downloaded, total_size))
+
+        reports_progress = progress_tracker is not None or progress_callback
+        attempt = 0
+        while True:
+            try:
+                with transfer_slots or nullcontext():
+                    if cancellation_check and cancellation_check():
+                        return
+                    with timing.span("file.transfer", lecture_title) as span:
+                        result = fetch_to_file(get_session(username, password), DOMAIN + link, file_path,
+                                               on_progress if reports_progress else None, cancellation_check, validators=validators)
+                        if result is not None and not result['not_modified']:
+                            span.bytes = result['size']
+                break
+            except http_policy.TRANSFER_ERRORS as e:
+                # The body broke off; the next attempt resumes from the .part file
+                if attempt >= http_policy.MAX_RETRIES or (cancellation_check and cancellation_check()):
+                    print(f"Error downloading file {lecture_title}: {e}")
+                    http_policy.run_stats.add("failed_downloads")
+                    return
+                delay = http_policy.backoff_delay(attempt)
+                print(f"Transfer of {lecture_title} interrupted ({e}), resuming in {delay:.1f}s")
+                http_policy.run_stats.add("retries")
+                time.sleep(delay)
+                attempt += 1
+            except Exception as e:
+                print(f"Error downloading file {lecture_title}: {e}")
+                http_policy.run_stats.add("failed_downloads")
+                return
+        if result is None:
+            if not (cancellation_check and cancellation_check()):
+                http_policy.run_stats.add("failed_downloads")
+        elif result['not_modified']:
+            mark_file_done(item, "Already Exists")
+        else:
+            if item.content_id:
+                manifest.record(item.content_id, link, file_path, result['size'], result['etag'], result['last_modified'])
+            mark_file_done(item, "Downloaded")
+
+    def relocate(item):
+        # Move the copy the manifest knows about from its previous location
+        entry = item.previous
+        os.replace(entry['path'], item.path)
+        print(f"Relocated {entry['path']} -> {item.path}")
         try:
-            if cancellation_check and cancellation_check():
-                print("Download cancelled by user")
-                return all_types
-
-            file_content_type = card.find("div").get_text().strip().split("\n")[0]
-            last_open = file_content_type.rfind("(")
-            last_close = file_content_type.rfind(")")
-            if last_open != -1 and last_close != -1 and last_close > last_open:
-                file_content_type = file_content_type[last_open + 1 : last_close]
-
-            if (file_content_type in types):
-                course_name = soup.select_one("#ContentPlaceHolderright_ContentPlaceHoldercontent_LabelCourseName").get_text()
-                match = re.match(r"\(\|([A-Za-z0-9 ]+)\|\)\s*([^(]+?)(?:\s*\([^)]*\))*$", course_name)
-                if match:
-                    code = match.group(1).strip()
-                    name = match.group(2).strip()
-                    course_name = f"{name} ({code})" if code else name
-                else:
-                    course_name = re.sub(r"\s*\([^)]*\)\s*$", "", course_name).strip()
-                course_name = re.sub(r"\s+", " ", course_name)
-
-                content_id_div = card.select_one("div[id^=content]")
-                content_id = content_id_div.get("id") if content_id_div else None
-                week_num = content_to_week_map.get(content_id) if content_id else None
-
-                # Create the week prefix with description
-                week_prefix_for_filename = ""
-                week_prefix_for_foldername = ""
-                if week_num:
-                    week_description = week_to_description_map.get(week_num, "").strip()
-                    # Sanitize description for filesystem (removes invalid chars and control chars)
-                    sanitized_description = re.sub(r'[\\/*?:"<>|\x00-\x1f]', '', week_description) if week_description else ""
-                    
-                    week_part = f"Week {str(week_num).rstrip()}"
-                    week_prefix_for_filename = week_part # Filename inside week folder is simple
-                    
-                    if include_week_description and sanitized_description:
-                        week_prefix_for_foldername = f"{week_part} [{sanitized_description}]"
-                    else:
-                        week_prefix_for_foldername = week_part
-
-                lecture_title_raw = card.select_one("div strong").get_text()
-                lecture_title = re.sub(r'^\d+\s*-\s*', '', lecture_title_raw).strip()
-
-                root_folder = output_folder if output_folder else os.getcwd()
-
-                session_folder = os.path.join(root_folder, current_session_name.rstrip())
-                try:
-                    os.makedirs(session_folder, exist_ok=True)
-                except OSError as error:
-                    print(error)
-
-                course_folder_path = os.path.join(session_folder, course_name.rstrip())
-                try:
-                    os.makedirs(course_folder_path, exist_ok=True)
-                except OSError as error:
-                    print(error)
-
-                if org_mode == 'type':
-                    filter_name = content_type_mapping.get(file_content_type, file_content_type).rstrip()
-                    filter_folder = os.path.join(course_folder_path, filter_name)
-                    try:
-                        os.makedirs(filter_folder, exist_ok=True)
-                    except OSError as error:
-                        print(error)
-                    name_parts = []
-                    if include_week and week_prefix_for_foldername:
-                        name_parts.append(week_prefix_for_foldername)
-                    if include_type:
-                        name_parts.append(f"({file_content_type.rstrip()})")
-                    name_parts.append(lecture_title.rstrip())
-                    file_name = " - ".join(name_parts).rstrip()
-                    file_path_base = os.path.join(filter_folder, file_name)
-                elif org_mode == 'week':
-                    week_folder = week_prefix_for_foldername if week_prefix_for_foldername else "No Week"
-                    week_folder_path = os.path.join(course_folder_path, week_folder.rstrip())
-                    try:
-                        os.makedirs(week_folder_path, exist_ok=True)
-                    except OSError as error:
-                        print(error)
-                    name_parts = []
-                    if include_week and week_prefix_for_filename:
-                        name_parts.append(week_prefix_for_filename)
-                    if include_type:
-                        name_parts.append(f"({file_content_type.rstrip()})")
-                    name_parts.append(lecture_title.rstrip())
-                    file_name = " - ".join(name_parts).rstrip()
-                    file_path_base = os.path.join(week_folder_path, file_name)
-                else: # Flat structure
-                    name_parts = []
-                    if include_week and week_prefix_for_foldername:
-                        name_parts.append(week_prefix_for_foldername)
-                    if include_type:
-                        name_parts.append(f"({file_content_type.rstrip()})")
-                    name_parts.append(lecture_title.rstrip())
-                    file_name = " - ".join(name_parts).rstrip()
-                    file_path_base = os.path.join(course_folder_path, file_name)
-
-                if file_content_type.lower().rstrip() == "vod":
-                    file_path = file_path_base + ".mkv"
-                    if os.path.exists(file_path):
-                        print(f"File already exists, skipping: {file_path}")
-                        downloaded_files += 1
-                        if progress_callback:
-                            progress_callback(downloaded_files, total_files, lecture_title, "VoD")
-                        continue
-
-                    vod_input = card.select_one("input.vodbutton")
-                    if vod_input is not None:
-                        vod_content_id = vod_input.get('id')
-                        if vod_content_id:
-                            try:
-                                download_single_video(vod_content_id, file_path, username, password)
-                            except Exception as e:
-                                print(f"Error downloading VoD file {lecture_title}: {e}")
-                                continue
-                            downloaded_files += 1
-                            if progress_callback:
-                                progress_callback(downloaded_files, total_files, lecture_title, "VoD")
-                            continue
-                        else:
-                            print(f"Could not find contentId for VoD file: {lecture_title}")
-                            continue
-                    else:
-                        print(f"Could not find vodbutton input for VoD file: {lecture_title}")
-                        continue
+            os.removedirs(os.path.dirname(entry['path']))
+        except OSError:
+            pass  # Old folder still has other files
+        manifest.record(item.content_id, item.href, item.path, entry['size'], entry['etag'], entry['last_modified'])
+
+    # Non-VoD files are handed to a bounded pool of workers sharing the pooled
+    # session; VoDs are collected and handed to the VoD pipeline afterwards.
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    manifest = DownloadManifest(output_folder if output_folder else os.getcwd())
+    vod_jobs = []     # (Dacast content id, target path), run after the scan
+    vod_details = {}  # target path -> PlannedItem
+
+    def vod_done(vod_content_id, file_path, success):
+        item = vod_details[file_path]
+        if not success:
+            print(f"Error downloading VoD file {item.title}")
+            if not (cancellation_check and cancellation_check()):
+                http_policy.run_stats.add("failed_downloads")
+            return
+        if item.content_id and os.path.exists(file_path):
+            manifest.record(item.content_id, vod_content_id, file_path)
+        mark_file_done(item, "VoD")
+
+    def vod_progress(vod_content_id, file_path, progress_str):
+        lecture_title = vod_details[file_path].title
+        if progress_tracker is not None:
+            progress_tracker.file_status(lecture_title, "VoD " + progress_str, key=file_path)
+        if progress_callback:
+            progress_callback(downloaded_files, total_files, lecture_title, "VoD " + progress_str)
+
+    try:
+        for item in plan.items:
+            try:
+                if cancellation_check and cancellation_check():
+                    print("Download cancelled by user")
+                    break
+
+                os.makedirs(os.path.dirname(item.path), exist_ok=True)
+                if item.action == 'relocate':
+                    relocate(item)
+                elif item.action == 'adopt':
+                    manifest.record(item.content_id, item.href, item.path)
+                if item.action != 'download' and not item.revalidate:
+                    print(f"File already exists, skipping: {item.path}")
+                    mark_file_done(item, "VoD" if item.is_vod else "Already Exists")
+                elif item.is_vod:
+                    vod_jobs.append((item.href, item.path))
+                    vod_details[item.path] = item
                 else:
-                    link_tag = card.find("a")
-                    if not link_tag or not link_tag.get('href'):
-                        print(f"Could not find download link for: {lecture_title}")
-                        continue
-                    
-                    link = link_tag.get('href')
-                    original_filename = link.split('/')[-1]
-                    file_format = original_filename.split('.')[-1] if '.' in original_filename else 'unknown'
-                    
-                    file_path = file_path_base + "." + file_format
-                    
-                    if os.path.exists(file_path):
-                        print(f"File already exists, skipping: {file_path}")
-                        downloaded_files += 1
-                        if progress_callback:
-                            progress_callback(downloaded_files, total_files, lecture_title, "Already Exists")
-                        continue
-                    print(DOMAIN + link)
-                    try:
-                        with requests.get(DOMAIN + link, auth=HttpNtlmAuth(username+"@student.guc.edu.eg", password), stream=True) as download_resp:
-                            print("\nDOWNLOAD STATUS: " + str(download_resp.status_code) + "\n")
-                            total_size = int(download_resp.headers.get('content-length', 0))
-                            bytes_downloaded = 0
-                            chunk_size = 8192
-                            file_progress_str = ""
-                            with open(file_path, "wb") as file:
-                                for chunk in download_resp.iter_content(chunk_size=chunk_size):
-                                    if chunk:
-                                        file.write(chunk)
-                                        bytes_downloaded += len(chunk)
-                                        if total_size > 0:
-                                            percent = (bytes_downloaded / total_size) * 100
-                                            file_progress_str = f"{bytes_downloaded/1024/1024:.2f} MB / {total_size/1024/1024:.2f} MB ({percent:.1f}%)"
-                                        else:
-                                            file_progress_str = f"{bytes_downloaded/1024/1024:.2f} MB / ? MB"
-                                        if progress_callback:
-                                            progress_callback(downloaded_files, total_files, lecture_title, file_progress_str)
-                            if progress_callback:
-                                progress_callback(downloaded_files, total_files, lecture_title, file_progress_str)
-                        downloaded_files += 1
-                        if progress_callback:
-                            progress_callback(downloaded_files, total_files, lecture_title, "Downloaded")
-                    except Exception as e:
-                        print(f"Error downloading file {lecture_title}: {e}")
-                        continue
-        except Exception as e:
-            print(f"Unexpected error processing file: {e}")
-            continue
-    return all_types
+                    executor.submit(download_file, item)
+            except Exception as e:
+                print(f"Unexpected error processing file: {e}")
+                continue
 
-def get_total_files(username, password, types):
-    global DOMAIN, course_url
-    resp = requests.get(DOMAIN + course_url, auth=HttpNtlmAuth(username+"@student.guc.edu.eg", password))
-    if resp.status_code != 200:
+        # VoDs go through the resolve/download pipeline while the file workers keep running
+        download_videos(vod_jobs, vod_done, cancellation_check, max_vod_workers, on_progress=vod_progress,
+                        slots=transfer_slots, quality=vod_quality)
+    finally:
+        executor.shutdown(wait=True)
+        manifest.close()
+    return plan.all_types
+
+def filter_vod_types(types):
+    """Return the content types that look like video recordings."""
+    return [content_type for content_type in types
+            if any(keyword.lower() in content_type.lower() for keyword in VOD_TYPE_KEYWORDS)]
+
+
+def get_total_files(username, password, course, types):
+    page = get_course_page(username, password, course)
+    if page is None:
         return 0
-    soup = BeautifulSoup(resp.text, 'html.parser')
-    all_cards = soup.select(".card-body")
-    total_files = 0
-    for card in all_cards:
-        title = card.find("div").get_text().strip().split("\n")[0]
-        last_open = title.rfind("(")
-        last_close = title.rfind(")")
-        if last_open != -1 and last_close != -1 and last_close > last_open:
-            title = title[last_open + 1 : last_close]
-        if title in types:
-            total_files += 1
-    return total_files
\ No newline at end of file
+    return sum(1 for item in page.items if item.type in types)
+
+
+@dataclass
+class CourseJob:
+    """A course to sync with download_courses, and which of its content types to fetch."""
+    course: CourseRef
+    types: list = None  # Content types to download; None for all (or all VoD types with vods_only)
+    vods_only: bool = False
+
+    def select_types(self, available):
+        if self.types:
+            return [content_type for content_type in available if content_type in self.types]
+        if self.vods_only:
+            return filter_vod_types(available)
+        return list(available)
+
+
+def download_courses(username, password, jobs, progress_for=None, on_course_done=None, cancellation_check=None,
+                     max_parallel_courses=DEFAULT_PARALLEL_COURSES, max_transfers=DEFAULT_MAX_TRANSFERS, dry_run=False,
+                     **options):
+    """
+    Syncs several courses in parallel.
+
+    Up to max_parallel_courses courses are processed at once. All of them share
+    the pooled session of the user and one semaphore that allows at most
+    max_transfers file/VoD transfers at any time, however many courses run.
+    Each course is planned (plan_course) before it is downloaded; with dry_run
+    set, only the plans are made.
+
+    Args:
+        username (str): The username for authentication.
+        password (str): The password for authentication.
+        jobs (list): CourseJob per course.
+        progress_for (callable, optional): Called as progress_for(job, plan) right before a
+                                           course starts downloading; returns a dict of
+                                           download_content progress arguments for that course,
+                                           e.g. {'progress_tracker': tracker}.
+        on_course_done (callable, optional): Called as on_course_done(job, result) when a course
+                                             finishes, from a worker thread.
+        cancellation_check (callable, optional): Returning True skips courses not started yet
+                                                 and stops the running ones.
+        max_parallel_courses (int): Courses processed at once.
+        max_transfers (int): Transfers running at once across all courses.
+        dry_run (bool): Plan the courses without downloading anything.
+        **options: Further download_content arguments (output_folder, org_mode, ...).
+
+    Returns:
+        dict: Course name -> result, where result is {'status': 'done', 'types': [...]},
+              {'status': 'planned', 'types': [...], 'plan': DownloadPlan} (dry run),
+              {'status': 'skipped', 'reason': ...} or {'status': 'failed', 'error': ...}.
+    """
+    transfer_slots = threading.BoundedSemaphore(max(1, max_transfers))
+    results = {}
+    # A course listed twice (e.g. in two seasons) must not be synced twice at the same time
+    unique_jobs = {}
+    for job in jobs:
+        unique_jobs.setdefault(job.course, job)
+
+    def sync(job):
+        page_types = get_types(username, password, job.course)
+        if 'types' not in page_types:
+            return {'status': 'failed', 'error': 'course page could not be loaded'}
+        types = job.select_types(page_types['types'])
+        if not types:
+            return {'status': 'skipped', 'reason': 'no matching content types'}
+        plan = plan_course(username, password, job.course, types,
+                           **{name: value for name, value in options.items() if name in PLAN_OPTIONS})
+        if plan is None:
+            return {'status': 'failed', 'error': 'course page could not be loaded'}
+        if dry_run:
+            return {'status': 'planned', 'types': types, 'plan': plan}
+        progress = progress_for(job, plan) if progress_for else None
+        outcome = download_content(username, password, job.course, types, cancellation_check=cancellation_check,
+                                   transfer_slots=transfer_slots, plan=plan, **options, **(progress or {}))
+        if isinstance(outcome, dict) and not outcome.get('success', True):
+            return {'status': 'failed', 'error': outcome.get('error', 'download failed')}
+        return {'status': 'done', 'types': types}
+
+    def run(job):
+        if cancellation_check and cancellation_check():
+            result = {'status': 'skipped', 'reason': 'cancelled'}
+        else:
+            try:
+                result = sync(job)
+            except Exception as e:
+                print(f"Error syncing course {job.course.name}: {e}")
+                result = {'status': 'failed', 'error': str(e)}
+        results[job.course.name] = result
+        if on_course_done:
+            on_course_done(job, result)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_parallel_courses)) as executor:
+        list(executor.map(run, unique_jobs.values()))
+    return results
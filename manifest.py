@@ -0,0 +1,102 @@
+import os
+import sqlite3
+import threading
+import time
+
+MANIFEST_FILENAME = ".cms-manifest.sqlite3"
+# Seconds a write waits for another connection (e.g. a course synced in parallel
+# into the same folder) to release the database
+BUSY_TIMEOUT = 30
+
+
+class DownloadManifest:
+    """
+    Records every file downloaded into an output folder.
+
+    Items are keyed by the CMS content id (the id of the card's div[id^=content])
+    and the download href, and remember where the file was saved, its size and
+    the ETag/Last-Modified validators it was served with. Paths are stored
+    relative to the output folder so the whole folder can be moved.
+
+    The manifest is shared by the download workers, so all access goes through
+    a single lock. Other connections to the same folder (courses synced in
+    parallel, another run) are waited for: the database is in WAL mode, so
+    readers never block the writer, and a write waits up to BUSY_TIMEOUT for
+    another one to finish.
+    """
+
+    def __init__(self, root_folder):
+        self.root_folder = os.path.abspath(root_folder)
+        os.makedirs(self.root_folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(self.root_folder, MANIFEST_FILENAME),
+                                     timeout=BUSY_TIMEOUT, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                " content_id TEXT NOT NULL,"
+                " href TEXT NOT NULL,"
+                " path TEXT NOT NULL,"
+                " size INTEGER,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " updated_at REAL,"
+                " PRIMARY KEY (content_id, href))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS items_path ON items (path)")
+
+    def _to_row_path(self, path):
+        return os.path.relpath(os.path.abspath(path), self.root_folder)
+
+    def _from_row(self, row):
+        if row is None:
+            return None
+        content_id, href, path, size, etag, last_modified = row
+        return {
+            'content_id': content_id,
+            'href': href,
+            'path': os.path.join(self.root_folder, path),
+            'size': size,
+            'etag': etag,
+            'last_modified': last_modified,
+        }
+
+    def get(self, content_id, href):
+        """Return the recorded item for a content id and href, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_id, href, path, size, etag, last_modified FROM items WHERE content_id = ? AND href = ?",
+                (content_id, href),
+            ).fetchone()
+        return self._from_row(row)
+
+    def get_by_path(self, path):
+        """Return the item most recently recorded at a local path, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_id, href, path, size, etag, last_modified FROM items WHERE path = ? ORDER BY updated_at DESC",
+                (self._to_row_path(path),),
+            ).fetchone()
+        return self._from_row(row)
+
+    def record(self, content_id, href, path, size=None, etag=None, last_modified=None):
+        """Insert or update the item for a content id and href."""
+        if size is None and os.path.exists(path):
+            size = os.path.getsize(path)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO items (content_id, href, path, size, etag, last_modified, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (content_id, href, self._to_row_path(path), size, etag, last_modified, time.time()),
+            )
+
+    def is_intact(self, item):
+        """True if the recorded file is still on disk with the recorded size."""
+        path = item['path']
+        return os.path.isfile(path) and (item['size'] is None or os.path.getsize(path) == item['size'])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
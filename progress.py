@@ -0,0 +1,144 @@
+import time
+
+# Weight of the newest sample in the smoothed transfer rate
+RATE_SMOOTHING = 0.3
+
+
+def format_duration(seconds):
+    """Formats seconds as "1:02:03" or "02:03"."""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+def format_bytes_progress(bytes_done, total):
+    """Formats a transfer as "1.50 MB / 10.00 MB (15.0%)"."""
+    if total > 0:
+        percent = (bytes_done / total) * 100
+        return f"{bytes_done/1024/1024:.2f} MB / {total/1024/1024:.2f} MB ({percent:.1f}%)"
+    return f"{bytes_done/1024/1024:.2f} MB / ? MB"
+
+
+class ProgressTracker:
+    """
+    Collects download progress from worker threads for a UI to poll.
+
+    Workers only ever replace whole values (a tuple per file, an int or a
+    string attribute), which is atomic in CPython, so writing never takes a
+    lock and never schedules UI work. The UI calls snapshot() at its own
+    frame rate, which is where totals, the transfer rate and the status text
+    of the current file are computed. UI cost therefore does not grow with
+    transfer speed or with the number of workers.
+
+    Once the run is planned (set_plan), progress and the ETA are weighted by
+    the expected bytes of the downloads instead of the number of files.
+
+    Files are told apart by a key, normally their output path: titles such as
+    "Lecture 1" repeat across weeks and courses. The key defaults to the name.
+
+    The tracker can also be passed as a plain progress_callback.
+    """
+
+    def __init__(self):
+        self.files_done = 0
+        self.total_files = 0
+        self._current = (None, None)  # (key, name) of the file reported last
+        self.bytes_expected = None  # Planned bytes of the downloads of known size, None until set_plan
+        self.sized_files = 0
+        self.unsized_files = 0      # Planned downloads of unknown size (VoDs, ...)
+        self.unsized_done = 0       # ... of which this many have finished
+        self._files = {}  # file key -> (bytes done, total bytes, status text or None)
+        self._rate = 0.0
+        self._last_sample = None  # (monotonic time, bytes done)
+
+    @property
+    def current_file(self):
+        """Name of the file reported last, or None."""
+        return self._current[1]
+
+    def __call__(self, downloaded, total, current_file, file_progress_str=None):
+        if file_progress_str in ("Downloaded", "Already Exists", "VoD"):
+            self.file_done(downloaded, total, current_file, file_progress_str)
+        else:
+            self.file_status(current_file, file_progress_str)
+
+    def set_plan(self, bytes_expected, sized_files, unsized_files):
+        """Record the planned downloads: total bytes of the sized ones, and how many have a known/unknown size."""
+        self.sized_files = sized_files
+        self.unsized_files = unsized_files
+        self.unsized_done = 0
+        self.bytes_expected = bytes_expected
+
+    def file_bytes(self, name, bytes_done, total, key=None):
+        """Record the byte progress of a file (called for every chunk)."""
+        key = name if key is None else key
+        self._files[key] = (bytes_done, total, None)
+        self._current = (key, name)
+
+    def file_status(self, name, status, key=None):
+        """Record a preformatted status for a file, e.g. yt-dlp progress of a VoD."""
+        key = name if key is None else key
+        previous = self._files.get(key)
+        bytes_done, total = (previous[0], previous[1]) if previous else (0, 0)
+        self._files[key] = (bytes_done, total, status)
+        self._current = (key, name)
+
+    def file_done(self, files_done, total_files, name, status, key=None):
+        """Record that a file finished (downloaded, skipped or handed over as a VoD)."""
+        key = name if key is None else key
+        previous = self._files.get(key)
+        bytes_done = previous[0] if previous else 0
+        self._files[key] = (bytes_done, bytes_done, status)
+        self.files_done = files_done
+        self.total_files = total_files
+        self._current = (key, name)
+
+    def snapshot(self):
+        """
+        Summarizes the current progress; call from the UI thread.
+
+        Returns:
+            dict: 'files_done', 'total_files', 'bytes_done', 'bytes_total',
+                  'rate' (bytes/s, smoothed), 'current_file', 'status'
+                  (text describing the current file's progress, or None),
+                  'fraction' (0-1, byte weighted; None before set_plan) and
+                  'eta' (seconds left, or None if unknown).
+        """
+        files = list(self._files.values())
+        bytes_done = sum(entry[0] for entry in files)
+        bytes_total = sum(entry[1] for entry in files)
+
+        now = time.monotonic()
+        if self._last_sample is not None:
+            elapsed = now - self._last_sample[0]
+            if elapsed > 0:
+                sample = max(0, bytes_done - self._last_sample[1]) / elapsed
+                self._rate += RATE_SMOOTHING * (sample - self._rate)
+        self._last_sample = (now, bytes_done)
+
+        current_key, current_file = self._current
+        status = None
+        entry = self._files.get(current_key) if current_key is not None else None
+        if entry is not None:
+            status = entry[2] if entry[2] is not None else format_bytes_progress(entry[0], entry[1])
+        fraction = eta = None
+        if self.bytes_expected is not None:
+            # A download of unknown size counts as much as an average sized one
+            average = self.bytes_expected / self.sized_files if self.sized_files else 1
+            weight = self.bytes_expected + average * self.unsized_files
+            done = min(bytes_done, self.bytes_expected) + average * self.unsized_done
+            fraction = min(1.0, done / weight) if weight > 0 else 1.0
+            if self._rate > 0:
+                eta = max(0.0, weight - done) / self._rate
+        return {
+            'files_done': self.files_done,
+            'total_files': self.total_files,
+            'bytes_done': bytes_done,
+            'bytes_total': bytes_total,
+            'rate': self._rate,
+            'current_file': current_file,
+            'status': status,
+            'fraction': fraction,
+            'eta': eta,
+        }
@@ -1,8 +1,18 @@
-from bs4 import BeautifulSoup
 import json
 import re
-import requests
-from requests_ntlm import HttpNtlmAuth
+import threading
+import time
+import timing
+from cms_session import fetch_page, cache_path, write_json_file, CMS_URL
+
+COURSES_URL = CMS_URL + "/apps/student/ViewAllCourseStn"
+
+# How long a scraped course catalogue is trusted before ViewAllCourseStn is fetched again
+CATALOGUE_TTL = 15 * 60  # seconds
+
+_catalogues = {}
+_catalogues_lock = threading.Lock()
+
 
 def parse_courses_html_from_url(username, password):
     """
@@ -17,116 +27,161 @@ def parse_courses_html_from_url(username, password):
               Each course dictionary contains 'name', 'id', and 'sid'.
               Returns an empty dictionary if the request fails or parsing fails.
     """
-    url = "https://cms.guc.edu.eg/apps/student/ViewAllCourseStn"
-    
+    html_content = _fetch_courses_html(username, password)[1]
+    if html_content is None:
+        return {}
+    return parse_courses_html(html_content)
+
+
+def _fetch_courses_html(username, password):
+    """Conditionally fetch ViewAllCourseStn; returns (status code, html or None)."""
     try:
-        resp = requests.get(url, auth=HttpNtlmAuth(username.strip()+"@student.guc.edu.eg", password))
-        
-        if resp.status_code != 200:
-            print(f"Error: Request failed with status code {resp.status_code}. Check credentials and try again.")
-            return {}
-            
-        html_content = resp.text
+        resp, html_content = fetch_page(username, password, COURSES_URL)
     except Exception as e:
         print(f"Error fetching content from URL: {e}")
-        return {}
+        return None, None
+
+    if html_content is None:
+        print(f"Error: Request failed with status code {resp.status_code}. Check credentials and try again.")
+    return resp.status_code, html_content
+
+
+def parse_courses_html(html_content):
+    """
+    Parses the HTML of ViewAllCourseStn into courses grouped by season.
+
+    Uses the configured parser backend (see cms_parser.get_backend).
+
+    Args:
+        html_content (str): The page HTML.
+
+    Returns:
+        dict: Season titles mapped to lists of {'name', 'id', 'sid'} course dictionaries.
+    """
+    # The parser (and BeautifulSoup) is only imported when a page is parsed, which
+    # keeps the catalogue snapshot cheap to load at start-up
+    from cms_parser import parse_catalogue
+    with timing.span("catalogue.parse"):
+        return parse_catalogue(html_content)
+
+
+class CourseCatalogue:
+    """
+    The course listing of one user, indexed for constant time lookups by name.
+
+    Attributes:
+        by_season (dict): Season title -> list of course dictionaries, as returned
+                          by parse_courses_html_from_url.
+        by_name (dict): Course name -> (id, sid, season title). If a name appears
+                        in several seasons the first one listed wins.
+        fetched_at (float): Unix time at which the listing was scraped.
+    """
+
+    def __init__(self, by_season, fetched_at=None):
+        self.by_season = by_season
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self.by_name = {}
+        for season_title, courses in by_season.items():
+            for course in courses:
+                self.by_name.setdefault(course['name'], (course['id'], course['sid'], season_title))
+
+    def lookup(self, name):
+        """Return (id, sid, season title) for a course name, or None."""
+        return self.by_name.get(name)
 
-    soup = BeautifulSoup(html_content, 'html.parser')
-    all_courses_by_season = {}
-
-    # Find all card-hover-shadow profile-responsive card-border mb-3 card divs, which represent seasons
-    season_cards = soup.find_all('div', class_='card-hover-shadow profile-responsive card-border mb-3 card')
-
-    for card in season_cards:
-        # Extract season title
-        season_title_div = card.find('div', class_='menu-header-title')
-        season_title = ""
-        if season_title_div:
-            season_title = season_title_div.get_text(strip=True).replace('Season :', '').replace('Title:', '').strip()
-            # Replace comma with dash for better folder naming
-            season_title = season_title.replace(',', ' -')
-            # Normalize whitespace in season/session name
-            season_title = re.sub(r"\s+", " ", season_title)
-        else:
-            # Fallback if the specific div is not found, though it should be present
-            season_title = "Unknown Season"
-
-        # Find the table within the current season card
-        table = card.find('table', class_='table')
-
-        if table:
-            courses = []
-            # Find all table rows (tr) - handle both tbody and direct tr elements
-            tbody = table.find('tbody')
-            if tbody:
-                rows = tbody.find_all('tr')
-            else:
-                # If no tbody, get all tr elements directly from table
-                rows = table.find_all('tr')
-
-            if not rows:
-                continue  # No rows found, skip this season
-
-            # Get the header row to find the index of Name, ID, and SeasonId
-            # Check if there's a <thead>; if not, assume first <tr> is the header
-            header_row_container = table.find('thead')
-            if not header_row_container:
-                # If no thead, use the first row as header and then process the rest
-                if rows:
-                    header_row_elements = rows[0].find_all(['th', 'td']) # Headers can sometimes be td in tbody
-                    headers = [element.get_text(strip=True) for element in header_row_elements]
-                    data_rows = rows[1:] # Actual data rows start from the second row
-                else:
-                    continue # No rows in table
-            else:
-                header_row_elements = header_row_container.find('tr').find_all(['th', 'td'])
-                headers = [element.get_text(strip=True) for element in header_row_elements]
-                data_rows = rows
-
-            name_index = -1
-            id_index = -1
-            season_id_index = -1
-
-            for i, header in enumerate(headers):
-                if 'Name' in header: # Use 'in' for more robustness
-                    name_index = i
-                elif 'ID' in header and not 'SeasonId' in header: # Ensure it's the course ID
-                    id_index = i
-                elif 'SeasonId' in header:
-                    season_id_index = i
-
-            # Iterate over each course data row
-            for row in data_rows:
-                cols = row.find_all('td')
-                # Ensure there are enough columns to extract data
-                if len(cols) > max(name_index, id_index, season_id_index):
-                    # Extract text, remove parentheses and numbers for cleaner name if desired, or keep as is
-                    course_full_name = cols[name_index].get_text(" ", strip=True) if name_index != -1 else 'N/A'
-                    # Use regex to extract code and name, ignore all bracketed content at the end
-                    match = re.match(r"\(\|([A-Za-z0-9 ]+)\|\)\s*([^(]+?)(?:\s*\([^)]*\))*$", course_full_name)
-                    if match:
-                        code = match.group(1).strip()
-                        name = match.group(2).strip()
-                        # Format as "Course Name (CODE)" for consistency
-                        clean_name = f"{name} ({code})" if code else name
-                    else:
-                        # fallback: remove last bracketed number if present
-                        clean_name = re.sub(r"\s*\([^)]*\)\s*$", "", course_full_name).strip()
-                    # Normalize whitespace to a single space
-                    clean_name = re.sub(r"\s+", " ", clean_name)
-                    
-                    course_id = cols[id_index].get_text(strip=True) if id_index != -1 else 'N/A'
-                    session_id = cols[season_id_index].get_text(strip=True) if season_id_index != -1 else 'N/A'
-
-                    courses.append({
-                        'name': clean_name,
-                        'id': course_id,
-                        'sid': session_id
-                    })
-            if season_title: # Only add if a valid season title was found
-                all_courses_by_season[season_title] = courses
-
-    return all_courses_by_season
+    def is_fresh(self, ttl=CATALOGUE_TTL):
+        return time.time() - self.fetched_at < ttl
+
+    def course_options(self):
+        """The listing as dropdown entries: "--- <season> ---" headers, each followed by "  <course name>" entries."""
+        options = []
+        for season_title, courses in self.by_season.items():
+            options.append(f"--- {season_title} ---")
+            options.extend(f"  {course['name']}" for course in courses)
+        return options
+
+
+def _snapshot_path(username):
+    safe_name = re.sub(r"[^A-Za-z0-9._-]", "_", username.strip().lower())
+    return cache_path(f"catalogue_{safe_name}.json")
+
+
+def load_catalogue_snapshot(username):
+    """
+    Loads the on-disk catalogue snapshot of a user, however old it is.
+
+    Returns:
+        CourseCatalogue: The snapshot, or None if there is none or it is unreadable.
+    """
+    try:
+        with open(_snapshot_path(username), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return CourseCatalogue(data['courses'], data['fetched_at'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_catalogue_snapshot(username, catalogue):
+    """Writes a catalogue snapshot for a user (no credentials are stored)."""
+    try:
+        write_json_file(_snapshot_path(username), {'fetched_at': catalogue.fetched_at, 'courses': catalogue.by_season})
+    except OSError as e:
+        print(f"Could not save course catalogue snapshot: {e}")
+
+
+def get_course_catalogue(username, password, ttl=CATALOGUE_TTL, refresh=False, snapshot=False):
+    """
+    Returns the course catalogue of a user, scraping ViewAllCourseStn only when needed.
+
+    The catalogue is kept in memory per user for `ttl` seconds. With `snapshot`
+    set, a fresh enough on-disk snapshot is used before scraping, and every new
+    scrape is written back to disk. Expired copies are revalidated with a
+    conditional GET and reused as-is if the listing has not changed.
+
+    Args:
+        username (str): The username for authentication.
+        password (str): The password for authentication.
+        ttl (float): Maximum age in seconds of a cached catalogue.
+        refresh (bool): Ignore cached copies and scrape again.
+        snapshot (bool): Read and write the on-disk snapshot.
+
+    Returns:
+        CourseCatalogue: The catalogue. If the CMS could not be reached or answered
+                         with a server error, an expired cached copy is returned
+                         when there is one; it is empty on any other failure.
+    """
+    key = username.strip()
+    with _catalogues_lock:
+        cached = _catalogues.get(key)
+    if cached is None and snapshot:
+        cached = load_catalogue_snapshot(username)
+    if cached is not None and cached.is_fresh(ttl) and not refresh:
+        with _catalogues_lock:
+            _catalogues[key] = cached
+        return cached
+
+    status_code, html_content = _fetch_courses_html(username, password)
+    if status_code == 304 and cached is not None:
+        # The listing did not change since it was cached: skip parsing it again
+        catalogue = CourseCatalogue(cached.by_season)
+    else:
+        all_courses_by_season = parse_courses_html(html_content) if html_content is not None else {}
+        if not all_courses_by_season:
+            # Scraping failed; don't cache the failure. While the CMS is unreachable or
+            # failing, an expired copy beats no catalogue: it keeps its fetched_at, so the
+            # next call tries the CMS again. Anything else (e.g. rejected credentials) is
+            # reported as before
+            if cached is not None and (status_code is None or status_code >= 500):
+                print("Could not refresh the course list, using the cached one")
+                return cached
+            return CourseCatalogue({})
+        catalogue = CourseCatalogue(all_courses_by_season)
+
+    with _catalogues_lock:
+        _catalogues[key] = catalogue
+    if snapshot:
+        save_catalogue_snapshot(username, catalogue)
+    return catalogue
 
 # Example usage:
 # parsed_data = parse_courses_html_from_url('your_username', 'your_password')
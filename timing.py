@@ -0,0 +1,193 @@
+import json
+import math
+import threading
+import time
+
+# Phases recorded by the sync pipeline. "seconds" of a phase add up the time
+# spent in it by every thread, so with parallel workers they can exceed the
+# wall time of the run.
+#
+#   login           Login check request (main.login)
+#   ntlm.handshake  NTLM negotiation of a new connection, including the request it authenticates
+#   page.fetch      Conditional GET of a CMS page (cms_session.fetch_page), per URL
+#   catalogue.parse Parsing ViewAllCourseStn
+#   page.parse      Parsing a course page, per URL
+#   file.size       HEAD request sizing a planned file, per file
+#   file.transfer   Downloading a file, from the request to the rename, per file
+#   disk.write      Writing the body of a file to disk, per file
+#   vod.resolve     Dacast lookups of a VoD's HLS URL, per VoD
+#   vod.download    Whole download of a VoD (segments and remux, or yt-dlp), per VoD
+#   hls.segment     Fetching one HLS segment, per segment URL
+#   vod.remux       ffmpeg copying the fetched segments into the video file, per VoD
+PERCENTILES = (50, 90, 99)
+SLOWEST_ITEMS = 10  # Slowest per-item samples listed in a report
+
+
+class _NullSpan:
+    """What span() returns while timing is off: entering, leaving and setting attributes do nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """
+    Times a block of code and records it with the run's Recorder when the block ends.
+
+    Attributes:
+        phase (str): Phase name, e.g. "file.transfer".
+        item (str): What the phase worked on (file title, URL, ...), or None.
+        bytes (int): Bytes moved by the block; may be set inside the block.
+    """
+    __slots__ = ("recorder", "phase", "item", "bytes", "_started")
+
+    def __init__(self, recorder, phase, item=None):
+        self.recorder = recorder
+        self.phase = phase
+        self.item = item
+        self.bytes = 0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.recorder.add(self.phase, time.perf_counter() - self._started, self.item, self.bytes, exc_type is None)
+        return False
+
+
+class Recorder:
+    """Thread-safe collection of the timing samples of one run."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.samples = []  # (phase, seconds, item, bytes, succeeded)
+
+    def add(self, phase, seconds, item=None, size=0, succeeded=True):
+        with self._lock:
+            self.samples.append((phase, seconds, item, size, succeeded))
+
+    def report(self):
+        """
+        Summarizes the samples recorded so far.
+
+        Returns:
+            dict: {'started_at', 'wall_seconds',
+                   'phases': {phase: {'count', 'errors', 'seconds', 'bytes', 'p50', 'p90', 'p99', 'max'}},
+                   'files': {'count', 'bytes', 'p50', 'p90', 'p99', 'max'} (file.transfer latencies),
+                   'http': run_stats counters,
+                   'slowest': [{'phase', 'item', 'seconds', 'bytes'}, ...]}
+        """
+        from http_policy import run_stats  # Imported late: span() must stay cheap to import
+        with self._lock:
+            samples = list(self.samples)
+        by_phase = {}
+        for sample in samples:
+            by_phase.setdefault(sample[0], []).append(sample)
+
+        phases = {}
+        for phase, phase_samples in by_phase.items():
+            summary = {'count': len(phase_samples),
+                       'errors': sum(1 for sample in phase_samples if not sample[4]),
+                       'seconds': round(sum(sample[1] for sample in phase_samples), 6),
+                       'bytes': sum(sample[3] for sample in phase_samples)}
+            summary.update(latency_summary([sample[1] for sample in phase_samples]))
+            phases[phase] = summary
+
+        transfers = by_phase.get("file.transfer", [])
+        files = {'count': len(transfers), 'bytes': sum(sample[3] for sample in transfers)}
+        files.update(latency_summary([sample[1] for sample in transfers]))
+
+        slowest = sorted((sample for sample in samples if sample[2] is not None), key=lambda sample: -sample[1])
+        return {
+            'started_at': round(self.started_at, 3),
+            'wall_seconds': round(time.perf_counter() - self._started, 6),
+            'phases': phases,
+            'files': files,
+            'http': run_stats.snapshot(),
+            'slowest': [{'phase': phase, 'item': item, 'seconds': round(seconds, 6), 'bytes': size}
+                        for phase, seconds, item, size, _ in slowest[:SLOWEST_ITEMS]],
+        }
+
+
+def latency_summary(values):
+    """Nearest-rank PERCENTILES and maximum of a list of durations, e.g. {'p50': 0.2, ..., 'max': 1.5}."""
+    if not values:
+        return {}
+    values = sorted(values)
+    summary = {f"p{percent}": round(values[max(0, math.ceil(percent / 100 * len(values)) - 1)], 6)
+               for percent in PERCENTILES}
+    summary['max'] = round(values[-1], 6)
+    return summary
+
+
+_recorder = None  # Recorder of the current run, None while timing is off
+
+
+def enabled():
+    return _recorder is not None
+
+
+def span(phase, item=None):
+    """
+    Context manager timing one phase of the current run.
+
+    While no run is being timed this returns a shared do-nothing object, so an
+    instrumented block only costs a function call and a global lookup.
+
+    Args:
+        phase (str): Phase name (see the list at the top of this module).
+        item (str, optional): What the phase works on; items show up in the slowest list.
+    """
+    recorder = _recorder
+    if recorder is None:
+        return _NULL_SPAN
+    return Span(recorder, phase, item)
+
+
+def record(phase, seconds, item=None, size=0):
+    """Records a duration measured by the caller (see main.copy_body); ignored while timing is off."""
+    recorder = _recorder
+    if recorder is not None:
+        recorder.add(phase, seconds, item, size)
+
+
+def start_run():
+    """Starts timing a run, discarding the samples of any previous one."""
+    global _recorder
+    _recorder = Recorder()
+    return _recorder
+
+
+def finish_run():
+    """
+    Stops timing and returns the report of the run (see Recorder.report).
+
+    Returns:
+        dict: The report, or None if no run was being timed.
+    """
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder.report() if recorder is not None else None
+
+
+def write_report(report, path):
+    """Writes a run report as JSON; returns an error message, or None on success."""
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    except OSError as e:
+        return f"Could not write the run report to {path}: {e}"
+    return None
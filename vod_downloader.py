@@ -3,11 +3,486 @@ from requests_ntlm import HttpNtlmAuth
 from bs4 import BeautifulSoup
 import os
 import re
+import signal
 import subprocess
 import sys
 import shutil
+import threading
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+import dacast
+import hls
+import timing
+from http_policy import build_session
+from cms_session import CMS_URL
 
-def download_single_video(content_id, output_filename=None, username=None, password=None):
+# Resolution is two small API calls, so it can run wide; each download runs a
+# yt-dlp + ffmpeg process, so those are capped by CPU count.
+RESOLVE_WORKERS = 8
+DEFAULT_VOD_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+
+# "native": segments are fetched in parallel by hls.fetch_segments and ffmpeg only
+# remuxes them (-c copy); streams hls cannot handle fall back to yt-dlp.
+# "yt-dlp": yt-dlp downloads the whole stream through ffmpeg, one segment at a time.
+VOD_DOWNLOADER = os.environ.get("VOD_DOWNLOADER", "native")
+# Rendition downloaded from a multi-bitrate stream (see hls.check_quality), e.g. "720p"
+VOD_QUALITY = os.environ.get("VOD_QUALITY", "best")
+
+
+def resolve_hls_url(content_id, refresh=False):
+    """
+    Resolves a GUC CMS video contentId to its Dacast HLS stream URL.
+
+    Short "_"-style content IDs are first expanded through the Dacast info API.
+    Neither request requires GUC authentication, and both answers are cached
+    on disk (see dacast.DacastClient), so re-runs skip them.
+
+    Args:
+        content_id (str): The content ID of the video (the id of its vodbutton).
+        refresh (bool): Ignore a cached HLS URL.
+
+    Returns:
+        str: The HLS URL, or None if it could not be resolved.
+    """
+    return dacast.get_client().hls_url(content_id, refresh)
+
+
+# yt-dlp's own progress line, e.g.
+# "[download]  45.3% of ~ 512.00MiB at  2.31MiB/s ETA 03:12 (frag 120/265)"
+YTDLP_PROGRESS_RE = re.compile(
+    r"\[download\]\s+(?P<percent>[\d.]+)%"
+    r"(?:\s+of\s+~?\s*(?P<size>[\d.]+\s*\w+))?"
+    r"(?:\s+at\s+(?P<speed>[\d.]+\s*\w+/s))?"
+    r"(?:\s+ETA\s+(?P<eta>[\d:]+))?"
+    r"(?:\s+\(frag\s+(?P<frag>\d+/\d+)\))?"
+)
+# ffmpeg's input header ("Duration: 01:30:12.40") and status line
+# ("size=  123456kB time=00:12:34.56 bitrate=1234.5kbits/s speed=2.05x"), which
+# yt-dlp passes through when it uses ffmpeg as the downloader
+FFMPEG_DURATION_RE = re.compile(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)")
+FFMPEG_STATUS_RE = re.compile(r"size=\s*(?P<size>\d+\s*\w+)\s+time=\s*(?P<h>\d+):(?P<m>\d+):(?P<s>\d+(?:\.\d+)?).*?speed=\s*(?P<speed>[\d.]+x)")
+
+# Lines of child output kept for the error report of a failed download
+OUTPUT_TAIL_LINES = 40
+# A finished video may fall this much short of the stream's duration (share, plus
+# seconds) before it is rejected as incomplete
+DURATION_TOLERANCE = 0.02
+DURATION_SLACK = 2.0
+
+
+def parse_progress_line(line, state):
+    """
+    Updates a progress state dict from one line of yt-dlp/ffmpeg output.
+
+    The state holds whatever is known so far: 'percent', 'size' (total),
+    'downloaded', 'speed', 'eta', 'frag' and ffmpeg's 'duration'/'time' in seconds.
+
+    Returns:
+        bool: True if the line carried progress information.
+    """
+    match = YTDLP_PROGRESS_RE.search(line)
+    if match:
+        state.update({key: value for key, value in match.groupdict().items() if value})
+        state['percent'] = float(match.group('percent'))
+        return True
+
+    match = FFMPEG_DURATION_RE.search(line)
+    if match:
+        hours, minutes, seconds = match.groups()
+        state['duration'] = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+        return False
+
+    match = FFMPEG_STATUS_RE.search(line)
+    if match:
+        position = int(match.group('h')) * 3600 + int(match.group('m')) * 60 + float(match.group('s'))
+        state['time'] = position
+        state['downloaded'] = match.group('size')
+        state['speed'] = match.group('speed')
+        duration = state.get('duration')
+        if duration:
+            state['percent'] = min(100.0, position / duration * 100)
+            speed = float(match.group('speed')[:-1])
+            if speed > 0:
+                remaining = int((duration - position) / speed)
+                state['eta'] = f"{remaining // 60:02d}:{remaining % 60:02d}"
+        return True
+    return False
+
+
+def format_progress(state):
+    """Formats a progress state as e.g. "45.3% of 512.00MiB at 2.31MiB/s, ETA 03:12 (frag 120/265)"."""
+    parts = []
+    if 'percent' in state:
+        parts.append(f"{state['percent']:.1f}%")
+    if state.get('size'):
+        parts.append(f"of {state['size']}")
+    if state.get('downloaded'):
+        parts.append(state['downloaded'])
+    if state.get('speed'):
+        parts.append(f"at {state['speed']}")
+    text = " ".join(parts)
+    if state.get('eta'):
+        text += f", ETA {state['eta']}"
+    if state.get('frag'):
+        text += f" (frag {state['frag']})"
+    return text
+
+
+def find_ffmpeg():
+    """Path of ffmpeg: $FFMPEG_PATH, else ffmpeg from PATH."""
+    ffmpeg_env = os.environ.get('FFMPEG_PATH')
+    if ffmpeg_env:
+        return ffmpeg_env
+    if sys.platform.startswith('win'):
+        return 'ffmpeg'
+    return shutil.which('ffmpeg') or 'ffmpeg'
+
+
+def download_hls(hls_url, output_filename, on_progress=None, should_stop=None, downloader=None, quality=None):
+    """
+    Downloads an HLS stream into output_filename with the configured downloader.
+
+    Args:
+        hls_url (str): The HLS (m3u8) URL of the video.
+        output_filename (str): Destination file.
+        on_progress (callable, optional): Called with formatted progress strings (see format_progress).
+        should_stop (callable, optional): Returning True cancels the download.
+        downloader (str, optional): "native" or "yt-dlp"; defaults to VOD_DOWNLOADER.
+        quality (str, optional): Rendition policy (see hls.check_quality); defaults to VOD_QUALITY.
+
+    Returns:
+        bool: True if the video was downloaded.
+    """
+    downloader = downloader or VOD_DOWNLOADER
+    quality = hls.check_quality(quality or VOD_QUALITY)
+    if downloader == "native":
+        try:
+            return download_hls_native(hls_url, output_filename, on_progress, should_stop, quality=quality)
+        except hls.UnsupportedStream as e:
+            print(f"Native HLS download not possible ({e}), falling back to yt-dlp")
+    elif downloader != "yt-dlp":
+        raise ValueError(f"Unknown VoD downloader: {downloader}")
+    return download_hls_ytdlp(hls_url, output_filename, on_progress, should_stop, quality)
+
+
+def download_hls_native(hls_url, output_filename, on_progress=None, should_stop=None, segment_workers=hls.SEGMENT_WORKERS, quality="best"):
+    """
+    Downloads an HLS stream by fetching its segments in parallel, then remuxing them with ffmpeg.
+
+    ffmpeg copies the segments (-c copy, no re-encoding) into a partial file
+    that only replaces output_filename once its duration matches the playlist
+    (see finish_video). The segments are kept in "<output_filename>.segments"
+    until then, so a download that fails or is cancelled picks up where it
+    stopped on the next attempt; only segments ffmpeg reports as unreadable
+    are fetched again. With quality "audio" only the audio streams are kept.
+
+    Returns:
+        bool: True if the video was downloaded.
+
+    Raises:
+        hls.UnsupportedStream: The stream needs yt-dlp (see hls.parse_media_playlist).
+    """
+    session = build_session(pool_size=segment_workers)
+    folder = output_filename + hls.SEGMENTS_SUFFIX
+    try:
+        playlist = hls.load_media_playlist(session, hls_url, quality)
+        if playlist is None:
+            return False
+        print(f"Fetching {len(playlist.segments)} segments ({playlist.duration / 60:.1f} min) with {segment_workers} connections")
+        reused = hls.prepare_folder(folder, playlist)
+        if reused:
+            print(f"Resuming: {reused} of {len(playlist.segments)} segments already fetched")
+        report = (lambda state: on_progress(format_progress(state))) if on_progress else None
+        local_playlist = hls.fetch_segments(session, playlist, folder, segment_workers, report, should_stop)
+    finally:
+        session.close()
+    if local_playlist is None:
+        if should_stop and should_stop():
+            print(f"Download cancelled: {output_filename}")
+        else:
+            print(f"❌ Download failed: {output_filename}")
+        return False
+    partial = partial_path(output_filename)
+    finished = (remux(local_playlist, partial, should_stop, audio_only=quality == "audio", playlist=playlist)
+                and finish_video(partial, output_filename, playlist.duration))
+    if not finished:
+        remove_file(partial)
+        return False
+    shutil.rmtree(folder, ignore_errors=True)
+    print("✅ Download completed successfully!")
+    print(f"Video saved as: {output_filename}")
+    return True
+
+
+def remux(playlist_path, output_filename, should_stop=None, audio_only=False, playlist=None):
+    """
+    Copies the streams of a local HLS playlist into output_filename with ffmpeg, without re-encoding.
+
+    With audio_only set, video streams are dropped. If ffmpeg fails and
+    playlist (the MediaPlaylist playlist_path was written for) is given, the
+    segments its log names are deleted (see hls.drop_segments).
+
+    Returns:
+        bool: True if ffmpeg succeeded.
+    """
+    cmd = [
+        # Warnings name the segments the HLS demuxer could not read
+        find_ffmpeg(), '-hide_banner', '-nostdin', '-loglevel', 'warning', '-y',
+        # The local playlist only references files next to it (segments, keys, init sections)
+        '-allowed_extensions', 'ALL', '-protocol_whitelist', 'file,crypto',
+        '-i', playlist_path,
+        '-map', '0:a' if audio_only else '0', '-c', 'copy',
+        output_filename
+    ]
+    with timing.span("vod.remux", output_filename):
+        try:
+            process = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, encoding='utf-8', errors='replace',
+                start_new_session=not sys.platform.startswith('win')
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"❌ Could not run ffmpeg: {e}")
+            return False
+        while True:
+            try:
+                output, _ = process.communicate(timeout=0.25)
+                break
+            except subprocess.TimeoutExpired:
+                if should_stop and should_stop():
+                    stop_process(process)
+                    print(f"Download cancelled: {output_filename}")
+                    return False
+    if process.returncode != 0:
+        print("❌ Remux failed!")
+        print("Error output: " + "\n".join(output.splitlines()[-OUTPUT_TAIL_LINES:]))
+        if playlist is not None:
+            dropped = hls.drop_segments(os.path.dirname(playlist_path), playlist, output)
+            if dropped:
+                print(f"Discarded {dropped} unreadable segments, they are fetched again next time")
+        return False
+    return True
+
+
+def ytdlp_format(quality):
+    """yt-dlp format selection (-f) for a rendition policy; None for "best", yt-dlp's default."""
+    if quality == "best":
+        return None
+    if quality == "smallest":
+        return "worst"
+    if quality == "audio":
+        return "bestaudio/worst"
+    limit, unit = hls.QUALITY_LIMIT_RE.fullmatch(quality).groups()
+    field = "height" if unit == "p" else "tbr"
+    return f"best[{field}<={limit}]/worst"
+
+
+def partial_path(output_filename):
+    """Where a video is written until it is finished: "Lecture.mkv" -> "Lecture.part.mkv"."""
+    root, extension = os.path.splitext(output_filename)
+    return root + ".part" + extension
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def remove_ytdlp_partial(partial):
+    # yt-dlp writes to "<partial>.part" and renames it to partial once it is done
+    remove_file(partial + ".part")
+    remove_file(partial)
+
+
+def probe_duration(path):
+    """
+    Reads the duration of a media file with ffmpeg.
+
+    Returns:
+        float: Duration in seconds, or None if the file has none (e.g. an
+               interrupted Matroska write) or ffmpeg cannot read it.
+
+    Raises:
+        OSError: ffmpeg could not be run.
+    """
+    try:
+        result = subprocess.run([find_ffmpeg(), '-hide_banner', '-nostdin', '-i', path],
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True, encoding='utf-8', errors='replace', timeout=60)
+    except subprocess.TimeoutExpired:
+        return None
+    match = FFMPEG_DURATION_RE.search(result.stdout)
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def finish_video(partial, output_filename, expected_duration=None):
+    """
+    Moves a downloaded video from its partial file to output_filename if it is complete.
+
+    The video must have a duration, and if expected_duration (seconds) is known
+    it may fall short of it by at most DURATION_TOLERANCE and DURATION_SLACK.
+    output_filename is replaced in one step, so it never holds a partial video.
+
+    Returns:
+        bool: True if the video was moved into place; the partial file is left otherwise.
+    """
+    try:
+        duration = probe_duration(partial)
+    except OSError as e:
+        print(f"❌ Could not check the downloaded video: {e}")
+        return False
+    if duration is None:
+        print(f"❌ Downloaded video has no duration, it is probably incomplete: {partial}")
+        return False
+    if expected_duration and duration < expected_duration * (1 - DURATION_TOLERANCE) - DURATION_SLACK:
+        print(f"❌ Downloaded video is incomplete: {duration:.0f}s of {expected_duration:.0f}s")
+        return False
+    os.replace(partial, output_filename)
+    return True
+
+
+def download_hls_ytdlp(hls_url, output_filename, on_progress=None, should_stop=None, quality="best"):
+    """
+    Downloads an HLS stream into output_filename with yt-dlp and ffmpeg.
+
+    The child's output is read line by line as it is produced instead of being
+    buffered, and every progress line is parsed and reported through on_progress.
+    A watcher thread kills the child as soon as should_stop returns True.
+
+    yt-dlp writes a partial file that replaces output_filename only after a
+    successful exit and a duration check against the stream (see
+    finish_video). ffmpeg cannot resume it, so it is deleted otherwise.
+
+    Args:
+        hls_url (str): The HLS (m3u8) URL of the video.
+        output_filename (str): Destination file.
+        on_progress (callable, optional): Called with a formatted progress string
+                                          such as "45.3% at 2.31MiB/s, ETA 03:12".
+        should_stop (callable, optional): Polled while the download runs; returning
+                                          True terminates yt-dlp and ffmpeg.
+        quality (str): Rendition policy, passed on as a yt-dlp format selection.
+
+    Returns:
+        bool: True if yt-dlp finished successfully.
+    """
+    print("Starting download with enhanced quality...")
+    
+    # Use yt-dlp with ffmpeg for better quality
+    # Allow overriding yt-dlp and ffmpeg paths via environment variables
+    yt_dlp_path = os.environ.get('YTDLP_PATH', 'yt-dlp')
+    ffmpeg_path = find_ffmpeg()
+    partial = partial_path(output_filename)
+    cmd = [
+        yt_dlp_path,
+        '--downloader', 'ffmpeg',
+        '--ffmpeg-location', ffmpeg_path,
+        '--hls-use-mpegts',
+        '--newline',
+        '-o', partial,
+        hls_url
+    ]
+    format_selection = ytdlp_format(quality)
+    if format_selection:
+        cmd[1:1] = ['-f', format_selection]
+    
+    print(f"Running command: {' '.join(cmd)}")
+    
+    try:
+        # Merge stderr into stdout; text mode turns ffmpeg's "\r" status updates into lines
+        process = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, encoding='utf-8', errors='replace', bufsize=1,
+            # Own process group, so cancelling also stops the ffmpeg child of yt-dlp
+            start_new_session=not sys.platform.startswith('win')
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"❌ An error occurred during download: {e}")
+        return False
+
+    cancelled = threading.Event()
+    finished = threading.Event()
+
+    def watch_for_cancel():
+        while not finished.wait(0.25):
+            if should_stop():
+                cancelled.set()
+                stop_process(process)
+                return
+
+    if should_stop:
+        threading.Thread(target=watch_for_cancel, daemon=True).start()
+
+    output_tail = deque(maxlen=OUTPUT_TAIL_LINES)
+    state = {}
+    try:
+        for line in process.stdout:
+            line = line.rstrip()
+            if not line:
+                continue
+            if parse_progress_line(line, state):
+                if on_progress:
+                    on_progress(format_progress(state))
+            else:
+                output_tail.append(line)
+        returncode = process.wait()
+    finally:
+        finished.set()
+        if process.poll() is None:
+            stop_process(process)
+
+    if cancelled.is_set():
+        print(f"Download cancelled: {output_filename}")
+        remove_ytdlp_partial(partial)
+        return False
+    
+    if returncode == 0 and finish_video(partial, output_filename, state.get('duration')):
+        print("✅ Download completed successfully!")
+        print(f"Video saved as: {output_filename}")
+        
+        # Check if file exists and show its size
+        if os.path.exists(output_filename):
+            file_size = os.path.getsize(output_filename)
+            print(f"File size: {file_size:,} bytes ({file_size/1024:.1f} KB)")
+        return True
+
+    remove_ytdlp_partial(partial)
+    if returncode != 0:
+        print("❌ Download failed!")
+        print("Error output: " + "\n".join(output_tail))
+    return False
+
+
+def stop_process(process, timeout=5):
+    """Terminates a child process and its children, killing them if they do not exit within timeout seconds."""
+    if process.poll() is not None:
+        return
+    if sys.platform.startswith('win'):
+        subprocess.run(['taskkill', '/F', '/T', '/PID', str(process.pid)], capture_output=True)
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+        except OSError:
+            process.terminate()
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        if sys.platform.startswith('win'):
+            process.kill()
+        else:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                process.kill()
+        process.wait()
+
+
+def download_single_video(content_id, output_filename=None, username=None, password=None, on_progress=None, should_stop=None, quality=None):
     """
     Downloads a single video from GUC CMS using its contentId.
     
@@ -16,6 +491,12 @@ def download_single_video(content_id, output_filename=None, username=None, passw
         output_filename (str, optional): Custom filename for the video. If None, uses "Video_{content_id}.mkv".
         username (str, optional): GUC username. If None, uses the global GUC_USERNAME.
         password (str, optional): GUC password. If None, uses the global GUC_PASSWORD.
+        on_progress (callable, optional): Receives formatted progress strings (see download_hls).
+        should_stop (callable, optional): Returning True cancels the download.
+        quality (str, optional): Rendition policy (see hls.check_quality); defaults to VOD_QUALITY.
+
+    Returns:
+        bool: True if the video was downloaded.
     """
     # Use global credentials if not provided
     if username is None:
@@ -30,107 +511,93 @@ def download_single_video(content_id, output_filename=None, username=None, passw
     print(f"Attempting to download video with contentId: {content_id}")
     print(f"Output filename: {output_filename}")
     
-    # First, try to get the actual content ID if the provided one is short
-    actual_content_id = content_id
-    
-    # Check if this looks like a short content ID (contains underscore and is relatively short)
-    if '_' in content_id and len(content_id) < 50:
-        print("Detected short content ID. Attempting to resolve to actual content ID...")
-        
-        # Try to get the actual content ID from the info API
-        info_url = f"https://playback.dacast.com/content/info?contentId={content_id}&provider=dacast"
-        
-        try:
-            info_resp = requests.get(info_url)
-            if info_resp.status_code == 200:
-                info_data = info_resp.json()
-                actual_content_id = info_data.get('contentInfo', {}).get('contentId')
-                
-                if actual_content_id:
-                    print(f"✅ Successfully resolved content ID: {content_id} -> {actual_content_id}")
-                else:
-                    print("❌ Could not find actual content ID in the response")
-                    return
-            else:
-                print(f"❌ Failed to resolve content ID. Info API returned status: {info_resp.status_code}")
-                return
-        except requests.RequestException as e:
-            print(f"❌ An error occurred while resolving content ID: {e}")
-            return
-        except Exception as e:
-            print(f"❌ An unexpected error occurred while resolving content ID: {e}")
+    hls_url = resolve_hls_url(content_id)
+    if not hls_url:
+        return False
+    return download_hls(hls_url, output_filename, on_progress, should_stop, quality=quality)
+
+
+def download_videos(jobs, on_done=None, should_stop=None, download_workers=DEFAULT_VOD_WORKERS, resolve_workers=RESOLVE_WORKERS, on_progress=None, slots=None, quality=None):
+    """
+    Downloads many videos through a two-stage pipeline.
+
+    Every job is resolved to its HLS URL concurrently; as soon as a URL is known
+    the job is queued on a smaller pool of yt-dlp workers, so resolution of later
+    videos overlaps with the downloads of earlier ones.
+
+    Args:
+        jobs (list): (content_id, output_filename) pairs.
+        on_done (callable, optional): Called as on_done(content_id, output_filename, success)
+                                      from a worker thread when a job finishes.
+        should_stop (callable, optional): Checked before each stage of each job and
+                                          while yt-dlp runs; returning True skips the
+                                          remaining work and stops running downloads.
+        download_workers (int): Maximum number of concurrent yt-dlp processes.
+        resolve_workers (int): Maximum number of concurrent Dacast lookups.
+        on_progress (callable, optional): Called as on_progress(content_id, output_filename,
+                                          progress_str) while a video downloads.
+        slots (threading.Semaphore, optional): Held by every running download, to share a
+                                               concurrency cap with other transfers.
+        quality (str, optional): Rendition policy of every video (see hls.check_quality);
+                                 defaults to VOD_QUALITY.
+
+    Returns:
+        int: Number of videos downloaded successfully.
+    """
+    if not jobs:
+        return 0
+    succeeded = 0
+    count_lock = threading.Lock()
+
+    def finish(content_id, output_filename, success):
+        nonlocal succeeded
+        if success:
+            with count_lock:
+                succeeded += 1
+        if on_done:
+            on_done(content_id, output_filename, success)
+
+    def download_stage(content_id, output_filename, hls_url):
+        if should_stop and should_stop():
             return
-    
-    # This is the Dacast API endpoint that provides the HLS link
-    access_url = f"https://playback.dacast.com/content/access?contentId={actual_content_id}&provider=universe"
-    
-    try:
-        # This request does NOT require GUC authentication
-        print("Fetching HLS stream URL...")
-        hls_resp = requests.get(access_url)
-        
-        if hls_resp.status_code == 200:
-            hls_data = hls_resp.json()
-            hls_url = hls_data.get('hls')
-            
-            if hls_url:
-                print("✅ Successfully obtained HLS URL!")
-                print("Starting download with enhanced quality...")
-                
-                # Use yt-dlp with ffmpeg for better quality
-                # Allow overriding yt-dlp and ffmpeg paths via environment variables
-                yt_dlp_path = os.environ.get('YTDLP_PATH', 'yt-dlp')
-                # --- Begin cross-platform ffmpeg path logic ---
-                ffmpeg_env = os.environ.get('FFMPEG_PATH')
-                if ffmpeg_env:
-                    ffmpeg_path = ffmpeg_env
-                else:
-                    if sys.platform.startswith('win'):
-                        ffmpeg_path = 'ffmpeg'
-                    else:
-                        ffmpeg_path = shutil.which('ffmpeg') or 'ffmpeg'
-                # --- End cross-platform ffmpeg path logic ---
-                print(f"DEBUG: yt_dlp_path = {yt_dlp_path}")
-                print(f"DEBUG: ffmpeg_path = {ffmpeg_path}")
-                cmd = [
-                    yt_dlp_path,
-                    '--downloader', 'ffmpeg',
-                    '--ffmpeg-location', ffmpeg_path,
-                    '--hls-use-mpegts',
-                    '-o', output_filename,
-                    hls_url
-                ]
-                
-                print(f"Running command: {' '.join(cmd)}")
-                
-                # Execute the download command
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                
-                if result.returncode == 0:
-                    print(f"✅ Download completed successfully!")
-                    print(f"Video saved as: {output_filename}")
-                    
-                    # Check if file exists and show its size
-                    if os.path.exists(output_filename):
-                        file_size = os.path.getsize(output_filename)
-                        print(f"File size: {file_size:,} bytes ({file_size/1024:.1f} KB)")
-                else:
-                    print(f"❌ Download failed!")
-                    print(f"Error output: {result.stderr}")
-                    
-            else:
-                print("❌ API call successful, but no HLS URL was found in the response.")
-                print(f"Response content: {hls_data}")
-        else:
-            print(f"❌ Failed to get HLS link. Dacast API returned status: {hls_resp.status_code}")
-            print(f"Response content: {hls_resp.text}")
+        print(f"Output filename: {output_filename}")
+        report = (lambda progress_str: on_progress(content_id, output_filename, progress_str)) if on_progress else None
+        with slots or nullcontext():
+            if should_stop and should_stop():
+                return
+            try:
+                with timing.span("vod.download", output_filename) as span:
+                    success = download_hls(hls_url, output_filename, report, should_stop, quality=quality)
+                    if success and os.path.exists(output_filename):
+                        span.bytes = os.path.getsize(output_filename)
+            except Exception as e:
+                # e.g. the playlist stayed unreachable after retries; other videos go on
+                print(f"❌ An error occurred during download of {output_filename}: {e}")
+                success = False
+            if not success and not (should_stop and should_stop()):
+                # The URL may have expired early; the next attempt asks Dacast again
+                dacast.get_client().forget(content_id)
+            finish(content_id, output_filename, success)
 
-    except requests.RequestException as e:
-        print(f"❌ An error occurred while calling the Dacast API: {e}")
-    except subprocess.CalledProcessError as e:
-        print(f"❌ An error occurred during download: {e}")
-    except Exception as e:
-        print(f"❌ An unexpected error occurred: {e}")
+    def resolve_stage(content_id, output_filename):
+        if should_stop and should_stop():
+            return None
+        print(f"Resolving video with contentId: {content_id}")
+        with timing.span("vod.resolve", content_id):
+            hls_url = resolve_hls_url(content_id)
+        if not hls_url:
+            finish(content_id, output_filename, False)
+            return None
+        return download_pool.submit(download_stage, content_id, output_filename, hls_url)
+
+    with ThreadPoolExecutor(max_workers=max(1, download_workers)) as download_pool:
+        with ThreadPoolExecutor(max_workers=max(1, min(resolve_workers, len(jobs)))) as resolve_pool:
+            resolved = [resolve_pool.submit(resolve_stage, content_id, output_filename) for content_id, output_filename in jobs]
+        for future in resolved:
+            download_future = future.result()
+            if download_future is not None:
+                download_future.result()
+    return succeeded
 
 
 def get_video_download_commands(username, password, course_id, session_id):
@@ -145,14 +612,13 @@ def get_video_download_commands(username, password, course_id, session_id):
         session_id (str): The session ID from the URL (e.g., '65').
     """
     # Construct the course page URL
-    course_url = f"https://cms.guc.edu.eg/apps/student/CourseViewStn.aspx?id={course_id}&sid={session_id}"
+    course_url = f"{CMS_URL}/apps/student/CourseViewStn.aspx?id={course_id}&sid={session_id}"
     
     print(f"Attempting to log in and access course page: {course_url}\n")
     
     try:
         # Use a session to maintain login state
-        with requests.Session() as s:
-            s.auth = HttpNtlmAuth(username.strip() + "@student.guc.edu.eg", password)
+        with build_session(HttpNtlmAuth(username.strip() + "@student.guc.edu.eg", password)) as s:
             
             # First, make an authenticated request to the page
             resp = s.get(course_url)
@@ -198,31 +664,15 @@ def get_video_download_commands(username, password, course_id, session_id):
                     print("-" * 20 + "\n")
                     continue
 
-                # This is the Dacast API endpoint that provides the HLS link
-                access_url = f"https://playback.dacast.com/content/access?contentId={content_id}&provider=universe"
-                
-                try:
-                    # This request does NOT require GUC authentication
-                    hls_resp = requests.get(access_url)
-                    if hls_resp.status_code == 200:
-                        hls_data = hls_resp.json()
-                        hls_url = hls_data.get('hls')
-                        
-                        if hls_url:
-                            print(f"--- Video {i+1}: {video_title} ---")
-                            print("Success! Use the following command in your terminal to download:")
-                            # Print the enhanced command for yt-dlp with ffmpeg for better quality
-                            print("\n" + f'yt-dlp --downloader ffmpeg --hls-use-mpegts -o "{output_filename}" "{hls_url}"' + "\n")
-                        else:
-                            print(f"--- Video {i+1}: {video_title} ---")
-                            print("API call successful, but no HLS URL was found in the response.")
-                    else:
-                        print(f"--- Video {i+1}: {video_title} ---")
-                        print(f"Failed to get HLS link. Dacast API returned status: {hls_resp.status_code}")
-
-                except requests.RequestException as e:
-                    print(f"--- Video {i+1}: {video_title} ---")
-                    print(f"An error occurred while calling the Dacast API: {e}")
+                # Dacast lookups are cached like those of download_single_video
+                hls_url = resolve_hls_url(content_id)
+                print(f"--- Video {i+1}: {video_title} ---")
+                if hls_url:
+                    print("Success! Use the following command in your terminal to download:")
+                    # Print the enhanced command for yt-dlp with ffmpeg for better quality
+                    print("\n" + f'yt-dlp --downloader ffmpeg --hls-use-mpegts -o "{output_filename}" "{hls_url}"' + "\n")
+                else:
+                    print("Could not get the HLS link of this video.")
 
                 print("-" * 20 + "\n")
 